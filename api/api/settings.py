@@ -98,6 +98,20 @@ else:
     }
 
 
+# Cache compartilhado entre workers (versões de invalidação, cache de respostas).
+# Padrão em arquivo para funcionar sem serviços extras; em produção aponte para Redis/Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
+}
+# Cache de respostas das views públicas do catálogo (shop.response_cache), em segundos
+SHOP_RESPONSE_CACHE_TIMEOUT = int(os.getenv('SHOP_RESPONSE_CACHE_TIMEOUT', '600'))
+# Idade máxima (s) do índice de autocomplete em memória antes de recalcular os pesos por vendas
+SHOP_AUTOCOMPLETE_MAX_AGE = int(os.getenv('SHOP_AUTOCOMPLETE_MAX_AGE', '900'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -152,6 +166,24 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Paginação (shop.pagination): tamanho padrão e máximo por página
+SHOP_PAGE_SIZE = int(os.getenv('SHOP_PAGE_SIZE', '24'))
+SHOP_MAX_PAGE_SIZE = int(os.getenv('SHOP_MAX_PAGE_SIZE', '100'))
+# Números de pedido reservados por worker em cada ida ao contador do dia (shop.order_numbers)
+SHOP_ORDER_NUMBER_BLOCK = int(os.getenv('SHOP_ORDER_NUMBER_BLOCK', '20'))
+# Views async (shop.async_views) para categorias, produtos e configuração da loja, só sob ASGI
+# (no WSGI rodariam via async_to_sync, sem ganho). Desligado: não venceu as views síncronas
+# no loadtest_catalog --compare (ver o histórico do repositório)
+SHOP_ASYNC_CATALOG = os.getenv('SHOP_ASYNC_CATALOG', 'False').lower() in ('1', 'true', 'yes')
+# Variantes responsivas das imagens enviadas (shop.images): larguras em px e formatos, por vírgula
+SHOP_IMAGE_WIDTHS = tuple(int(w) for w in os.getenv('SHOP_IMAGE_WIDTHS', '320,640,960,1280').split(',') if w.strip())
+SHOP_IMAGE_FORMATS = tuple(f.strip() for f in os.getenv('SHOP_IMAGE_FORMATS', 'avif,webp,jpeg').split(',') if f.strip())
+# Fila de geração das variantes (shop.image_jobs, processada por manage.py image_worker).
+# Com EAGER as variantes são geradas na própria requisição (dev/testes sem worker).
+SHOP_IMAGE_JOBS_EAGER = os.getenv('SHOP_IMAGE_JOBS_EAGER', 'False').lower() in ('1', 'true', 'yes')
+SHOP_IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv('SHOP_IMAGE_JOB_MAX_ATTEMPTS', '5'))
+SHOP_IMAGE_JOB_TIMEOUT = int(os.getenv('SHOP_IMAGE_JOB_TIMEOUT', '600'))
+
 # CORS
 cors_origins_env = os.getenv('CORS_ALLOWED_ORIGINS')
 if cors_origins_env:
@@ -171,6 +203,18 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
-# Media (upload de imagens)
+# Media (upload de imagens). Com DEBUG o Django serve MEDIA_URL (shop.views.serve_media); em
+# produção quem serve é o nginx de nginx/media.conf (serviço "media" do docker-compose), com o
+# mesmo Cache-Control imutável para os arquivos endereçados por conteúdo.
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Uploads endereçados por conteúdo (shop.storage): cada arquivo é guardado uma vez, sob o hash
+STORAGES = {
+    'default': {
+        'BACKEND': os.getenv('MEDIA_STORAGE_BACKEND', 'shop.storage.ContentAddressedStorage'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
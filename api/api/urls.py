@@ -14,15 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from shop.views import RegisterView, MeView, ChangePasswordView
+from shop.views import RegisterView, MeView, ChangePasswordView, serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -35,4 +36,8 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Como static(), mas com Cache-Control imutável para os arquivos endereçados por conteúdo.
+    # Em produção /media/ fica com o nginx (nginx/media.conf), que aplica o mesmo cabeçalho.
+    urlpatterns += [
+        re_path(r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")), serve_media),
+    ]
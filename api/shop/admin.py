@@ -45,6 +45,6 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
-    list_display = ("code", "discount_type", "value", "used_count", "max_uses", "expires_at", "active")
+    list_display = ("code", "discount_type", "value", "used_count", "max_uses", "max_uses_per_customer", "expires_at", "active")
     list_filter = ("discount_type", "active")
     search_fields = ("code", "description")
@@ -0,0 +1,192 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Count, Max, prefetch_related_objects
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .attributes import filter_products
+from .category_tree import get_category_tree
+from .conditional import make_etag, not_modified_response, set_validators
+from .models import Product
+from .pagination import KeysetPagination
+from .response_cache import CATEGORIES, PRODUCTS, acached_response, product_generation
+from .serializers import CategorySerializer, ProductSerializer, SiteSettingSerializer
+from .site_settings import get_site_setting
+from .versions import aget_versions
+from .views import SiteSettingView
+
+# Leitura do catálogo para o servidor ASGI (SHOP_ASYNC_CATALOG, desligado por padrão):
+# mesmas URLs, respostas, cache (shop.response_cache) e ETags das views síncronas, mas
+# cliente lento não prende uma thread do worker enquanto espera. Consultas pelo ORM async;
+# imagens, atributos e árvore de categorias de uma página são carregados em paralelo.
+
+
+def _in_thread(func, *args):
+    """
+    Roda `func` numa thread do pool com conexão própria (thread_sensitive=False), para que
+    consultas independentes rodem de fato em paralelo; respeita CONN_MAX_AGE como uma requisição.
+    """
+    def run():
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def load_product_related(products):
+    """Imagens e atributos (prefetch) e a árvore de categorias, em paralelo; retorna a árvore."""
+    for product in products:
+        # Cada prefetch grava a sua chave; o dicionário já existe para as duas threads
+        product.__dict__.setdefault("_prefetched_objects_cache", {})
+    prefetches = [_in_thread(prefetch_related_objects, products, lookup) for lookup in Product.objects.related_prefetches()]
+    tree, *_ = await asyncio.gather(sync_to_async(get_category_tree)(), *prefetches)
+    return tree
+
+
+class AsyncCatalogView(View):
+    """
+    Base das views async: GET condicional (make_etag, igual a ConditionalGetMixin) e cache
+    de respostas (acached_response); subclasses definem validators() e build().
+    """
+
+    http_method_names = ["get", "head", "options"]
+    generations = ()
+    cache_response = True
+
+    def get_generations(self, request):
+        return list(self.generations)
+
+    async def validators(self, request):
+        """(último timestamp, contagem) dos dados da resposta."""
+        raise NotImplementedError
+
+    async def build(self, request):
+        """(status, data) da resposta."""
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        generations = self.get_generations(drf_request)
+        try:
+            if generations:
+                (last, count), versions = await asyncio.gather(self.validators(drf_request), aget_versions(generations))
+            else:
+                (last, count), versions = await self.validators(drf_request), {}
+            etag = make_etag(request.get_full_path(), last, count, versions)
+            not_modified = not_modified_response(request, etag, last)
+            if not_modified is not None:
+                return not_modified
+            cache_status = None
+            if self.cache_response and generations:
+                status_code, data, cache_status = await acached_response(
+                    drf_request, generations, lambda: self.build(drf_request),
+                )
+            else:
+                status_code, data = await self.build(drf_request)
+        except APIException as exc:
+            return self.render(exc.status_code, {"detail": exc.detail})
+        response = self.render(status_code, data)
+        if cache_status:
+            response["X-Cache"] = cache_status
+        if status_code == status.HTTP_200_OK:
+            set_validators(response, etag, last)
+        return response
+
+    def render(self, status_code, data):
+        return HttpResponse(JSONRenderer().render(data), status=status_code, content_type="application/json")
+
+
+class AsyncCategoryListView(AsyncCatalogView):
+    generations = (CATEGORIES,)
+
+    async def _tree(self, request):
+        if not hasattr(request, "_category_tree"):
+            request._category_tree = await sync_to_async(get_category_tree)()
+        return request._category_tree
+
+    async def validators(self, request):
+        # Category não tem updated_at: edições são cobertas pela geração "categories"
+        stamps = [c.created_at for c in (await self._tree(request)).categories()]
+        return (max(stamps) if stamps else None), len(stamps)
+
+    async def build(self, request):
+        tree = await self._tree(request)
+        context = {"request": request, "category_tree": tree}
+        return status.HTTP_200_OK, CategorySerializer(tree.categories(), many=True, context=context).data
+
+
+class AsyncProductListView(AsyncCatalogView):
+    generations = (CATEGORIES, PRODUCTS)
+
+    async def _queryset(self, request):
+        # filter_products pode consultar a árvore de categorias (?category=): fora do event loop
+        if not hasattr(request, "_products"):
+            request._products = await sync_to_async(filter_products)(
+                Product.objects.select_related("category").visible(), request.query_params,
+            )
+        return request._products
+
+    async def validators(self, request):
+        queryset = await self._queryset(request)
+        agg = await queryset.order_by().aaggregate(last=Max("updated_at"), count=Count("pk"))
+        return agg["last"], agg["count"]
+
+    async def build(self, request):
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(await self._queryset(request), request)
+        tree = await load_product_related(page)
+        data = ProductSerializer(page, many=True, context={"request": request, "category_tree": tree}).data
+        return status.HTTP_200_OK, paginator.get_paginated_response(data).data
+
+
+class AsyncProductDetailView(AsyncCatalogView):
+    def get_generations(self, request):
+        return [CATEGORIES, product_generation(self.kwargs.get("slug"))]
+
+    def _queryset(self):
+        return Product.objects.select_related("category").filter(is_active=True, slug=self.kwargs.get("slug"))
+
+    async def validators(self, request):
+        agg = await self._queryset().order_by().aaggregate(last=Max("updated_at"), count=Count("pk"))
+        return agg["last"], agg["count"]
+
+    async def build(self, request):
+        product = await self._queryset().afirst()
+        if product is None:
+            raise NotFound("No Product matches the given query.")
+        tree = await load_product_related([product])
+        return status.HTTP_200_OK, ProductSerializer(product, context={"request": request, "category_tree": tree}).data
+
+
+class AsyncSiteSettingView(AsyncCatalogView):
+    # Leitura async pelo acessor em memória; edições (staff) seguem pela view DRF síncrona
+    http_method_names = ["get", "put", "patch", "head", "options"]
+    write_view = staticmethod(SiteSettingView.as_view())
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Como as views DRF: a autenticação (JWT/sessão) da view de escrita cuida do CSRF
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def validators(self, request):
+        setting = await sync_to_async(get_site_setting)()
+        return setting.updated_at, 1
+
+    async def build(self, request):
+        setting = await sync_to_async(get_site_setting)()
+        return status.HTTP_200_OK, SiteSettingSerializer(setting, context={"request": request}).data
+
+    async def put(self, request, *args, **kwargs):
+        return await sync_to_async(self.write_view)(request, *args, **kwargs)
+
+    async def patch(self, request, *args, **kwargs):
+        return await sync_to_async(self.write_view)(request, *args, **kwargs)
@@ -0,0 +1,129 @@
+import re
+
+from django.db.models import Count, Exists, Max, Min, OuterRef
+from django.utils.text import slugify
+
+from .models import ProductAttribute
+
+COLOR = ProductAttribute.COLOR
+SIZE = ProductAttribute.SIZE
+TAG = ProductAttribute.TAG
+
+# Parâmetro de filtro na query string -> tipo de atributo
+FILTER_PARAMS = {"color": COLOR, "size": SIZE, "tag": TAG}
+
+_COLOR_RE = re.compile(r"^(#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})|rgb\(|hsl\()")
+
+
+def split_csv(text):
+    if not text:
+        return []
+    # Split por vírgula e ponto-e-vírgula, remover espaços extras, ignorar vazios
+    parts = []
+    for ch in [",", ";"]:
+        if ch in text:
+            parts = [p.strip() for p in text.split(ch)]
+            break
+    if not parts:
+        parts = [text.strip()]
+    return [p for p in parts if p]
+
+
+def parse_colors(text):
+    """
+    Retorna lista de objetos {name, hex} a partir de available_colors.
+    Aceita formatos:
+    - "Nome|#hex" (preferido)
+    - "Nome:#hex"
+    - "#hex" ou "rgb(...)" ou "hsl(...)" (usa como name e hex)
+    - "Nome" (sem cor definida)
+    """
+    out = []
+    for it in split_csv(text or ""):
+        s = (it or "").strip()
+        if "|" in s or ":" in s:
+            name, hexv = s.split("|" if "|" in s else ":", 1)
+            out.append({"name": name.strip(), "hex": hexv.strip() or None})
+        elif _COLOR_RE.match(s):
+            out.append({"name": s, "hex": s})
+        else:
+            out.append({"name": s, "hex": None})
+    return out
+
+
+def value_key(value):
+    return slugify(value or "")[:120]
+
+
+def build_attributes(product):
+    """Linhas de ProductAttribute (não salvas) a partir dos campos CSV do produto."""
+    rows = []
+    for position, color in enumerate(parse_colors(product.available_colors)):
+        rows.append(ProductAttribute(
+            product=product, kind=COLOR, value=color["name"][:120], value_key=value_key(color["name"]),
+            hex=(color["hex"] or "")[:32], position=position,
+        ))
+    for kind, text in ((SIZE, product.available_sizes), (TAG, product.tags)):
+        for position, value in enumerate(split_csv(text or "")):
+            rows.append(ProductAttribute(
+                product=product, kind=kind, value=value[:120], value_key=value_key(value), position=position,
+            ))
+    return rows
+
+
+def sync_product_attributes(product):
+    sync_products_attributes([product])
+
+
+def sync_products_attributes(products):
+    # Um DELETE e um INSERT em lote para todos os produtos (importação usa bulk_create/bulk_update)
+    ProductAttribute.objects.filter(product__in=[p.pk for p in products]).delete()
+    rows = [row for product in products for row in build_attributes(product)]
+    if rows:
+        ProductAttribute.objects.bulk_create(rows, batch_size=1000)
+
+
+def _filter_values(params, name):
+    values = []
+    for raw in params.getlist(name):
+        values.extend(value_key(v) for v in raw.split(","))
+    return [v for v in values if v]
+
+
+def filter_products(queryset, params):
+    """
+    Aplica ?color=, ?size=, ?tag= (vários valores por vírgula = OU; tipos diferentes = E)
+    e ?category=<slug> (inclui subcategorias, via árvore em memória).
+    """
+    for name, kind in FILTER_PARAMS.items():
+        values = _filter_values(params, name)
+        if values:
+            queryset = queryset.filter(Exists(
+                ProductAttribute.objects.filter(product=OuterRef("pk"), kind=kind, value_key__in=values)
+            ))
+    category_slug = params.get("category")
+    if category_slug:
+        from .category_tree import get_category_tree
+
+        tree = get_category_tree()
+        category = tree.get_by_slug(category_slug)
+        queryset = queryset.filter(category_id__in=tree.descendant_ids(category.id)) if category else queryset.none()
+    return queryset
+
+
+def facet_counts(products):
+    """Contagem de produtos por valor de cor/tamanho/tag, em uma única query agrupada."""
+    rows = (
+        ProductAttribute.objects.filter(product__in=products.order_by().values("pk"))
+        .values("kind", "value_key")
+        .annotate(count=Count("product", distinct=True), value=Min("value"), hex=Max("hex"), position=Min("position"))
+        .order_by("kind", "-count", "position", "value_key")
+    )
+    facets = {"colors": [], "sizes": [], "tags": []}
+    names = {COLOR: "colors", SIZE: "sizes", TAG: "tags"}
+    for row in rows:
+        item = {"key": row["value_key"], "value": row["value"], "count": row["count"]}
+        if row["kind"] == COLOR:
+            item["hex"] = row["hex"] or None
+        facets[names[row["kind"]]].append(item)
+    return facets
@@ -0,0 +1,253 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .category_tree import get_category_tree
+from .models import Product
+from .versions import bump_version, get_version
+
+# Índice de prefixos em memória para o autocomplete da busca.
+# Chaves normalizadas (minúsculas, sem acento) ficam numa lista ordenada e a busca
+# usa bisect; cada chave aponta para uma sugestão (produto ou categoria) com peso.
+VERSION_NAME = "autocomplete"
+FEATURED_BOOST = 1000
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_lock = threading.RLock()
+_state = {"index": None, "version": None, "built_at": 0.0}
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def _terms(*texts):
+    # Frase completa + cada palavra, para casar "renda" em "Sutiã Renda"
+    terms = set()
+    for text in texts:
+        norm = normalize(text)
+        if not norm:
+            continue
+        terms.add(norm)
+        terms.update(w for w in _WORD_RE.findall(norm) if len(w) > 1)
+    return terms
+
+
+def _split_tags(tags):
+    return [t for t in re.split(r"[,;]", tags or "") if t.strip()]
+
+
+class Suggestion:
+    __slots__ = ("key", "kind", "label", "slug", "sales", "weight", "category_id", "terms")
+
+    def __init__(self, key, kind, label, slug, sales, terms, featured=False, category_id=None):
+        self.key = key
+        self.kind = kind
+        self.label = label
+        self.slug = slug
+        self.sales = sales or 0
+        self.weight = self.sales + (FEATURED_BOOST if featured else 0)
+        self.terms = terms
+        self.category_id = category_id
+
+    def as_dict(self):
+        return {"type": self.kind, "label": self.label, "slug": self.slug}
+
+
+class PrefixIndex:
+    memo_size = 4096
+
+    def __init__(self):
+        self.keys = []  # [(termo, chave_da_sugestão)] ordenado
+        self.entries = {}
+        self._memo = {}
+
+    # Escritas trocam a lista inteira (copy-on-write): leituras concorrentes nunca veem meio termo
+    def add(self, suggestion):
+        keys = self._without(list(self.keys), suggestion.key)
+        for term in suggestion.terms:
+            bisect.insort(keys, (term, suggestion.key))
+        self.entries[suggestion.key] = suggestion
+        self.keys = keys
+        self._memo = {}
+
+    def remove(self, key):
+        if key not in self.entries:
+            return
+        self.keys = self._without(list(self.keys), key)
+        self.entries.pop(key, None)
+        self._memo = {}
+
+    def _without(self, keys, key):
+        old = self.entries.get(key)
+        for term in (old.terms if old else ()):
+            i = bisect.bisect_left(keys, (term, key))
+            if i < len(keys) and keys[i] == (term, key):
+                del keys[i]
+        return keys
+
+    def bulk_load(self, suggestions):
+        self.entries = {s.key: s for s in suggestions}
+        self.keys = sorted((t, s.key) for s in suggestions for t in s.terms)
+        self._memo = {}
+
+    def lookup(self, prefix, limit):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+        matched = set()
+        keys = self.keys
+        i = bisect.bisect_left(keys, (prefix,))
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            matched.add(keys[i][1])
+            i += 1
+        entries = self.entries
+        found = (entries.get(k) for k in matched)
+        best = heapq.nlargest(limit, (s for s in found if s is not None), key=lambda s: (s.weight, s.label))
+        memo = self._memo
+        if len(memo) >= self.memo_size:
+            memo.clear()
+        memo[memo_key] = best
+        return best
+
+
+def _product_suggestion(p, sales):
+    return Suggestion(
+        ("product", p.id), "product", p.title, p.slug, sales,
+        _terms(p.title, p.brand, *_split_tags(p.tags)), featured=p.is_featured, category_id=p.category_id,
+    )
+
+
+def _category_suggestion(category, sales):
+    # Categoria pesa pelas vendas somadas dos seus produtos
+    return Suggestion(("category", category.id), "category", category.name, category.slug, sales, _terms(category.name))
+
+
+def _category_sales(index, category_id):
+    return sum(s.sales for s in index.entries.values() if s.kind == "product" and s.category_id == category_id)
+
+
+def _visible_products():
+    # Mesma regra da vitrine e da busca (Product.objects.visible()), com vendas agregadas
+    return (
+        Product.objects.visible()
+        .annotate(sales=Sum("orderitem__quantity"))
+        .only("id", "title", "slug", "brand", "tags", "is_featured", "category_id")
+        .order_by()
+    )
+
+
+def build_index():
+    # Uma query para produtos (com vendas agregadas); categorias vêm da árvore em memória
+    suggestions = [_product_suggestion(p, p.sales) for p in _visible_products()]
+    by_category = {}
+    for s in suggestions:
+        by_category[s.category_id] = by_category.get(s.category_id, 0) + s.sales
+    for category in get_category_tree().categories():
+        suggestions.append(_category_suggestion(category, by_category.get(category.id, 0)))
+    index = PrefixIndex()
+    index.bulk_load(suggestions)
+    return index
+
+
+def _max_age():
+    # Pesos por vendas envelhecem; reconstrói periodicamente
+    return getattr(settings, "SHOP_AUTOCOMPLETE_MAX_AGE", 900)
+
+
+def get_index():
+    version = get_version(VERSION_NAME)
+    index = _state["index"]
+    fresh = time.monotonic() - _state["built_at"] < _max_age()
+    if index is not None and version is not None and _state["version"] == version and fresh:
+        return index
+    with _lock:
+        index = _state["index"]
+        fresh = time.monotonic() - _state["built_at"] < _max_age()
+        if index is not None and version is not None and _state["version"] == version and fresh:
+            return index
+        index = build_index()
+        _state.update(index=index, version=version, built_at=time.monotonic())
+        return index
+
+
+def suggest(prefix, limit=8):
+    return [s.as_dict() for s in get_index().lookup(prefix, limit)]
+
+
+def invalidate():
+    """Descarta o índice (local e dos outros workers); o próximo suggest() reconstrói."""
+    with _lock:
+        bump_version(VERSION_NAME)
+        _state["index"] = None
+
+
+def _apply(change):
+    """Aplica a mudança no índice local e propaga a nova versão aos outros workers."""
+    with _lock:
+        previous = _state["version"]
+        version = bump_version(VERSION_NAME)
+        index = _state["index"]
+        if index is None:
+            return
+        change(index)
+        # Só mantém o índice local se ninguém mais mudou a versão no meio tempo
+        if previous is not None and version == previous + 1:
+            _state["version"] = version
+        else:
+            _state["index"] = None
+
+
+def update_product(product):
+    # Chamado depois do commit: relê a visibilidade (inativo ou esgotado sai do índice)
+    visible = Product.objects.visible().filter(pk=product.pk).exists()
+
+    def change(index):
+        key = ("product", product.pk)
+        old = index.entries.get(key)
+        if not visible:
+            index.remove(key)
+        else:
+            index.add(_product_suggestion(product, old.sales if old else 0))
+    _apply(change)
+
+
+def refresh_stock(product_ids):
+    """Estoque mudou por UPDATE (checkout, cancelamento), sem sinais: tira o que esgotou e devolve o que voltou."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    visible = {p.pk: p for p in _visible_products().filter(pk__in=product_ids)}
+
+    def change(index):
+        for pk in product_ids:
+            key = ("product", pk)
+            if pk not in visible:
+                index.remove(key)
+            elif key not in index.entries:
+                index.add(_product_suggestion(visible[pk], visible[pk].sales))
+    _apply(change)
+
+
+def remove_product(pk):
+    _apply(lambda index: index.remove(("product", pk)))
+
+
+def update_category(category):
+    _apply(lambda index: index.add(_category_suggestion(category, _category_sales(index, category.pk))))
+
+
+def remove_category(pk):
+    _apply(lambda index: index.remove(("category", pk)))
@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+
+from .models import Category
+from .versions import get_version
+
+# Mesma geração usada pelo cache de respostas do catálogo (shop.response_cache.CATEGORIES)
+VERSION_NAME = "categories"
+
+_lock = threading.Lock()
+_state = {"version": None, "tree": None}
+
+
+class CategoryNode:
+    __slots__ = ("category", "parent", "children", "depth", "path", "image_url")
+
+    def __init__(self, category):
+        self.category = category
+        self.parent = None
+        self.children = []
+        self.depth = 0
+        # ids dos ancestrais, da raiz até o pai
+        self.path = ()
+        try:
+            self.image_url = category.image.url if category.image else None
+        except Exception:
+            self.image_url = None
+
+    @property
+    def id(self):
+        return self.category.id
+
+
+class CategoryTree:
+    """
+    Árvore de categorias montada a partir de uma única query.
+    Mantém ligações pai/filhos, profundidade, caminho de ancestrais e agrupamento por group_title.
+    """
+
+    def __init__(self, categories):
+        # categories já vem na ordenação padrão (sort_order, name)
+        self.nodes = OrderedDict((c.id, CategoryNode(c)) for c in categories)
+        self.by_slug = {n.category.slug: n for n in self.nodes.values()}
+        self.roots = []
+        for node in self.nodes.values():
+            parent = self.nodes.get(node.category.parent_id)
+            if parent is None:
+                self.roots.append(node)
+            else:
+                node.parent = parent
+                parent.children.append(node)
+        for node in self.nodes.values():
+            path = []
+            seen = {node.id}
+            cur = node.parent
+            # Protege contra ciclos cadastrados por engano no admin
+            while cur is not None and cur.id not in seen:
+                seen.add(cur.id)
+                path.append(cur.id)
+                cur = cur.parent
+            path.reverse()
+            node.path = tuple(path)
+            node.depth = len(path)
+
+    def categories(self):
+        return [n.category for n in self.nodes.values()]
+
+    def get(self, pk):
+        node = self.nodes.get(pk)
+        return node.category if node else None
+
+    def get_by_slug(self, slug):
+        node = self.by_slug.get(slug)
+        return node.category if node else None
+
+    def node(self, pk):
+        return self.nodes.get(pk)
+
+    def children(self, pk):
+        node = self.nodes.get(pk)
+        return [c.category for c in node.children] if node else []
+
+    def ancestors(self, pk, include_self=False):
+        node = self.nodes.get(pk)
+        if node is None:
+            return []
+        out = [self.nodes[i].category for i in node.path]
+        if include_self:
+            out.append(node.category)
+        return out
+
+    def descendants(self, pk, include_self=False):
+        node = self.nodes.get(pk)
+        if node is None:
+            return []
+        out = [node.category] if include_self else []
+        seen = {node.id}
+        stack = list(reversed(node.children))
+        while stack:
+            cur = stack.pop()
+            if cur.id in seen:
+                continue
+            seen.add(cur.id)
+            out.append(cur.category)
+            stack.extend(reversed(cur.children))
+        return out
+
+    def descendant_ids(self, pk, include_self=True):
+        return [c.id for c in self.descendants(pk, include_self=include_self)]
+
+    def grouped_children(self, pk):
+        # Subcategorias agrupadas por group_title (mega menu), preservando a ordem
+        groups = OrderedDict()
+        node = self.nodes.get(pk)
+        for child in (node.children if node else []):
+            groups.setdefault(child.category.group_title or "", []).append(child.category)
+        return groups
+
+
+def get_category_tree():
+    """Retorna a árvore do processo, reconstruindo-a só quando a versão compartilhada mudar."""
+    version = get_version(VERSION_NAME)
+    if version is None:
+        # Backend de cache sem persistência (ex.: DummyCache): não há como invalidar, então não guarda
+        return CategoryTree(list(Category.objects.all()))
+    tree = _state["tree"]
+    if tree is not None and _state["version"] == version:
+        return tree
+    with _lock:
+        if _state["tree"] is not None and _state["version"] == version:
+            return _state["tree"]
+        tree = CategoryTree(list(Category.objects.all()))
+        _state["tree"] = tree
+        _state["version"] = version
+        return tree
@@ -0,0 +1,83 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+
+from .versions import get_versions
+
+
+def make_etag(full_path, last, count, versions):
+    # Também usado pelas views async (shop.async_views): mesmo ETag para a mesma URL e dados
+    raw = "|".join([
+        full_path,
+        last.isoformat() if last else "",
+        str(count),
+        ",".join(f"{k}={v}" for k, v in sorted(versions.items())),
+    ])
+    return quote_etag(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+
+def not_modified_response(request, etag, last):
+    """Resposta 304 se os validadores da requisição ainda valem, senão None."""
+    last_ts = int(last.timestamp()) if last else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_ts)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+    return not_modified
+
+
+def set_validators(response, etag, last):
+    response["ETag"] = etag
+    if last is not None:
+        response["Last-Modified"] = http_date(int(last.timestamp()))
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional (ETag / Last-Modified) para views de lista e detalhe.
+    Os validadores saem de um agregado (max do timestamp + contagem) sobre o mesmo queryset
+    da view, sem serializar o corpo; gerações (shop.versions) cobrem dados embutidos sem timestamp.
+    Deve vir antes de CachedResponseMixin na herança para responder 304 antes do cache.
+    """
+
+    validator_timestamp_field = "updated_at"
+
+    def get_validator_generations(self):
+        return []
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self, request):
+        queryset = self.get_validator_queryset()
+        if isinstance(queryset, (list, tuple)):
+            # Listas já materializadas (ex.: árvore de categorias em memória)
+            stamps = [getattr(o, self.validator_timestamp_field) for o in queryset]
+            last, count = (max(stamps) if stamps else None), len(stamps)
+        else:
+            agg = queryset.order_by().aggregate(last=Max(self.validator_timestamp_field), count=Count("pk"))
+            last, count = agg["last"], agg["count"]
+        versions = get_versions(self.get_validator_generations()) if self.get_validator_generations() else {}
+        return make_etag(request.get_full_path(), last, count, versions), last
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last = self.get_validators(request)
+        not_modified = not_modified_response(request, etag, last)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            set_validators(response, etag, last)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Coupon, CouponRedemption
+
+# Resgate de cupom sem ler-modificar-gravar. A validação (cupom inexistente, inativo, vencido,
+# esgotado, abaixo do mínimo, limite do cliente) é uma leitura simples, sem trava: cupom inválido
+# falha antes de reservar estoque. O uso só é contado no fim do checkout por um UPDATE condicional
+# (used_count < max_uses), então checkouts concorrentes nunca passam de max_uses. O limite por
+# cliente vem do livro CouponRedemption: cada uso ocupa uma vaga única (coupon, user, slot).
+
+
+# Releituras das vagas quando checkouts do mesmo cliente disputam a mesma vaga
+SLOT_ATTEMPTS = 5
+
+
+class CouponUnavailable(Exception):
+    MESSAGES = {
+        "not_found": "Cupom inválido",
+        "inactive": "Cupom expirado ou inativo",
+        "exhausted": "Cupom esgotado",
+        "min_total": "Subtotal abaixo do mínimo do cupom",
+        "customer_limit": "Limite de uso do cupom atingido para este cliente",
+    }
+
+    def __init__(self, reason):
+        super().__init__(self.MESSAGES[reason])
+        self.reason = reason
+        self.message = self.MESSAGES[reason]
+
+
+def _available(queryset, now):
+    """Filtro do UPDATE condicional: ativo, dentro da validade e com uso disponível."""
+    return (
+        queryset.filter(active=True)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gte=now))
+        .filter(Q(max_uses=0) | Q(used_count__lt=F("max_uses")))
+    )
+
+
+def _customer_uses(coupon, user_id):
+    return CouponRedemption.objects.filter(coupon=coupon, user_id=user_id).count()
+
+
+def check(code, user=None, subtotal=None):
+    """Valida o cupom sem travar nada; retorna o Coupon ou levanta CouponUnavailable."""
+    coupon = Coupon.objects.filter(code=(code or "").strip()).first()
+    if coupon is None:
+        raise CouponUnavailable("not_found")
+    if not coupon.active or (coupon.expires_at and coupon.expires_at < timezone.now()):
+        raise CouponUnavailable("inactive")
+    if coupon.max_uses and coupon.used_count >= coupon.max_uses:
+        raise CouponUnavailable("exhausted")
+    if subtotal is not None and coupon.min_order_total and subtotal < coupon.min_order_total:
+        raise CouponUnavailable("min_total")
+    user_id = getattr(user, "pk", None)
+    if user_id and coupon.max_uses_per_customer and _customer_uses(coupon, user_id) >= coupon.max_uses_per_customer:
+        raise CouponUnavailable("customer_limit")
+    return coupon
+
+
+def discount_for(coupon, subtotal):
+    """Desconto do cupom sobre `subtotal` (nunca maior que ele), em centavos."""
+    subtotal = Decimal(subtotal or 0)
+    if coupon.discount_type == Coupon.PERCENT:
+        discount = subtotal * Decimal(coupon.value) / Decimal("100")
+    else:
+        discount = Decimal(coupon.value)
+    return min(discount, subtotal).quantize(Decimal("0.01"))
+
+
+def _take_slot(coupon, order, discount):
+    # Todo uso ocupa uma vaga, mesmo sem limite por cliente: se o limite vier depois, os usos
+    # anteriores já contam pela constraint única
+    fields = {"coupon": coupon, "user_id": order.user_id, "order": order, "discount_amount": discount}
+    limit = coupon.max_uses_per_customer
+    for _attempt in range(SLOT_ATTEMPTS):
+        slots = list(CouponRedemption.objects.filter(coupon=coupon, user_id=order.user_id).values_list("slot", flat=True))
+        # Conta as linhas, não as vagas distintas: uma linha antiga sem vaga também é um uso
+        if limit and len(slots) >= limit:
+            raise CouponUnavailable("customer_limit")
+        taken = set(slots)
+        slot = next(slot for slot in range(1, len(slots) + 2) if slot not in taken)
+        try:
+            with transaction.atomic():
+                CouponRedemption.objects.create(slot=slot, **fields)
+            return
+        except IntegrityError:
+            # Outro checkout do mesmo cliente ocupou a vaga: relê as vagas
+            continue
+    raise CouponUnavailable("customer_limit")
+
+
+def redeem(coupon, order, discount):
+    """
+    Conta o uso de `coupon` pelo pedido, na transação do checkout (chamar por último: o UPDATE
+    trava a linha do cupom até o commit). Levanta CouponUnavailable se o uso acabou no meio do caminho.
+    """
+    with transaction.atomic():
+        # Vaga do cliente antes do contador: estourar o limite do cliente nem chega a travar o cupom
+        _take_slot(coupon, order, discount)
+        now = timezone.now()
+        if not _available(Coupon.objects.filter(pk=coupon.pk), now).update(
+            used_count=F("used_count") + 1, updated_at=now,
+        ):
+            # A exceção desfaz o savepoint, com a vaga junto
+            raise CouponUnavailable("exhausted")
+
+
+def release_order(order):
+    """Devolve o uso do cupom de um pedido cancelado/apagado. Idempotente."""
+    with transaction.atomic():
+        for pk, coupon_id in CouponRedemption.objects.filter(order=order).values_list("pk", "coupon_id"):
+            if CouponRedemption.objects.filter(pk=pk).delete()[0]:
+                Coupon.objects.filter(pk=coupon_id, used_count__gt=0).update(
+                    used_count=F("used_count") - 1, updated_at=timezone.now(),
+                )
+
+
+def redeem_order(order):
+    """Conta de novo o cupom de um pedido reaberto (se ainda houver uso disponível)."""
+    if not order.coupon_code or CouponRedemption.objects.filter(order=order).exists():
+        return
+    coupon = Coupon.objects.filter(code=order.coupon_code).first()
+    if coupon is None:
+        return
+    redeem(coupon, order, order.discount_amount)
@@ -0,0 +1,115 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .autocomplete import normalize
+from .models import CustomerProfile
+
+# Índice "sombra" para a busca de clientes do admin, mantido pelos sinais de User e
+# CustomerProfile (shop.signals). Cada cliente vira um texto normalizado (minúsculo, sem
+# acento) com usuário, e-mail, nome, CPF, telefone (também só dígitos) e cidade:
+# - Postgres: tabela shop_customer_search com índice GIN pg_trgm (LIKE '%termo%' usa o índice)
+# - SQLite: tabela virtual FTS5 shop_customer_fts com tokenizer trigram (GLOB '*termo*' usa o índice)
+PG_TABLE = "shop_customer_search"
+SQLITE_TABLE = "shop_customer_fts"
+
+_NON_DIGIT_RE = re.compile(r"\D+")
+# Curingas do usuário viram literais: LIKE (Postgres, escape padrão '\') e GLOB (SQLite)
+_LIKE_SPECIAL_RE = re.compile(r"([\\%_])")
+_GLOB_SPECIAL_RE = re.compile(r"([*?\[])")
+_available = {}
+
+
+def _vendor():
+    return connection.vendor
+
+
+def is_available():
+    vendor = _vendor()
+    if vendor not in _available:
+        table = {"postgresql": PG_TABLE, "sqlite": SQLITE_TABLE}.get(vendor)
+        _available[vendor] = bool(table) and table in connection.introspection.table_names()
+    return _available[vendor]
+
+
+def build_document(username="", email="", first_name="", last_name="", cpf="", telefone="", cidade=""):
+    parts = [username, email, first_name, last_name, cpf, telefone, cidade]
+    # CPF e telefone também só com dígitos: "123.456" e "123456" acham o mesmo cliente
+    parts += [_NON_DIGIT_RE.sub("", value or "") for value in (cpf, telefone)]
+    return normalize(" ".join(p for p in parts if p))
+
+
+def _document_for(user):
+    profile = CustomerProfile.objects.filter(user_id=user.pk).values("cpf", "telefone", "cidade").first() or {}
+    return build_document(user.username, user.email, user.first_name, user.last_name, **profile)
+
+
+def index_customer(user_id):
+    if not is_available():
+        return
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        remove_customer(user_id)
+        return
+    document = _document_for(user)
+    with connection.cursor() as cursor:
+        if _vendor() == "postgresql":
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (user_id, document) VALUES (%s, %s) "
+                "ON CONFLICT (user_id) DO UPDATE SET document = EXCLUDED.document",
+                [user_id, document],
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [user_id])
+            cursor.execute(f"INSERT INTO {SQLITE_TABLE} (rowid, document) VALUES (%s, %s)", [user_id, document])
+
+
+def remove_customer(user_id):
+    # No Postgres a linha sai por ON DELETE CASCADE
+    if is_available() and _vendor() == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [user_id])
+
+
+def _terms(text):
+    # Cada palavra precisa aparecer (E)
+    return normalize(text).split()
+
+
+def _like_pattern(term):
+    return "%" + _LIKE_SPECIAL_RE.sub(r"\\\1", term) + "%"
+
+
+def _glob_pattern(term):
+    # GLOB e não LIKE ... ESCAPE: com ESCAPE o FTS5 não usa o índice trigram. O documento e os
+    # termos já estão normalizados em minúsculas, então o GLOB (sensível a caixa) casa igual
+    return "*" + _GLOB_SPECIAL_RE.sub(r"[\1]", term) + "*"
+
+
+def filter_customers(queryset, text):
+    """Restringe `queryset` (de usuários) aos que casam com todas as palavras de `text`."""
+    terms = _terms(text)
+    if not terms:
+        return queryset
+    if not is_available():
+        return queryset.filter(_fallback_q(terms))
+    if _vendor() == "postgresql":
+        sql = f"SELECT user_id FROM {PG_TABLE} WHERE " + " AND ".join(["document LIKE %s"] * len(terms))
+        params = [_like_pattern(t) for t in terms]
+    else:
+        sql = f"SELECT rowid FROM {SQLITE_TABLE} WHERE " + " AND ".join(["document GLOB %s"] * len(terms))
+        params = [_glob_pattern(t) for t in terms]
+    return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+def _fallback_q(terms):
+    q = Q()
+    for term in terms:
+        term_q = Q()
+        for field in ("username", "email", "first_name", "last_name", "profile__cpf", "profile__telefone", "profile__cidade"):
+            term_q |= Q(**{f"{field}__icontains": term})
+        q &= term_q
+    return q
@@ -0,0 +1,218 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from . import images
+from .models import Category, ImageJob, ProductImage
+from .response_cache import invalidate_categories, invalidate_products
+from .storage import is_content_addressed
+
+# Geração de variantes fora da requisição: o upload salva o original e enfileira um ImageJob
+# (na mesma transação); o worker (manage.py image_worker) pega os jobs com UPDATE condicional,
+# decodifica/redimensiona num pool de processos e grava as variantes no registro dono.
+# Sem broker externo: a fila é a tabela shop_imagejob.
+
+# Tipo -> (modelo dono, campo de variantes)
+TARGETS = {
+    ImageJob.PRODUCT_IMAGE: (ProductImage, "variants"),
+    ImageJob.CATEGORY: (Category, "image_variants"),
+}
+
+# Erros do próprio arquivo (não é imagem, grande demais): repetir não adianta
+PERMANENT_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, ValueError)
+
+
+def max_attempts():
+    return getattr(settings, "SHOP_IMAGE_JOB_MAX_ATTEMPTS", 5)
+
+
+def lock_timeout():
+    # Job "processando" há mais que isso é de um worker que morreu: volta a ser elegível
+    return timedelta(seconds=getattr(settings, "SHOP_IMAGE_JOB_TIMEOUT", 600))
+
+
+def retry_delay(attempts):
+    # Espera exponencial entre tentativas: 10s, 20s, 40s...
+    return timedelta(seconds=10 * 2 ** max(attempts - 1, 0))
+
+
+def enqueue(kind, name, object_id=None):
+    """Cria o job; com SHOP_IMAGE_JOBS_EAGER as variantes são geradas na hora (sem worker)."""
+    if is_content_addressed(name):
+        # Mesmo conteúdo já processado (storage endereçado por conteúdo): reaproveita as variantes
+        variants = (
+            ImageJob.objects.filter(name=name, status=ImageJob.DONE)
+            .order_by("-id").values_list("variants", flat=True).first()
+        )
+        if variants:
+            job = ImageJob.objects.create(kind=kind, name=name, object_id=object_id, status=ImageJob.DONE)
+            complete(job, variants)
+            return job
+    job = ImageJob.objects.create(kind=kind, name=name, object_id=object_id)
+    if getattr(settings, "SHOP_IMAGE_JOBS_EAGER", False):
+        run_job(job)
+    return job
+
+
+def schedule(instance, kind):
+    """
+    Chamado quando o arquivo de `instance.image` muda: limpa as variantes do arquivo
+    anterior e enfileira as do novo. O job fica em `instance._image_job` para a resposta.
+    """
+    model, field = TARGETS[kind]
+    previous = getattr(instance, field)
+    if previous:
+        setattr(instance, field, [])
+        model._default_manager.filter(pk=instance.pk).update(**{field: []})
+        transaction.on_commit(lambda: images.delete_variants(previous))
+    job = enqueue(kind, instance.image.name, instance.pk) if instance.image else None
+    if job is not None and job.status == ImageJob.DONE:
+        # Eager ou conteúdo repetido: as variantes já saem na resposta do upload
+        setattr(instance, field, job.variants)
+    instance._image_job = job
+    return job
+
+
+def claim(limit):
+    """Reserva até `limit` jobs prontos para este worker; outros workers não pegam os mesmos."""
+    now = timezone.now()
+    ready = Q(status=ImageJob.PENDING, run_after__lte=now) | Q(status=ImageJob.RUNNING, locked_at__lt=now - lock_timeout())
+    candidates = ImageJob.objects.filter(ready).order_by("id").values_list("pk", "status", "locked_at")[: limit * 2]
+    claimed = []
+    for pk, status, locked_at in candidates:
+        # UPDATE condicional (funciona também no SQLite, sem SELECT ... FOR UPDATE)
+        taken = ImageJob.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+            status=ImageJob.RUNNING, locked_at=now, attempts=F("attempts") + 1, updated_at=now,
+        )
+        if taken:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return list(ImageJob.objects.filter(pk__in=claimed).order_by("id"))
+
+
+def complete(job, variants):
+    now = timezone.now()
+    with transaction.atomic():
+        target = TARGETS.get(job.kind)
+        if target:
+            model, field = target
+            # Só aplica se o registro ainda aponta para este original (trocar a imagem gera outro job)
+            owner = model._default_manager.select_for_update().filter(pk=job.object_id, image=job.name)
+            previous = owner.values_list(field, flat=True).first()
+            if previous is not None:
+                owner.update(**{field: variants})
+                _invalidate(job)
+                # Regeneração: arquivos das variantes anteriores saem depois do commit
+                stale = [v for v in previous if v["name"] not in {n["name"] for n in variants}]
+                if stale:
+                    transaction.on_commit(lambda: images.delete_variants(stale))
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.DONE, variants=variants, locked_at=None, last_error="", updated_at=now,
+        )
+    job.status, job.variants, job.locked_at, job.last_error = ImageJob.DONE, variants, None, ""
+
+
+def fail(job, exc):
+    attempts = ImageJob.objects.filter(pk=job.pk).values_list("attempts", flat=True).first() or 0
+    permanent = isinstance(exc, PERMANENT_ERRORS) or attempts >= max_attempts()
+    fields = {
+        "status": ImageJob.FAILED if permanent else ImageJob.PENDING,
+        "locked_at": None,
+        "last_error": f"{type(exc).__name__}: {exc}"[:2000],
+        "updated_at": timezone.now(),
+    }
+    if not permanent:
+        fields["run_after"] = timezone.now() + retry_delay(attempts)
+    ImageJob.objects.filter(pk=job.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+def _invalidate(job):
+    # As variantes entram nas respostas cacheadas de produtos/categorias
+    if job.kind == ImageJob.PRODUCT_IMAGE:
+        slug = ProductImage.objects.filter(pk=job.object_id).values_list("product__slug", flat=True).first()
+        transaction.on_commit(lambda: invalidate_products(slug))
+    elif job.kind == ImageJob.CATEGORY:
+        transaction.on_commit(invalidate_categories)
+
+
+def run_job(job):
+    """Processa um job neste processo (modo eager e jobs avulsos)."""
+    if job.status != ImageJob.RUNNING:
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.RUNNING, locked_at=timezone.now(), attempts=F("attempts") + 1,
+        )
+    try:
+        variants = images.generate_variants(job.name)
+    except Exception as exc:
+        fail(job, exc)
+    else:
+        complete(job, variants)
+    return job
+
+
+def _pool(processes):
+    # "spawn": os processos filhos não herdam conexões de banco nem threads do pai
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=images.setup_process,
+    )
+
+
+def run_worker(processes=None, once=False, poll_interval=2.0, log=None):
+    """
+    Loop do worker: mantém o pool cheio com jobs reservados e grava os resultados no banco.
+    Com `once`, termina quando a fila esvazia. Retorna (concluídos, falhas).
+    """
+    processes = processes or os.cpu_count() or 1
+    done = failed = 0
+    in_flight = {}
+    pool = _pool(processes)
+    try:
+        while True:
+            if len(in_flight) < processes * 2:
+                for job in claim(processes * 2 - len(in_flight)):
+                    in_flight[pool.submit(images.generate_variants, job.name)] = job
+            if not in_flight:
+                if once:
+                    return done, failed
+                close_old_connections()
+                time.sleep(poll_interval)
+                continue
+            finished, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in finished:
+                job = in_flight.pop(future)
+                try:
+                    variants = future.result()
+                except Exception as exc:
+                    # Processo filho morto (ex.: imagem que derruba o decodificador): o pool é recriado
+                    broken = broken or isinstance(exc, BrokenProcessPool)
+                    fail(job, exc)
+                    if job.status == ImageJob.FAILED:
+                        failed += 1
+                    if log:
+                        log(f"job {job.pk} ({job.name}): {job.last_error}")
+                else:
+                    complete(job, variants)
+                    done += 1
+            if broken:
+                for job in in_flight.values():
+                    fail(job, BrokenProcessPool("pool reiniciado"))
+                in_flight = {}
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _pool(processes)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,131 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Variantes responsivas das imagens enviadas (produtos, categorias, banners): cada original
+# gera cópias em larguras fixas e formatos modernos, salvas ao lado do original
+# ("products/foto.jpg" -> "products/foto-640w.webp"). Os metadados (nome, formato, largura,
+# altura) ficam em JSON no próprio registro, então os serializers montam o srcset sem I/O.
+DEFAULT_WIDTHS = (320, 640, 960, 1280)
+DEFAULT_FORMATS = ("avif", "webp", "jpeg")
+
+# Formato -> (extensão, opções do Pillow). Sem EXIF nas cópias (só o perfil de cor).
+_ENCODERS = {
+    "avif": ("avif", {"quality": 55}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+_FEATURES = {"avif": "avif", "webp": "webp"}
+
+
+def widths():
+    return tuple(sorted(getattr(settings, "SHOP_IMAGE_WIDTHS", DEFAULT_WIDTHS)))
+
+
+def formats():
+    # Formatos sem suporte no Pillow instalado (ex.: AVIF) são ignorados
+    return [
+        fmt for fmt in getattr(settings, "SHOP_IMAGE_FORMATS", DEFAULT_FORMATS)
+        if fmt in _ENCODERS and (fmt not in _FEATURES or features.check(_FEATURES[fmt]))
+    ]
+
+
+def _target_widths(original_width):
+    # Larguras menores que o original, mais uma no tamanho do original (limitado à maior): nunca amplia
+    sizes = [w for w in widths() if w < original_width]
+    top = min(original_width, widths()[-1]) if widths() else original_width
+    if top not in sizes:
+        sizes.append(top)
+    return sizes
+
+
+def _prepare(image, fmt):
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if fmt == "jpeg":
+        if has_alpha:
+            # JPEG não tem transparência: aplica sobre fundo branco
+            rgba = image.convert("RGBA")
+            flat = Image.new("RGB", rgba.size, (255, 255, 255))
+            flat.paste(rgba, mask=rgba.getchannel("A"))
+            return flat
+        return image.convert("RGB")
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _encode(image, fmt, icc_profile):
+    ext, options = _ENCODERS[fmt]
+    buffer = io.BytesIO()
+    if icc_profile:
+        options = {**options, "icc_profile": icc_profile}
+    image.save(buffer, format=fmt.upper(), **options)
+    return ext, buffer.getvalue()
+
+
+def generate_variants(name, storage=None):
+    """
+    Gera as variantes do arquivo `name` do storage e retorna seus metadados:
+    [{"name", "format", "width", "height"}], em ordem de formato e largura.
+    """
+    storage = storage or default_storage
+    with storage.open(name, "rb") as fh:
+        with Image.open(fh) as source:
+            # Aplica a orientação do EXIF antes de descartá-lo
+            image = ImageOps.exif_transpose(source)
+            image.load()
+            icc_profile = source.info.get("icc_profile")
+    root, _ = os.path.splitext(name)
+    variants = []
+    for width in _target_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats():
+            ext, data = _encode(_prepare(resized, fmt), fmt, icc_profile)
+            saved = storage.save(f"{root}-{width}w.{ext}", ContentFile(data))
+            variants.append({"name": saved, "format": fmt, "width": width, "height": height})
+    order = {fmt: i for i, fmt in enumerate(formats())}
+    variants.sort(key=lambda v: (order.get(v["format"], len(order)), v["width"]))
+    return variants
+
+
+def safe_generate_variants(name, storage=None):
+    """Como generate_variants, mas lista vazia se o arquivo não é uma imagem legível."""
+    try:
+        return generate_variants(name, storage)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return []
+
+
+def variants_for_field(field_file):
+    """Variantes de um ImageField/FileField (lista vazia sem arquivo)."""
+    if not field_file:
+        return []
+    return safe_generate_variants(field_file.name, field_file.storage)
+
+
+def srcset(variants, storage=None):
+    """Metadados salvos -> lista para a API: [{"url", "format", "width", "height"}]."""
+    storage = storage or default_storage
+    return [
+        {"url": storage.url(v["name"]), "format": v["format"], "width": v["width"], "height": v["height"]}
+        for v in variants or []
+    ]
+
+
+def delete_variants(variants, storage=None):
+    storage = storage or default_storage
+    for variant in variants or []:
+        try:
+            storage.delete(variant["name"])
+        except OSError:
+            pass
+
+
+def setup_process():
+    """Inicializador dos processos do pool de shop.image_jobs (multiprocessing "spawn")."""
+    import django
+
+    django.setup()
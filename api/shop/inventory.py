@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import autocomplete
+from .models import Order, OrderItem, Product
+from .response_cache import invalidate_products
+
+# Reserva de estoque por UPDATE condicional (stock_quantity >= qty): só a linha do produto
+# é bloqueada, e nunca fica negativa mesmo com checkouts concorrentes.
+
+
+class OutOfStock(Exception):
+    def __init__(self, shortages):
+        super().__init__("Estoque insuficiente")
+        self.shortages = shortages
+
+
+def _invalidate_after_commit(product_ids):
+    # UPDATE não dispara sinais: invalida cache/validadores da vitrine e o autocomplete manualmente
+    if not product_ids:
+        return
+
+    def run():
+        invalidate_products(*Product.objects.filter(pk__in=product_ids).values_list("slug", flat=True))
+        autocomplete.refresh_stock(product_ids)
+
+    transaction.on_commit(run)
+
+
+def _invalidate_sold_out_after_commit(product_ids):
+    # Checkout só muda a vitrine quando o produto esgota (some da lista e do autocomplete); o
+    # saldo exibido nas respostas cacheadas pode atrasar até o timeout do cache
+    def run():
+        sold_out = dict(
+            Product.objects.filter(pk__in=product_ids, track_inventory=True, stock_quantity__lte=0)
+            .values_list("pk", "slug")
+        )
+        if sold_out:
+            invalidate_products(*sold_out.values())
+            autocomplete.refresh_stock(sold_out)
+
+    transaction.on_commit(run)
+
+
+def reserve(lines):
+    """
+    Baixa o estoque de `lines` = [(índice, produto, quantidade)].
+    Retorna a lista de faltas por linha; o chamador deve desfazer a transação se houver alguma.
+    """
+    wanted = OrderedDict()
+    for index, product, qty in lines:
+        if product is None or not product.track_inventory:
+            continue
+        entry = wanted.setdefault(product.pk, {"product": product, "qty": 0, "lines": []})
+        entry["qty"] += qty
+        entry["lines"].append((index, qty))
+
+    if not wanted:
+        return []
+    quantities = {pk: entry["qty"] for pk, entry in wanted.items()}
+    short = set()
+    for _attempt in range(3):
+        if _decrement(quantities):
+            _invalidate_sold_out_after_commit(list(quantities))
+            return []
+        # Alguma linha não tinha saldo: o savepoint já desfez as outras; descobre quais faltam
+        state = {
+            pk: (stock, tracked)
+            for pk, stock, tracked in Product.objects.filter(pk__in=list(quantities))
+            .values_list("pk", "stock_quantity", "track_inventory")
+        }
+        available = {pk: stock for pk, (stock, _tracked) in state.items()}
+        short = {pk for pk, qty in quantities.items() if pk not in state or (state[pk][1] and state[pk][0] < qty)}
+        if short:
+            break
+        # Produto deixou de controlar estoque, ou o saldo voltou entre o UPDATE e a leitura: tenta de novo
+        quantities = {pk: qty for pk, qty in quantities.items() if state[pk][1]}
+        if not quantities:
+            return []
+    else:
+        short = set(quantities)
+    shortages = []
+    for pk in short:
+        entry = wanted[pk]
+        for index, qty in entry["lines"]:
+            shortages.append({
+                "index": index,
+                "product_id": pk,
+                "title": entry["product"].title,
+                "requested": qty,
+                "available": max(available.get(pk, 0), 0),
+            })
+    return sorted(shortages, key=lambda s: s["index"])
+
+
+def _decrement(quantities):
+    """Um único UPDATE condicional para todas as linhas; tudo ou nada (savepoint)."""
+    qty = Case(*[When(pk=pk, then=Value(q)) for pk, q in quantities.items()], output_field=IntegerField())
+    with transaction.atomic():
+        if len(quantities) > 1:
+            # Trava só as linhas envolvidas, sempre na mesma ordem (evita deadlock entre checkouts)
+            list(Product.objects.select_for_update().filter(pk__in=list(quantities)).order_by("pk").values_list("pk", flat=True))
+        updated = (
+            Product.objects.filter(pk__in=list(quantities), track_inventory=True, stock_quantity__gte=qty)
+            .update(stock_quantity=F("stock_quantity") - qty, updated_at=timezone.now())
+        )
+        if updated != len(quantities):
+            transaction.set_rollback(True)
+            return False
+    return True
+
+
+def _order_quantities(order):
+    rows = (
+        OrderItem.objects.filter(order=order, product__isnull=False, product__track_inventory=True)
+        .values_list("product_id", "quantity")
+    )
+    totals = {}
+    for product_id, qty in rows:
+        totals[product_id] = totals.get(product_id, 0) + qty
+    return totals
+
+
+def release_order(order):
+    """Devolve ao estoque o que o pedido reservou. Idempotente: só a primeira chamada devolve."""
+    with transaction.atomic():
+        if not Order.objects.filter(pk=order.pk, stock_reserved=True).update(stock_reserved=False):
+            return False
+        order.stock_reserved = False
+        totals = _order_quantities(order)
+        now = timezone.now()
+        for pk in sorted(totals):
+            Product.objects.filter(pk=pk).update(stock_quantity=F("stock_quantity") + totals[pk], updated_at=now)
+        _invalidate_after_commit(list(totals))
+    return True
+
+
+def reserve_order(order):
+    """Reserva de novo o estoque de um pedido já gravado (ex.: pedido cancelado reaberto)."""
+    with transaction.atomic():
+        if order.stock_reserved:
+            return []
+        totals = _order_quantities(order)
+        products = Product.objects.in_bulk(list(totals))
+        shortages = reserve([(pk, products.get(pk), qty) for pk, qty in totals.items()])
+        if shortages:
+            transaction.set_rollback(True)
+            return shortages
+        Order.objects.filter(pk=order.pk).update(stock_reserved=True)
+        order.stock_reserved = True
+    return []
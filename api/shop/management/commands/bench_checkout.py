@@ -0,0 +1,60 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from shop.models import Category, Order, Product
+from shop.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = "Mede o checkout (OrderSerializer): pedidos/s e queries por pedido para carrinhos de 1, 10 e 50 itens."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=200, help="Pedidos por tamanho de carrinho")
+        parser.add_argument("--sizes", default="1,10,50", help="Tamanhos de carrinho separados por vírgula")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        n_orders = options["orders"]
+        User = get_user_model()
+        user = User.objects.create(username=f"bench-checkout-{time.time_ns()}")
+        category = Category.objects.create(name="Bench checkout")
+        products = [
+            Product.objects.create(
+                title=f"Bench checkout {i} {user.pk}",
+                slug=f"bench-checkout-{user.pk}-{i}",
+                category=category,
+                price=Decimal("19.90"),
+                stock_quantity=10 ** 6,
+            )
+            for i in range(max(sizes))
+        ]
+        try:
+            self.stdout.write(f"{'itens':>6} {'pedidos':>8} {'pedidos/s':>10} {'queries/pedido':>15}")
+            for size in sizes:
+                payload = {
+                    "payment_method": "pix",
+                    "items": [
+                        {"product_id": p.id, "title": p.title, "unit_price": "19.90", "quantity": 2}
+                        for p in products[:size]
+                    ],
+                }
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    for _ in range(n_orders):
+                        serializer = OrderSerializer(data=payload, context={"request": None})
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save(user=user)
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{size:>6} {n_orders:>8} {n_orders / elapsed:>10.1f} {len(ctx.captured_queries) / n_orders:>15.1f}"
+                )
+        finally:
+            Order.objects.filter(user=user).delete()
+            Product.objects.filter(pk__in=[p.pk for p in products]).delete()
+            category.delete()
+            user.delete()
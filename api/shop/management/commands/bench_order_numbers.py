@@ -0,0 +1,57 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shop.models import Order, OrderNumberCounter
+from shop.order_numbers import next_order_number
+
+
+class Command(BaseCommand):
+    help = "Insere muitos pedidos num mesmo dia e mede a geração de números (pedidos/s e queries por pedido)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=50000, help="Pedidos a inserir")
+        # Dia fictício para não consumir a numeração real de hoje
+        parser.add_argument("--day", default="991231", help="Dia (YYMMDD) usado na numeração")
+        parser.add_argument("--report-every", type=int, default=10000, help="Intervalo entre parciais")
+
+    @staticmethod
+    def _counter(queries):
+        # CaptureQueriesContext guarda no máximo 9000 queries; aqui só contamos
+        def wrapper(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def handle(self, *args, **options):
+        n_orders = options["orders"]
+        day = options["day"]
+        every = max(1, options["report_every"])
+        User = get_user_model()
+        user = User.objects.create(username=f"bench-order-numbers-{time.time_ns()}")
+        numbers = set()
+        try:
+            self.stdout.write(f"{'pedidos':>8} {'pedidos/s':>10} {'queries/pedido':>15} {'último número':>18}")
+            done = 0
+            while done < n_orders:
+                batch = min(every, n_orders - done)
+                queries = [0]
+                with connection.execute_wrapper(self._counter(queries)):
+                    started = time.perf_counter()
+                    for _ in range(batch):
+                        order = Order.objects.create(user=user, order_number=next_order_number(day))
+                        numbers.add(order.order_number)
+                    elapsed = time.perf_counter() - started
+                done += batch
+                self.stdout.write(
+                    f"{done:>8} {batch / elapsed:>10.1f} {queries[0] / batch:>15.2f} {order.order_number:>18}"
+                )
+            if len(numbers) != n_orders:
+                raise CommandError(f"Números repetidos: {n_orders - len(numbers)}")
+            self.stdout.write(self.style.SUCCESS(f"{n_orders} pedidos, {len(numbers)} números distintos."))
+        finally:
+            Order.objects.filter(user=user).delete()
+            OrderNumberCounter.objects.filter(day=day).delete()
+            user.delete()
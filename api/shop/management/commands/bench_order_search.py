@@ -0,0 +1,124 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+
+from shop import customer_search
+from shop.models import CustomerProfile, Order
+from shop.views import OrderViewSet
+
+CITIES = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Recife", "Porto Alegre"]
+STATUSES = ["pending", "paid", "separation", "shipped", "delivered", "cancelled"]
+
+
+class Command(BaseCommand):
+    help = "Popula pedidos sintéticos e mede a latência da busca de pedidos do admin (/admin/orders/search/)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=200000, help="Pedidos sintéticos (ex.: 1000000)")
+        parser.add_argument("--customers", type=int, default=5000, help="Clientes sintéticos")
+        parser.add_argument("--repeat", type=int, default=20, help="Execuções por consulta")
+
+    def handle(self, *args, **options):
+        tag = f"bos{time.time_ns() % 10 ** 8}"
+        try:
+            users = self._seed(tag, options["customers"], options["orders"])
+            admin = get_user_model().objects.create(username=f"{tag}-admin", is_staff=True)
+            sample = users[len(users) // 2]
+            day = timezone.localdate() - timedelta(days=30)
+            order_number = Order.objects.filter(user=sample).values_list("order_number", flat=True).first()
+            queries = [
+                ("prefixo do número", {"q": order_number[:12]}),
+                ("número completo", {"q": order_number}),
+                ("nome do cliente", {"q": sample.first_name}),
+                ("e-mail parcial", {"q": sample.email.split("@")[0]}),
+                ("CPF (dígitos)", {"q": sample.profile.cpf.replace(".", "").replace("-", "")}),
+                ("status + período", {"status": "shipped", "from": day.isoformat(), "to": (day + timedelta(days=7)).isoformat()}),
+                ("sem filtro", {}),
+            ]
+            # Mesmos initkwargs que o router passa para a action (paginação keyset, permissões)
+            view = OrderViewSet.as_view({"get": "search"}, **OrderViewSet.search.kwargs)
+            factory = RequestFactory(HTTP_HOST=(settings.ALLOWED_HOSTS or ["localhost"])[0].lstrip("."))
+            self.stdout.write(f"{'consulta':<20} {'mediana ms':>11} {'p95 ms':>8} {'itens':>6}")
+            for label, params in queries:
+                timings = []
+                for _ in range(options["repeat"]):
+                    request = factory.get("/api/admin/orders/search/", params)
+                    force_authenticate(request, user=admin)
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f"{label:<20} {statistics.median(timings):>11.1f} {p95:>8.1f} {len(response.data['results']):>6}"
+                )
+        finally:
+            Order.objects.filter(user__username__startswith=f"{tag}-").delete()
+            for user in get_user_model().objects.filter(username__startswith=f"{tag}-"):
+                customer_search.remove_customer(user.pk)
+            get_user_model().objects.filter(username__startswith=f"{tag}-").delete()
+
+    def _seed(self, tag, n_customers, n_orders):
+        User = get_user_model()
+        rnd = random.Random(42)
+        started = time.perf_counter()
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(
+                    username=f"{tag}-{i}", email=f"cliente{i}.{tag}@exemplo.com",
+                    first_name=f"Cliente{i}", last_name=rnd.choice(["Silva", "Souza", "Conceição", "Oliveira"]),
+                )
+                for i in range(n_customers)
+            ], batch_size=1000)
+            users = list(User.objects.filter(username__startswith=f"{tag}-").order_by("pk"))
+            CustomerProfile.objects.bulk_create([
+                CustomerProfile(
+                    user=u, cpf=f"{rnd.randrange(10 ** 11):011d}", telefone=f"11{rnd.randrange(10 ** 9):09d}",
+                    cidade=rnd.choice(CITIES),
+                )
+                for u in users
+            ], batch_size=1000)
+            # bulk_create não dispara sinais: indexa a busca de clientes aqui
+            for u in users:
+                customer_search.index_customer(u.pk)
+        # Datas espalhadas por um ano: com auto_now_add todos os pedidos seriam "agora"
+        created_field = Order._meta.get_field("created_at")
+        created_field.auto_now_add = False
+        try:
+            self._seed_orders(users, n_orders, rnd)
+        finally:
+            created_field.auto_now_add = True
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        self.stdout.write(f"{n_orders} pedidos e {n_customers} clientes em {time.perf_counter() - started:.1f}s")
+        return users
+
+    def _seed_orders(self, users, n_orders, rnd):
+        now = timezone.now()
+        batch = []
+        for i in range(n_orders):
+            created = now - timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+            batch.append(Order(
+                user=users[rnd.randrange(len(users))],
+                # Sufixo de 9 dígitos começando em 9: não colide com a numeração real do dia
+                order_number=f"LIV-{created:%y%m%d}-9{i:08d}",
+                status=rnd.choice(STATUSES),
+                total=rnd.randrange(1000, 100000) / 100,
+                created_at=created,
+            ))
+            if len(batch) >= 5000:
+                Order.objects.bulk_create(batch, batch_size=1000)
+                batch = []
+        if batch:
+            Order.objects.bulk_create(batch, batch_size=1000)
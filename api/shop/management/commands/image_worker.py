@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from shop import image_jobs
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de variantes de imagens (shop.image_jobs): gera as variantes num pool de processos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=None, help="Processos do pool (padrão: núcleos da máquina)")
+        parser.add_argument("--poll", type=float, default=2.0, help="Intervalo (s) entre consultas com a fila vazia")
+        parser.add_argument("--once", action="store_true", help="Processa o que está na fila e termina")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker de imagens iniciado")
+        try:
+            done, failed = image_jobs.run_worker(
+                processes=options["processes"], once=options["once"], poll_interval=options["poll"],
+                log=lambda message: self.stderr.write(message),
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(f"{done} jobs concluídos, {failed} com falha")
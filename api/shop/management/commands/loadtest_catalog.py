@@ -0,0 +1,271 @@
+import asyncio
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.models import Category, Product, ProductImage
+
+DEFAULT_PATHS = "/api/categories/,/api/products/,/api/products/{slug}/,/api/admin/site-setting/"
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.non_2xx = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga da leitura do catálogo (categorias, produtos, detalhe, configuração): "
+        "com --compare sobe WSGI síncrono (gunicorn gthread) e ASGI async (uvicorn) e compara "
+        "vazão e p99 com N conexões simultâneas; com --url mede um servidor já rodando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Servidor já rodando (ex.: http://127.0.0.1:8000)")
+        parser.add_argument("--compare", action="store_true", help="Sobe e mede cada servidor de --modes, um de cada vez")
+        parser.add_argument(
+            "--modes", default="wsgi,asgi-sync,asgi",
+            help="Servidores do --compare: wsgi (gunicorn), asgi-sync (uvicorn, views DRF), asgi (uvicorn, views async)",
+        )
+        parser.add_argument("--port", type=int, default=8765, help="Porta dos servidores do --compare")
+        parser.add_argument("--workers", type=int, default=2, help="Processos de cada servidor")
+        parser.add_argument("--threads", type=int, default=8, help="Threads por processo do WSGI (gthread)")
+        parser.add_argument("--concurrency", type=int, default=500, help="Conexões simultâneas (keep-alive)")
+        parser.add_argument("--duration", type=float, default=15.0, help="Segundos de medição")
+        parser.add_argument("--warmup", type=float, default=2.0, help="Segundos de aquecimento (não medidos)")
+        parser.add_argument("--paths", default=DEFAULT_PATHS, help="Caminhos por vírgula; {slug} = produto semeado")
+        parser.add_argument("--products", type=int, default=200, help="Produtos sintéticos semeados para o teste")
+        parser.add_argument(
+            "--no-cache", action="store_true",
+            help="Parâmetro único por requisição: ignora o cache de respostas e mede o caminho até o banco",
+        )
+        parser.add_argument(
+            "--slow-clients", type=float, default=0.0,
+            help="Fração das conexões que enviam o pedido aos poucos (cliente lento, ex.: 0.2)",
+        )
+        parser.add_argument("--trickle-ms", type=int, default=200, help="Atraso do cliente lento entre as partes do pedido")
+
+    def handle(self, *args, **options):
+        if not options["url"] and not options["compare"]:
+            raise CommandError("Informe --url ou --compare.")
+        unknown = {m.strip() for m in options["modes"].split(",") if m.strip()} - {"wsgi", "asgi-sync", "asgi"}
+        if unknown:
+            raise CommandError(f"--modes desconhecidos: {', '.join(sorted(unknown))}")
+        # Cada conexão é um descritor de arquivo (aqui e nos servidores)
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        tag = f"lt{time.time_ns() % 10 ** 8}"
+        try:
+            slug = self._seed(tag, options["products"])
+            paths = [p.strip().format(slug=slug) for p in options["paths"].split(",") if p.strip()]
+            results = []
+            if options["url"]:
+                results.append((options["url"], self._measure(options["url"], paths, options)))
+            else:
+                for mode in [m.strip() for m in options["modes"].split(",") if m.strip()]:
+                    with self._server(mode, options):
+                        url = f"http://127.0.0.1:{options['port']}"
+                        results.append((mode, self._measure(url, paths, options)))
+            self._report(results, options)
+        finally:
+            Product.objects.filter(slug__startswith=f"{tag}-").delete()
+            Category.objects.filter(slug__startswith=f"{tag}-").delete()
+
+    def _seed(self, tag, n):
+        category = Category.objects.create(name=f"{tag} carga", slug=f"{tag}-carga")
+        products = Product.objects.bulk_create([
+            Product(
+                title=f"Produto carga {i}", slug=f"{tag}-produto-{i}", category=category,
+                price=Decimal("49.90"), stock_quantity=10, available_colors="Azul,Verde", available_sizes="P,M,G",
+            )
+            for i in range(n)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=p, image=f"products/{tag}-{p.pk}.jpg", is_primary=True) for p in products
+        ])
+        return products[0].slug
+
+    def _server(self, mode, options):
+        port = str(options["port"])
+        env = {**os.environ, "DEBUG": "False", "SHOP_ASYNC_CATALOG": "True" if mode == "asgi" else "False"}
+        if mode == "wsgi":
+            cmd = [
+                sys.executable, "-m", "gunicorn", "api.wsgi:application", "-k", "gthread",
+                "-w", str(options["workers"]), "--threads", str(options["threads"]),
+                "-b", f"127.0.0.1:{port}", "--backlog", "4096", "--log-level", "warning",
+            ]
+        else:
+            cmd = [
+                sys.executable, "-m", "uvicorn", "api.asgi:application", "--workers", str(options["workers"]),
+                "--host", "127.0.0.1", "--port", port, "--backlog", "4096", "--log-level", "warning",
+                "--no-access-log",
+            ]
+        return _Server(cmd, env, str(settings.BASE_DIR), f"http://127.0.0.1:{port}/api/admin/site-setting/")
+
+    def _measure(self, url, paths, options):
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        self.stdout.write(f"{url}: {options['concurrency']} conexões por {options['duration']:.0f}s...")
+        return asyncio.run(_load(host, port, paths, options))
+
+    def _report(self, results, options):
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'servidor':<28} {'requisições':>11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'máx ms':>8} {'erros':>6} {'não-2xx':>8}"
+        )
+        for label, stats in results:
+            lat = sorted(stats.latencies)
+            if lat:
+                p50 = statistics.median(lat) * 1000
+                p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000
+                worst = lat[-1] * 1000
+            else:
+                p50 = p99 = worst = 0.0
+            self.stdout.write(
+                f"{label:<28} {len(lat):>11} {len(lat) / options['duration']:>8.0f} {p50:>8.1f} {p99:>8.1f} "
+                f"{worst:>8.1f} {stats.errors:>6} {stats.non_2xx:>8}"
+            )
+
+
+class _Server:
+    """Sobe o servidor num subprocesso e espera responder; derruba na saída do with."""
+
+    def __init__(self, cmd, env, cwd, health_url):
+        self.cmd, self.env, self.cwd, self.health_url = cmd, env, cwd, health_url
+        self.process = None
+
+    def __enter__(self):
+        try:
+            self.process = subprocess.Popen(self.cmd, env=self.env, cwd=self.cwd)
+        except OSError as exc:
+            raise CommandError(f"Não foi possível iniciar {self.cmd[2]}: {exc}")
+        parts = urlsplit(self.health_url)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f"{self.cmd[2]} terminou ao iniciar (instalado? pip install -r requirements.txt)")
+            try:
+                status = asyncio.run(_probe(parts.hostname, parts.port, parts.path))
+            except OSError:
+                status = None
+            if status == 200:
+                return self
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise CommandError(f"{self.cmd[2]} não respondeu em 30s")
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def _request_bytes(host, port, path):
+    return f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: application/json\r\n\r\n".encode()
+
+
+async def _read_response(reader):
+    """Lê uma resposta HTTP/1.1 (Content-Length ou chunked); retorna (status, manter conexão)."""
+    status_line = await reader.readuntil(b"\r\n")
+    status = int(status_line.split(b" ", 2)[1])
+    headers = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def _probe(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_request_bytes(host, port, path))
+        await writer.drain()
+        status, _ = await asyncio.wait_for(_read_response(reader), timeout=5)
+        return status
+    finally:
+        writer.close()
+
+
+async def _load(host, port, paths, options):
+    stats = Stats()
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + options["warmup"]
+    deadline = measure_from + options["duration"]
+    n_slow = int(options["concurrency"] * options["slow_clients"])
+    counter = iter(range(10 ** 12))
+
+    async def connection(index):
+        slow = index < n_slow
+        reader = writer = None
+        i = index
+        while loop.time() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            if options["no_cache"]:
+                path += ("&" if "?" in path else "?") + f"_lt={next(counter)}"
+            started = loop.time()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                request = _request_bytes(host, port, path)
+                if slow:
+                    # Cliente lento: a primeira linha chega, o resto só depois do atraso
+                    head, rest = request.split(b"\r\n", 1)
+                    writer.write(head + b"\r\n")
+                    await writer.drain()
+                    await asyncio.sleep(options["trickle_ms"] / 1000)
+                    request = rest
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await _read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                if started >= measure_from:
+                    stats.errors += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                await asyncio.sleep(0.05)
+                continue
+            finished = loop.time()
+            # Latência medida nas conexões normais: o efeito dos lentos aparece nelas
+            if not slow and measure_from <= started and finished <= deadline:
+                stats.latencies.append(finished - started)
+                if not 200 <= status < 300:
+                    stats.non_2xx += 1
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    await asyncio.gather(*(connection(i) for i in range(options["concurrency"])))
+    return stats
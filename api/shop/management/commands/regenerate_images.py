@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shop import image_jobs
+from shop.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = "Regenera as variantes de todas as imagens de produtos e categorias, em paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=None, help="Processos do pool (padrão: núcleos da máquina)")
+        parser.add_argument("--missing", action="store_true", help="Só imagens ainda sem variantes")
+        parser.add_argument("--enqueue-only", action="store_true", help="Só enfileira (o image_worker processa)")
+
+    def handle(self, *args, **options):
+        jobs = []
+        for kind, (model, field) in image_jobs.TARGETS.items():
+            queryset = model._default_manager.exclude(image="").exclude(image__isnull=True)
+            if options["missing"]:
+                queryset = queryset.filter(**{field: []})
+            # Imagens que já têm job na fila não ganham outro
+            queued = ImageJob.objects.filter(kind=kind, status__in=[ImageJob.PENDING, ImageJob.RUNNING])
+            queryset = queryset.exclude(pk__in=queued.values("object_id"))
+            jobs.extend(
+                ImageJob(kind=kind, object_id=pk, name=name)
+                for pk, name in queryset.values_list("pk", "image").iterator()
+            )
+        with transaction.atomic():
+            ImageJob.objects.bulk_create(jobs, batch_size=1000)
+        self.stdout.write(f"{len(jobs)} imagens enfileiradas")
+        if options["enqueue_only"] or not jobs:
+            return
+        started = time.perf_counter()
+        done, failed = image_jobs.run_worker(
+            processes=options["processes"], once=True, log=lambda message: self.stderr.write(message),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{done} concluídas, {failed} com falha em {elapsed:.1f}s ({done / max(elapsed, 1e-9):.1f} imagens/s)")
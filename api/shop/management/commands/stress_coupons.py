@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count
+
+from shop import coupons
+from shop.models import Category, Coupon, CouponRedemption, Order, Product
+from shop.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkouts concorrentes (threads) disputando o mesmo cupom; falha se o cupom for usado "
+        "acima de max_uses ou algum cliente passar do limite por cliente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-uses", type=int, default=50, help="Usos totais do cupom")
+        parser.add_argument("--per-customer", type=int, default=2, help="Usos por cliente (0 = ilimitado)")
+        parser.add_argument("--customers", type=int, default=40, help="Clientes distintos, repartidos entre as threads")
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=20, help="Checkouts por thread")
+
+    def handle(self, *args, **options):
+        tag = f"stress-cupom-{time.time_ns()}"
+        User = get_user_model()
+        users = [User.objects.create(username=f"{tag}-{i}") for i in range(max(options["customers"], 1))]
+        category = Category.objects.create(name="Stress cupom")
+        product = Product.objects.create(
+            title=f"Stress cupom {users[0].pk}", slug=tag, category=category,
+            price=Decimal("100.00"), stock_quantity=0, track_inventory=False,
+        )
+        coupon = Coupon.objects.create(
+            code=tag.upper(), discount_type=Coupon.PERCENT, value=Decimal("10"),
+            max_uses=options["max_uses"], max_uses_per_customer=options["per_customer"],
+        )
+        payload = {
+            "coupon_code": coupon.code,
+            "items": [{"product_id": product.pk, "title": product.title, "unit_price": "100.00", "quantity": 1}],
+        }
+        counts = Counter()
+        lock = threading.Lock()
+        start = threading.Barrier(options["threads"])
+
+        def worker(index):
+            start.wait()
+            try:
+                for attempt in range(options["attempts"]):
+                    # Cada cliente aparece em várias threads ao mesmo tempo
+                    user = users[(index + attempt * options["threads"]) % len(users)]
+                    try:
+                        serializer = OrderSerializer(data=payload, context={"request": None})
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save(user=user)
+                        key = "ok"
+                    except coupons.CouponUnavailable as e:
+                        key = e.reason
+                    except OperationalError:
+                        # SQLite serializa escritas e pode estourar o timeout de lock
+                        key = "errors"
+                    with lock:
+                        counts[key] += 1
+            finally:
+                connection.close()
+
+        try:
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(options["threads"])]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+            coupon.refresh_from_db()
+            orders = Order.objects.filter(coupon_code=coupon.code).count()
+            redemptions = CouponRedemption.objects.filter(coupon=coupon)
+            per_customer = max(redemptions.values("user").annotate(n=Count("id")).values_list("n", flat=True), default=0)
+            self.stdout.write(
+                " ".join(f"{key}={value}" for key, value in sorted(counts.items()))
+                + f" em {elapsed:.2f}s; max_uses={coupon.max_uses} used_count={coupon.used_count} "
+                f"pedidos={orders} resgates={redemptions.count()} maior uso por cliente={per_customer}"
+            )
+            if coupon.used_count > coupon.max_uses or not coupon.used_count == orders == redemptions.count():
+                raise CommandError("Cupom inconsistente: uso acima de max_uses ou contador diferente do livro.")
+            if coupon.max_uses_per_customer and per_customer > coupon.max_uses_per_customer:
+                raise CommandError("Cliente usou o cupom acima do limite por cliente.")
+            self.stdout.write(self.style.SUCCESS("OK: limites do cupom nunca foram ultrapassados."))
+        finally:
+            Order.objects.filter(user__in=users).delete()
+            coupon.delete()
+            product.delete()
+            category.delete()
+            for user in users:
+                user.delete()
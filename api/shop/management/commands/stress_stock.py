@@ -0,0 +1,77 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from shop import inventory
+from shop.models import Category, Order, Product
+from shop.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = "Checkouts concorrentes (threads) disputando o mesmo estoque; falha se houver venda acima do estoque."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stock", type=int, default=50, help="Estoque inicial do produto")
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=20, help="Checkouts por thread")
+        parser.add_argument("--qty", type=int, default=1, help="Quantidade por pedido")
+
+    def handle(self, *args, **options):
+        stock, qty = options["stock"], options["qty"]
+        User = get_user_model()
+        user = User.objects.create(username=f"stress-stock-{time.time_ns()}")
+        category = Category.objects.create(name="Stress estoque")
+        product = Product.objects.create(
+            title=f"Stress estoque {user.pk}", slug=f"stress-estoque-{user.pk}", category=category,
+            price=Decimal("10.00"), stock_quantity=stock, track_inventory=True,
+        )
+        payload = {"items": [{"product_id": product.pk, "title": product.title, "unit_price": "10.00", "quantity": qty}]}
+        counts = {"ok": 0, "out_of_stock": 0, "errors": 0}
+        lock = threading.Lock()
+        start = threading.Barrier(options["threads"])
+
+        def worker():
+            start.wait()
+            try:
+                for _ in range(options["attempts"]):
+                    try:
+                        serializer = OrderSerializer(data=payload, context={"request": None})
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save(user=user)
+                        key = "ok"
+                    except inventory.OutOfStock:
+                        key = "out_of_stock"
+                    except OperationalError:
+                        # SQLite serializa escritas e pode estourar o timeout de lock
+                        key = "errors"
+                    with lock:
+                        counts[key] += 1
+            finally:
+                connection.close()
+
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+            product.refresh_from_db()
+            sold = Order.objects.filter(user=user).count() * qty
+            self.stdout.write(
+                f"pedidos ok={counts['ok']} sem_estoque={counts['out_of_stock']} erros={counts['errors']} "
+                f"em {elapsed:.2f}s; estoque inicial={stock} vendido={sold} final={product.stock_quantity}"
+            )
+            if product.stock_quantity < 0 or sold > stock or product.stock_quantity != stock - sold:
+                raise CommandError("Estoque inconsistente: houve venda acima do disponível.")
+            self.stdout.write(self.style.SUCCESS("OK: estoque nunca ficou negativo."))
+        finally:
+            Order.objects.filter(user=user).delete()
+            product.delete()
+            category.delete()
+            user.delete()
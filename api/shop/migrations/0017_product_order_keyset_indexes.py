@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0016_category_group_title'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='shop_order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', 'id'], name='shop_product_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from django.db import OperationalError, migrations
+
+# Índices de busca textual de Product (ver shop.search). Mantidos por SQL bruto
+# porque dependem do banco: tsvector + GIN no Postgres, FTS5 no SQLite.
+
+PG_DOCUMENT_SQL = (
+    "setweight(to_tsvector('shop_pt', coalesce(p.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(p.sku, '')), 'A') || "
+    "setweight(to_tsvector('shop_pt', coalesce(p.brand, '')), 'B') || "
+    "setweight(to_tsvector('shop_pt', replace(coalesce(p.tags, ''), ',', ' ')), 'B') || "
+    "setweight(to_tsvector('shop_pt', coalesce(p.description, '')), 'C')"
+)
+
+PG_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'shop_pt') THEN
+            CREATE TEXT SEARCH CONFIGURATION shop_pt (COPY = pg_catalog.portuguese);
+            ALTER TEXT SEARCH CONFIGURATION shop_pt
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END
+    $$;
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS shop_product_search (
+        product_id bigint PRIMARY KEY REFERENCES shop_product(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS shop_product_search_doc_gin ON shop_product_search USING GIN (document)",
+    f"INSERT INTO shop_product_search (product_id, document) SELECT p.id, {PG_DOCUMENT_SQL} FROM shop_product p "
+    "ON CONFLICT (product_id) DO NOTHING",
+]
+
+PG_BACKWARD = [
+    "DROP TABLE IF EXISTS shop_product_search",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS shop_pt",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS shop_product_fts USING fts5("
+    "title, sku, brand, tags, description, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO shop_product_fts (rowid, title, sku, brand, tags, description) "
+    "SELECT id, title, sku, brand, tags, description FROM shop_product",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS shop_product_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, PG_FORWARD)
+    elif vendor == "sqlite":
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite sem FTS5: a busca cai no filtro icontains (shop.search._fallback_ids)
+            pass
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, PG_BACKWARD)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0017_product_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
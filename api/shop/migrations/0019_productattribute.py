@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:36
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+# Cópias congeladas de shop.attributes (split_csv, parse_colors, value_key): a migração não
+# pode mudar junto com o código da aplicação
+_COLOR_RE = re.compile(r'^(#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})|rgb\(|hsl\()')
+
+
+def split_csv(text):
+    if not text:
+        return []
+    parts = []
+    for ch in [',', ';']:
+        if ch in text:
+            parts = [p.strip() for p in text.split(ch)]
+            break
+    if not parts:
+        parts = [text.strip()]
+    return [p for p in parts if p]
+
+
+def parse_colors(text):
+    out = []
+    for it in split_csv(text or ''):
+        s = (it or '').strip()
+        if '|' in s or ':' in s:
+            name, hexv = s.split('|' if '|' in s else ':', 1)
+            out.append({'name': name.strip(), 'hex': hexv.strip() or None})
+        elif _COLOR_RE.match(s):
+            out.append({'name': s, 'hex': s})
+        else:
+            out.append({'name': s, 'hex': None})
+    return out
+
+
+def value_key(value):
+    return slugify(value or '')[:120]
+
+
+def backfill_attributes(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    ProductAttribute = apps.get_model('shop', 'ProductAttribute')
+    rows = []
+    for p in Product.objects.only('id', 'available_colors', 'available_sizes', 'tags').iterator(chunk_size=500):
+        for pos, color in enumerate(parse_colors(p.available_colors)):
+            rows.append(ProductAttribute(
+                product_id=p.id, kind='color', value=color['name'][:120], value_key=value_key(color['name']),
+                hex=(color['hex'] or '')[:32], position=pos,
+            ))
+        for kind, text in (('size', p.available_sizes), ('tag', p.tags)):
+            for pos, value in enumerate(split_csv(text or '')):
+                rows.append(ProductAttribute(product_id=p.id, kind=kind, value=value[:120], value_key=value_key(value), position=pos))
+        if len(rows) >= 1000:
+            ProductAttribute.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        ProductAttribute.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0018_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('color', 'Cor'), ('size', 'Tamanho'), ('tag', 'Tag')], max_length=8)),
+                ('value', models.CharField(max_length=120)),
+                ('value_key', models.CharField(max_length=120)),
+                ('hex', models.CharField(blank=True, default='', max_length=32)),
+                ('position', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='shop.product')),
+            ],
+            options={
+                'ordering': ['kind', 'position'],
+                'indexes': [models.Index(fields=['kind', 'value_key', 'product'], name='shop_prodattr_kind_value_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_attributes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:38
+
+from django.db import migrations, models
+
+
+def seed_cancelled_status(apps, schema_editor):
+    OrderStatus = apps.get_model('shop', 'OrderStatus')
+    OrderStatus.objects.get_or_create(key="cancelled", defaults={"label": "Cancelado", "sort_order": 60, "is_active": True})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0019_productattribute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='stock_reserved',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(seed_cancelled_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:45
+
+import re
+
+from django.db import migrations, models
+
+ORDER_NUMBER_RE = re.compile(r"^LIV-(\d{6})-(\d+)$")
+
+
+def seed_counters(apps, schema_editor):
+    # Contadores começam acima dos números aleatórios já emitidos em cada dia
+    Order = apps.get_model('shop', 'Order')
+    OrderNumberCounter = apps.get_model('shop', 'OrderNumberCounter')
+    last = {}
+    for number in Order.objects.values_list('order_number', flat=True).iterator():
+        match = ORDER_NUMBER_RE.match(number or "")
+        if match:
+            day, value = match.group(1), int(match.group(2))
+            last[day] = max(last.get(day, 0), value)
+    OrderNumberCounter.objects.bulk_create(
+        [OrderNumberCounter(day=day, last_value=value) for day, value in last.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0020_order_stock_reserved'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberCounter',
+            fields=[
+                ('day', models.CharField(max_length=6, primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import OperationalError, migrations
+
+# Índice de busca de clientes do admin (ver shop.customer_search). SQL bruto porque
+# depende do banco: pg_trgm + GIN no Postgres, FTS5 com tokenizer trigram no SQLite.
+
+
+def build_document(username='', email='', first_name='', last_name='', cpf='', telefone='', cidade=''):
+    # Cópia congelada de shop.customer_search.build_document (e de shop.autocomplete.normalize):
+    # a migração não pode mudar junto com o código da aplicação
+    parts = [username, email, first_name, last_name, cpf, telefone, cidade]
+    parts += [re.sub(r'\D+', '', value or '') for value in (cpf, telefone)]
+    text = unicodedata.normalize('NFKD', ' '.join(p for p in parts if p))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.lower().split())
+
+
+def _pg_forward(user_table):
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"""
+        CREATE TABLE IF NOT EXISTS shop_customer_search (
+            user_id bigint PRIMARY KEY REFERENCES {user_table}(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            document text NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS shop_customer_search_trgm ON shop_customer_search "
+        "USING GIN (document gin_trgm_ops)",
+    ]
+
+
+PG_BACKWARD = ["DROP TABLE IF EXISTS shop_customer_search"]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS shop_customer_fts USING fts5(document, tokenize = 'trigram')",
+]
+
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS shop_customer_fts"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def _backfill(apps, schema_editor, insert_sql):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    CustomerProfile = apps.get_model('shop', 'CustomerProfile')
+    profiles = {
+        row["user_id"]: row
+        for row in CustomerProfile.objects.values("user_id", "cpf", "telefone", "cidade").iterator()
+    }
+    users = User.objects.values_list("id", "username", "email", "first_name", "last_name").iterator()
+    with schema_editor.connection.cursor() as cursor:
+        rows = []
+        for user_id, username, email, first_name, last_name in users:
+            profile = profiles.get(user_id, {})
+            document = build_document(
+                username, email, first_name, last_name,
+                profile.get("cpf", ""), profile.get("telefone", ""), profile.get("cidade", ""),
+            )
+            rows.append((user_id, document))
+            if len(rows) >= 1000:
+                cursor.executemany(insert_sql, rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert_sql, rows)
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+        _run(schema_editor, _pg_forward(schema_editor.quote_name(user_table)))
+        _backfill(
+            apps, schema_editor,
+            "INSERT INTO shop_customer_search (user_id, document) VALUES (%s, %s) ON CONFLICT (user_id) DO NOTHING",
+        )
+    elif vendor == "sqlite":
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite sem FTS5/trigram: a busca cai no filtro icontains (shop.customer_search._fallback_q)
+            return
+        _backfill(apps, schema_editor, "INSERT INTO shop_customer_fts (rowid, document) VALUES (%s, %s)")
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, PG_BACKWARD)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shop', '0021_order_number_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
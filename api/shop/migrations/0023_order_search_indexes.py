@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0022_customer_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='shop_order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', 'id'], name='shop_order_created_id_idx'),
+        ),
+    ]
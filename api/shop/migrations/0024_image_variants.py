@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0023_order_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0024_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product_image', 'Imagem de produto'), ('category', 'Categoria'), ('banner', 'Banner')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Processando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=8)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('variants', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'run_after', 'id'], name='shop_imagejob_queue_idx'), models.Index(fields=['kind', 'object_id'], name='shop_imagejob_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0025_image_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(fields=['name', 'status'], name='shop_imagejob_name_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0026_image_job_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=40)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=40)),
+                ('product_id', models.PositiveIntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lines', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day', 'product_id'],
+                'indexes': [models.Index(fields=['product_id'], name='shop_dailyproductsales_prod')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'payment_method', 'product_id'), name='shop_dailyproductsales_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=40)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=40)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('coupon_orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day', 'status', 'payment_method'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'payment_method'), name='shop_dailysales_key')],
+            },
+        ),
+    ]
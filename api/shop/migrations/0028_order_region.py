@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_delivery_region(apps, schema_editor):
+    # Mesma normalização de Order.delivery_region; em lotes para não carregar a tabela inteira
+    Order = apps.get_model('shop', 'Order')
+    fields = ['delivery_estado', 'delivery_cidade', 'delivery_cep_prefix']
+    batch = []
+    queryset = (
+        Order.objects.filter(delivery_address__isnull=False)
+        .select_related('delivery_address').only('pk', 'delivery_address__estado', 'delivery_address__cidade', 'delivery_address__cep')
+    )
+    for order in queryset.iterator(chunk_size=2000):
+        address = order.delivery_address
+        order.delivery_estado = (address.estado or '').strip().upper()
+        order.delivery_cidade = ' '.join((address.cidade or '').split())
+        order.delivery_cep_prefix = ''.join(ch for ch in address.cep or '' if ch.isdigit())[:5]
+        batch.append(order)
+        if len(batch) >= 2000:
+            Order.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0027_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRegionSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=40)),
+                ('estado', models.CharField(blank=True, default='', max_length=2)),
+                ('cidade', models.CharField(blank=True, default='', max_length=120)),
+                ('cep_prefix', models.CharField(blank=True, default='', max_length=3)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['day', 'estado', 'cidade', 'cep_prefix'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_cep_prefix',
+            field=models.CharField(blank=True, default='', max_length=5),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_cidade',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delivery_estado',
+            field=models.CharField(blank=True, default='', max_length=2),
+        ),
+        migrations.RunPython(copy_delivery_region, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_estado', 'delivery_cidade', '-created_at'], name='shop_order_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_cep_prefix', '-created_at'], name='shop_order_cep_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyregionsales',
+            constraint=models.UniqueConstraint(fields=('day', 'status', 'estado', 'cidade', 'cep_prefix'), name='shop_dailyregionsales_key'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0028_order_region'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='max_uses_per_customer',
+            field=models.PositiveIntegerField(default=0, help_text='0 para ilimitado'),
+        ),
+        migrations.CreateModel(
+            name='CouponRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveIntegerField(blank=True, null=True)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='shop.coupon')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_redemption', to='shop.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_redemptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('coupon', 'user', 'slot'), name='shop_couponredemption_slot')],
+            },
+        ),
+    ]
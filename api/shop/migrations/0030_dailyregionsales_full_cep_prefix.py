@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:50
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def rebuild_region_sales(apps, schema_editor):
+    # As linhas antigas guardavam só 3 dígitos do CEP: recalcula a consolidação por região a
+    # partir dos pedidos, agora com o prefixo inteiro (mesmo cálculo de shop.sales.rebuild)
+    Order = apps.get_model('shop', 'Order')
+    DailyRegionSales = apps.get_model('shop', 'DailyRegionSales')
+    rows = (
+        Order.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'status', 'delivery_estado', 'delivery_cidade', 'delivery_cep_prefix')
+        .annotate(n=Count('id'), revenue=Sum('total'), discount=Sum('discount_amount'))
+        .order_by()
+    )
+    DailyRegionSales.objects.all().delete()
+    DailyRegionSales.objects.bulk_create(
+        (
+            DailyRegionSales(
+                day=row['day'], status=row['status'], estado=row['delivery_estado'], cidade=row['delivery_cidade'],
+                cep_prefix=row['delivery_cep_prefix'], orders=row['n'], revenue=row['revenue'] or 0,
+                discount=row['discount'] or 0,
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0029_coupon_redemptions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyregionsales',
+            name='cep_prefix',
+            field=models.CharField(blank=True, default='', max_length=5),
+        ),
+        migrations.RunPython(rebuild_region_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:10
+
+from django.db import migrations
+
+
+def backfill_slots(apps, schema_editor):
+    # Usos de cupons sem limite por cliente ficavam sem vaga (slot nulo): várias linhas nulas
+    # contavam como uma só e a constraint única não segurava o limite se ele fosse criado depois.
+    # Cada linha nula recebe a menor vaga livre do seu (cupom, cliente), na ordem dos usos.
+    CouponRedemption = apps.get_model('shop', 'CouponRedemption')
+    pairs = CouponRedemption.objects.filter(slot__isnull=True).values_list('coupon_id', 'user_id').distinct()
+    for coupon_id, user_id in pairs.iterator():
+        rows = list(CouponRedemption.objects.filter(coupon_id=coupon_id, user_id=user_id).order_by('created_at', 'id'))
+        taken = {row.slot for row in rows if row.slot is not None}
+        slot = 0
+        pending = []
+        for row in rows:
+            if row.slot is not None:
+                continue
+            slot += 1
+            while slot in taken:
+                slot += 1
+            row.slot = slot
+            pending.append(row)
+        CouponRedemption.objects.bulk_update(pending, ['slot'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0030_dailyregionsales_full_cep_prefix'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,8 @@
 from django.db import models
 from django.conf import settings
-from django.utils.text import slugify
 from django.utils import timezone
-import random
-import string
+
+from .slugs import save_with_slug
 
 
 class Category(models.Model):
@@ -11,6 +10,8 @@ class Category(models.Model):
     slug = models.SlugField(max_length=140, unique=True, blank=True)
     parent = models.ForeignKey('self', null=True, blank=True, related_name='children', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='categories/', null=True, blank=True)
+    # Variantes responsivas de `image` (shop.images): [{"name", "format", "width", "height"}]
+    image_variants = models.JSONField(default=list, blank=True)
     sort_order = models.IntegerField(default=0)
     # Grupo opcional para subcategorias (usado no mega menu)
     group_title = models.CharField(max_length=60, blank=True, default='')
@@ -23,16 +24,27 @@ class Category(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.name or "") or "categoria"
-            candidate = base
-            suffix = 2
-            # Garantir unicidade do slug
-            while Category.objects.filter(slug=candidate).exclude(pk=self.pk).exists():
-                candidate = f"{base}-{suffix}"
-                suffix += 1
-            self.slug = candidate
-        super().save(*args, **kwargs)
+        # Slug único (categoria, categoria-2, ...) em uma query; ver shop.slugs
+        save_with_slug(self, super().save, self.name, "categoria", *args, **kwargs)
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_related(self):
+        # Categoria e imagens em número fixo de queries (evita N+1 nos serializers);
+        # as subcategorias vêm da árvore em memória (shop.category_tree)
+        return self.select_related("category").prefetch_related(*self.related_prefetches())
+
+    @staticmethod
+    def related_prefetches():
+        # Imagens (na ordem do modelo) e atributos; as views async (shop.async_views) rodam cada um em paralelo
+        return [
+            models.Prefetch("images", queryset=ProductImage.objects.order_by(*ProductImage._meta.ordering)),
+            "attributes",
+        ]
+
+    def visible(self):
+        # Disponíveis na vitrine: ativos e com estoque (ou sem controle de estoque)
+        return self.filter(is_active=True).filter(models.Q(track_inventory=False) | models.Q(stock_quantity__gt=0))
 
 
 class Product(models.Model):
@@ -67,21 +79,27 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Paginação keyset da vitrine: ORDER BY created_at DESC, id
+            models.Index(fields=["-created_at", "id"], name="shop_product_created_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-        super().save(*args, **kwargs)
+        save_with_slug(self, super().save, self.title, "produto", *args, **kwargs)
 
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/')
+    # Variantes responsivas de `image` (shop.images): [{"name", "format", "width", "height"}]
+    variants = models.JSONField(default=list, blank=True)
     alt_text = models.CharField(max_length=160, blank=True)
     is_primary = models.BooleanField(default=False)
     sort_order = models.IntegerField(default=0)
@@ -94,6 +112,34 @@ class ProductImage(models.Model):
         return f"Imagem de {self.product.title}"
 
 
+class ProductAttribute(models.Model):
+    # Valores normalizados de available_colors / available_sizes / tags (preenchidos no save do Product)
+    COLOR = 'color'
+    SIZE = 'size'
+    TAG = 'tag'
+    KIND_CHOICES = [
+        (COLOR, 'Cor'),
+        (SIZE, 'Tamanho'),
+        (TAG, 'Tag'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attributes')
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    value = models.CharField(max_length=120)
+    value_key = models.CharField(max_length=120)
+    hex = models.CharField(max_length=32, blank=True, default='')
+    position = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['kind', 'position']
+        indexes = [
+            models.Index(fields=['kind', 'value_key', 'product'], name='shop_prodattr_kind_value_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.value}"
+
+
 class SiteSetting(models.Model):
     site_name = models.CharField(max_length=160, default='Minha Loja')
     primary_color = models.CharField(max_length=7, default='#c9dac7')
@@ -156,8 +202,20 @@ class OrderStatus(models.Model):
         return self.label
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_related(self, addresses=False):
+        # Cliente, perfil, endereço de entrega e itens em número fixo de queries (admin);
+        # o caderno de endereços do cliente só quando a resposta o inclui (detalhe)
+        qs = self.select_related("user", "user__profile", "delivery_address").prefetch_related("items")
+        if addresses:
+            qs = qs.prefetch_related("user__addresses")
+        return qs
+
+
 # Pedidos
 class Order(models.Model):
+    # Status que liberam a reserva de estoque (shop.inventory)
+    CANCELLED_STATUSES = ("cancelled", "canceled", "cancelado")
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders")
     order_number = models.CharField(max_length=20, unique=True, blank=True)
@@ -171,31 +229,66 @@ class Order(models.Model):
     recipient_name = models.CharField(max_length=120, blank=True, default="")
     shipping_address_text = models.TextField(blank=True, default="")
     delivery_address = models.ForeignKey('CustomerAddress', on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+    # Região da entrega copiada do endereço no checkout (relatórios por região sem join)
+    delivery_estado = models.CharField(max_length=2, blank=True, default="")
+    delivery_cidade = models.CharField(max_length=120, blank=True, default="")
+    delivery_cep_prefix = models.CharField(max_length=5, blank=True, default="")
+    # True enquanto o pedido segura estoque baixado no checkout
+    stock_reserved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Histórico do cliente paginado por (user, -created_at, id); serve também a busca por cliente
+            models.Index(fields=["user", "-created_at", "id"], name="shop_order_user_created_idx"),
+            # Busca/listas do admin: por status e período, e a listagem geral, paginadas por (-created_at, id)
+            models.Index(fields=["status", "-created_at", "id"], name="shop_order_status_created_idx"),
+            models.Index(fields=["-created_at", "id"], name="shop_order_created_id_idx"),
+            # Pedidos por região e período (exportação/busca com ?estado=, ?cep=)
+            models.Index(fields=["delivery_estado", "delivery_cidade", "-created_at"], name="shop_order_region_idx"),
+            models.Index(fields=["delivery_cep_prefix", "-created_at"], name="shop_order_cep_idx"),
+        ]
 
     def __str__(self):
         return f"Pedido {self.order_number}"
 
-    def _generate_order_number(self):
-        # Formato: LIV-YYMMDD-RND4
-        dt = timezone.now().strftime("%y%m%d")
-        rnd = "".join(random.choices(string.digits, k=4))
-        return f"LIV-{dt}-{rnd}"
+    @staticmethod
+    def delivery_region(address):
+        """Campos de região do pedido a partir do endereço de entrega (None = sem região)."""
+        if address is None:
+            return {"delivery_estado": "", "delivery_cidade": "", "delivery_cep_prefix": ""}
+        return {
+            "delivery_estado": (address.estado or "").strip().upper(),
+            "delivery_cidade": " ".join((address.cidade or "").split()),
+            "delivery_cep_prefix": "".join(ch for ch in address.cep or "" if ch.isdigit())[:5],
+        }
+
+    @property
+    def is_cancelled(self):
+        return (self.status or "").lower() in self.CANCELLED_STATUSES
 
     def save(self, *args, **kwargs):
         if not self.order_number:
-            candidate = self._generate_order_number()
-            # Garantir unicidade
-            while Order.objects.filter(order_number=candidate).exists():
-                candidate = self._generate_order_number()
-            self.order_number = candidate
+            # Formato: LIV-YYMMDD-NNNN, sequencial por dia (shop.order_numbers)
+            from .order_numbers import next_order_number
+
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
 
 
+class OrderNumberCounter(models.Model):
+    # Último número de pedido emitido em cada dia (YYMMDD)
+    day = models.CharField(max_length=6, primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, blank=True)
@@ -221,6 +314,7 @@ class Coupon(models.Model):
     discount_type = models.CharField(max_length=20, choices=DISCOUNT_TYPE_CHOICES, default=PERCENT)
     value = models.DecimalField(max_digits=10, decimal_places=2)
     max_uses = models.IntegerField(default=0, help_text='0 para ilimitado')
+    max_uses_per_customer = models.PositiveIntegerField(default=0, help_text='0 para ilimitado')
     used_count = models.IntegerField(default=0)
     min_order_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     expires_at = models.DateTimeField(null=True, blank=True)
@@ -242,3 +336,149 @@ class Coupon(models.Model):
 
     def __str__(self):
         return f"{self.code} ({self.discount_type} {self.value})"
+
+
+class CouponRedemption(models.Model):
+    # Livro de usos de cupom (shop.coupons): uma linha por pedido que usou o cupom
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='redemptions')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='coupon_redemptions')
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='coupon_redemption')
+    # Vaga do cliente (1, 2, ...; até max_uses_per_customer quando o cupom limita). Nula só em
+    # linhas anteriores à migração 0031
+    slot = models.PositiveIntegerField(null=True, blank=True)
+    discount_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # Dois checkouts do mesmo cliente não ocupam a mesma vaga; o índice serve (coupon, user)
+            models.UniqueConstraint(fields=['coupon', 'user', 'slot'], name='shop_couponredemption_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon_id} por {self.user_id} no pedido {self.order_id}"
+
+
+class ImageJob(models.Model):
+    # Fila (no próprio banco, sem broker) da geração de variantes das imagens; ver shop.image_jobs
+    PRODUCT_IMAGE = 'product_image'
+    CATEGORY = 'category'
+    BANNER = 'banner'
+    KIND_CHOICES = [
+        (PRODUCT_IMAGE, 'Imagem de produto'),
+        (CATEGORY, 'Categoria'),
+        (BANNER, 'Banner'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendente'),
+        (RUNNING, 'Processando'),
+        (DONE, 'Concluído'),
+        (FAILED, 'Falhou'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    # Registro dono da imagem (ProductImage/Category); banners não têm registro
+    object_id = models.PositiveBigIntegerField(null=True, blank=True)
+    # Arquivo original no storage; um job só aplica variantes se o registro ainda aponta para ele
+    name = models.CharField(max_length=255)
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    # Variantes geradas (também gravadas no registro dono, quando há um)
+    variants = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Busca do worker: pendentes prontos para rodar, na ordem de chegada
+            models.Index(fields=['status', 'run_after', 'id'], name='shop_imagejob_queue_idx'),
+            models.Index(fields=['kind', 'object_id'], name='shop_imagejob_object_idx'),
+            # Reaproveitamento de variantes de um conteúdo já processado (shop.storage)
+            models.Index(fields=['name', 'status'], name='shop_imagejob_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id or self.name} ({self.status})"
+
+
+# Consolidação diária de vendas (shop.sales): atualizada pelos sinais de Order/OrderItem no
+# mesmo commit do pedido e recalculada por `manage.py rebuild_sales`; o painel lê só estas tabelas
+class DailySales(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=40)
+    payment_method = models.CharField(max_length=40, blank=True, default="")
+    orders = models.IntegerField(default=0)
+    # Soma de Order.total (já com desconto)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    coupon_orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day", "status", "payment_method"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "status", "payment_method"], name="shop_dailysales_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}/{self.payment_method}: {self.orders} pedidos"
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=40)
+    payment_method = models.CharField(max_length=40, blank=True, default="")
+    # Sem FK: a consolidação sobrevive à remoção do produto (0 = produto removido);
+    # a categoria sai do produto na hora da consulta
+    product_id = models.PositiveIntegerField(default=0)
+    units = models.IntegerField(default=0)
+    # Soma de unit_price * quantity dos itens
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lines = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day", "product_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "status", "payment_method", "product_id"], name="shop_dailyproductsales_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product_id"], name="shop_dailyproductsales_prod"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} produto {self.product_id}: {self.units} un."
+
+
+class DailyRegionSales(models.Model):
+    # Vendas por dia e região da entrega (shop.sales); CEP com o prefixo de 5 dígitos do pedido
+    day = models.DateField()
+    status = models.CharField(max_length=40)
+    estado = models.CharField(max_length=2, blank=True, default="")
+    cidade = models.CharField(max_length=120, blank=True, default="")
+    cep_prefix = models.CharField(max_length=5, blank=True, default="")
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["day", "estado", "cidade", "cep_prefix"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "status", "estado", "cidade", "cep_prefix"], name="shop_dailyregionsales_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.cidade}-{self.estado}: {self.orders} pedidos"
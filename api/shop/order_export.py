@@ -0,0 +1,133 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import Order, OrderItem
+
+# Exportação de pedidos para o financeiro: uma linha por item (pedido sem itens sai em
+# uma linha só). Os pedidos são lidos em lotes por cursor (iterator) e os itens são
+# buscados por lote (prefetch por chunk), então a memória não cresce com o período.
+CHUNK = 500
+
+HEADER = [
+    "order_number",
+    "created_at",
+    "status",
+    "payment_method",
+    "shipping_method",
+    "coupon_code",
+    "discount_amount",
+    "order_total",
+    "customer_id",
+    "customer_name",
+    "customer_email",
+    "recipient_name",
+    "delivery_city",
+    "delivery_state",
+    "item_line",
+    "product_id",
+    "sku",
+    "item_title",
+    "unit_price",
+    "quantity",
+    "line_total",
+]
+
+
+def _csv_param(params, name):
+    values = []
+    for raw in params.getlist(name):
+        values.extend(v.strip() for v in raw.split(","))
+    return [v for v in values if v]
+
+
+def _day_start(value, name):
+    day = parse_date(value)
+    if day is None:
+        raise ValidationError({name: "Data inválida, use AAAA-MM-DD."})
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_orders(queryset, params):
+    """
+    ?from=AAAA-MM-DD e ?to=AAAA-MM-DD (inclusivos), ?status=, ?payment_method= e ?estado=
+    (vários valores por vírgula), ?cep= (prefixo). Datas viram intervalo em created_at, que usa o índice.
+    """
+    if params.get("from"):
+        queryset = queryset.filter(created_at__gte=_day_start(params["from"], "from"))
+    if params.get("to"):
+        queryset = queryset.filter(created_at__lt=_day_start(params["to"], "to") + timedelta(days=1))
+    statuses = _csv_param(params, "status")
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    methods = _csv_param(params, "payment_method")
+    if methods:
+        queryset = queryset.filter(payment_method__in=methods)
+    estados = [v.upper() for v in _csv_param(params, "estado")]
+    if estados:
+        queryset = queryset.filter(delivery_estado__in=estados)
+    if params.get("cep"):
+        cep = "".join(ch for ch in params["cep"] if ch.isdigit())[:5]
+        if not cep:
+            raise ValidationError({"cep": "Informe os dígitos iniciais do CEP."})
+        queryset = queryset.filter(delivery_cep_prefix__startswith=cep)
+    return queryset
+
+
+def export_queryset(params):
+    items = OrderItem.objects.annotate(sku=F("product__sku")).order_by("id")
+    return (
+        filter_orders(Order.objects.all(), params)
+        .select_related("user")
+        .prefetch_related(Prefetch("items", queryset=items))
+        .order_by("created_at", "id")
+    )
+
+
+def _customer_name(user):
+    full = f"{user.first_name or ''} {user.last_name or ''}".strip()
+    return full or user.username or user.email or ""
+
+
+def export_rows(params):
+    # Filtros validados aqui, antes de a resposta começar a sair (erro vira 400, não arquivo cortado)
+    return _rows(export_queryset(params))
+
+
+def _rows(queryset):
+    for order in queryset.iterator(chunk_size=CHUNK):
+        user = order.user
+        head = [
+            order.order_number,
+            timezone.localtime(order.created_at).isoformat(),
+            order.status,
+            order.payment_method,
+            order.shipping_method,
+            order.coupon_code,
+            order.discount_amount,
+            order.total,
+            user.pk,
+            _customer_name(user),
+            user.email,
+            order.recipient_name,
+            # Região desnormalizada no pedido (Order.delivery_region): sem join com o endereço
+            order.delivery_cidade,
+            order.delivery_estado,
+        ]
+        items = order.items.all()
+        if not items:
+            yield head + [None] * 7
+            continue
+        for line, item in enumerate(items, start=1):
+            yield head + [
+                line,
+                item.product_id,
+                item.sku or "",
+                item.title,
+                item.unit_price,
+                item.quantity,
+                item.unit_price * item.quantity,
+            ]
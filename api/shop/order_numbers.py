@@ -0,0 +1,77 @@
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OrderNumberCounter
+
+# Números de pedido LIV-YYMMDD-NNNN a partir de um contador por dia (OrderNumberCounter).
+# Cada worker reserva um bloco de números com um único UPDATE atômico e entrega o bloco
+# da memória: não há verificação de existência nem corrida entre checar e inserir.
+# Números de blocos não usados (worker reiniciado, checkout desfeito) viram lacunas.
+PREFIX = "LIV"
+
+_lock = threading.Lock()
+_blocks = {}  # dia -> [[próximo, último], ...] já confirmados no banco
+
+
+def _block_size():
+    return max(1, getattr(settings, "SHOP_ORDER_NUMBER_BLOCK", 20))
+
+
+def today():
+    return timezone.now().strftime("%y%m%d")
+
+
+def format_order_number(day, value):
+    return f"{PREFIX}-{day}-{value:04d}"
+
+
+def allocate(day, size=1):
+    """Reserva `size` números do dia e devolve (primeiro, último)."""
+    with transaction.atomic():
+        counters = OrderNumberCounter.objects.filter(day=day)
+        if not counters.update(last_value=F("last_value") + size):
+            try:
+                with transaction.atomic():
+                    OrderNumberCounter.objects.create(day=day, last_value=size)
+                return 1, size
+            except IntegrityError:
+                # Outro worker criou o contador do dia ao mesmo tempo
+                counters.update(last_value=F("last_value") + size)
+        # A linha continua travada pelo UPDATE até o fim da transação: a leitura é a nossa
+        last = counters.values_list("last_value", flat=True).get()
+    return last - size + 1, last
+
+
+def _take(day):
+    ranges = _blocks.get(day)
+    while ranges:
+        block = ranges[0]
+        if block[0] <= block[1]:
+            block[0] += 1
+            return block[0] - 1
+        ranges.pop(0)
+    return None
+
+
+def next_order_number(day=None):
+    day = day or today()
+    with _lock:
+        value = _take(day)
+    if value is not None:
+        return format_order_number(day, value)
+    if connection.in_atomic_block:
+        # Dentro de uma transação o bloco só valeria se ela confirmar; pega um número só,
+        # que é desfeito junto com o pedido
+        first, _last = allocate(day)
+        return format_order_number(day, first)
+    first, last = allocate(day, _block_size())
+    with _lock:
+        for old in [d for d in _blocks if d != day]:
+            del _blocks[old]
+        if first < last:
+            _blocks.setdefault(day, []).append([first + 1, last])
+    return format_order_number(day, first)
@@ -0,0 +1,55 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from .customer_search import filter_customers
+from .order_export import filter_orders
+
+# Busca de pedidos do admin (atendimento): prefixo do número do pedido (índice único de
+# order_number) OU cliente (nome, e-mail, CPF... pelo índice trigram de shop.customer_search).
+# A paginação é por chave (-created_at, id), coberta pelos índices de Order: o custo de cada
+# página não depende do tamanho da tabela nem da profundidade.
+ORDER_PREFIX = "LIV-"
+
+# "LIV-261017-0042", "liv2610170042", "261017-00"...
+_NUMBER_RE = re.compile(r"^(liv)?-?(\d[\d-]*)$", re.IGNORECASE)
+
+
+def order_number_prefix(text):
+    """
+    Prefixo de order_number para `text`, ou None se não parece um número de pedido.
+    Exige ao menos o dia completo (YYMMDD): prefixos mais curtos casariam com meses de
+    pedidos e o custo deixaria de ser previsível (para períodos use ?from=/?to=).
+    """
+    match = _NUMBER_RE.match(text.replace(" ", ""))
+    if not match:
+        return None
+    digits = match.group(2)
+    if len(digits.replace("-", "")) < 6:
+        return None
+    # Depois do dia (6 dígitos) vem o hífen do sequencial: "2610170042" -> "261017-0042"
+    if len(digits) > 6 and "-" not in digits:
+        digits = f"{digits[:6]}-{digits[6:]}"
+    return f"{ORDER_PREFIX}{digits}"
+
+
+def _prefix_range(prefix):
+    # order_number >= prefixo AND < prefixo "seguinte": usa o índice único de order_number
+    # também no SQLite (onde LIKE 'x%' não usa índice) e evita o UPPER() do istartswith
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(order_number__gte=prefix, order_number__lt=upper)
+
+
+def search_orders(queryset, params):
+    """?q= (número, cliente, e-mail, CPF, telefone), mais os filtros de data/status/pagamento."""
+    queryset = filter_orders(queryset, params)
+    text = (params.get("q") or "").strip()
+    if not text:
+        return queryset
+    customers = filter_customers(get_user_model().objects.all(), text).values("pk")
+    match = Q(user_id__in=customers)
+    prefix = order_number_prefix(text)
+    if prefix:
+        match |= _prefix_range(prefix)
+    return queryset.filter(match)
@@ -0,0 +1,148 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por chave (keyset) ordenada por (-created_at, id).
+    O cursor é opaco (base64) e guarda a posição do último/primeiro item da página,
+    então páginas profundas custam o mesmo que a primeira (sem OFFSET).
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = getattr(settings, "SHOP_PAGE_SIZE", 24)
+    max_page_size = getattr(settings, "SHOP_MAX_PAGE_SIZE", 100)
+    invalid_cursor_message = "Cursor inválido."
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                size = int(raw)
+            except (TypeError, ValueError):
+                size = 0
+            if size > 0:
+                return min(size, self.max_page_size)
+        return self.page_size
+
+    def encode_cursor(self, obj, reverse=False):
+        payload = {"t": obj.created_at.isoformat(), "i": obj.pk}
+        if reverse:
+            payload["r"] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            created_at = parse_datetime(payload["t"])
+            pk = int(payload["i"])
+            reverse = bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, size, cursor = self._page_queryset(queryset, request)
+        return self._set_page(list(queryset[: size + 1]), size, cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Versão async (views ASGI de shop.async_views): mesma página, via ORM async."""
+        queryset, size, cursor = self._page_queryset(queryset, request)
+        return self._set_page([obj async for obj in queryset[: size + 1]], size, cursor)
+
+    def _page_queryset(self, queryset, request):
+        self.base_url = request.build_absolute_uri()
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        if reverse:
+            # Voltando uma página: percorre na ordem inversa e desfaz no final
+            queryset = queryset.order_by("created_at", "-id")
+            created_at, pk, _ = cursor
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk))
+        else:
+            queryset = queryset.order_by("-created_at", "id")
+            if cursor:
+                created_at, pk, _ = cursor
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk))
+        return queryset, size, cursor
+
+    def _set_page(self, rows, size, cursor):
+        reverse = bool(cursor and cursor[2])
+        has_more = len(rows) > size
+        page = rows[:size]
+        if reverse:
+            page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class ShopPageNumberPagination(PageNumberPagination):
+    """Paginação por página (OFFSET) com os tamanhos de settings; envelope {count, next, previous, results}."""
+    page_size = getattr(settings, "SHOP_PAGE_SIZE", 24)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "SHOP_MAX_PAGE_SIZE", 100)
+
+
+class OptionalPageNumberPagination(ShopPageNumberPagination):
+    """
+    Paginação por página (OFFSET) opcional para as grades do admin:
+    só pagina quando ?page ou ?page_size é enviado; caso contrário devolve a lista completa.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
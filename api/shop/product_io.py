@@ -0,0 +1,285 @@
+import codecs
+import csv
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import autocomplete, search
+from .attributes import sync_products_attributes
+from .models import Category, Product
+from .response_cache import invalidate_categories, invalidate_products
+from .serializers import ProductImportSerializer
+from .slugs import allocate_slugs
+from .streaming import CSV, FORMATS, JSONL
+
+# Importação/exportação de produtos em CSV ou JSONL (admin).
+# Importação: lê as linhas aos poucos, valida em blocos com as regras do ProductSerializer
+# e faz upsert por sku (ou slug) com bulk_create/bulk_update. Como as operações em lote não
+# disparam sinais, atributos, índice de busca, cache e autocomplete são sincronizados aqui.
+# Exportação: values_list + iterator(), memória constante independente do catálogo.
+
+FIELDS = [
+    "sku",
+    "slug",
+    "title",
+    "description",
+    "category_id",
+    "price",
+    "compare_at_price",
+    "cost_price",
+    "barcode",
+    "gtin",
+    "mpn",
+    "brand",
+    "stock_quantity",
+    "track_inventory",
+    "weight",
+    "width",
+    "height",
+    "length",
+    "taxable",
+    "tags",
+    "available_colors",
+    "available_sizes",
+    "seo_title",
+    "seo_description",
+    "is_featured",
+    "free_shipping",
+    "is_active",
+]
+EXPORT_FIELDS = ["id"] + FIELDS
+# Campos gravados pelo bulk_update (category_id vira a FK "category")
+UPDATE_FIELDS = [f if f != "category_id" else "category" for f in FIELDS] + ["updated_at"]
+
+IMPORT_CHUNK = 500
+EXPORT_CHUNK = 2000
+MAX_REPORTED_ERRORS = 1000
+# Acima disso invalida o catálogo inteiro em vez de uma geração por produto
+MAX_SLUG_INVALIDATIONS = 200
+
+
+# Exportação
+
+def export_rows(queryset=None):
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.order_by("pk").values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK)
+
+
+# Leitura
+
+def detect_format(name, requested=None):
+    requested = (requested or "").lower()
+    if requested in FORMATS:
+        return requested
+    name = (name or "").lower()
+    return JSONL if name.endswith((".jsonl", ".ndjson")) else CSV
+
+
+def _text_lines(uploaded):
+    # Linhas decodificadas sob demanda; BOM do Excel é descartado
+    return codecs.iterdecode(uploaded, "utf-8-sig")
+
+
+_SKIP = object()
+
+
+def _clean_csv_value(field, value):
+    # CSV não distingue vazio de nulo: vazio vira None em campos anuláveis e é
+    # ignorado (mantém o valor atual/padrão) nos demais campos que não são texto
+    if value is None:
+        return None
+    if value.strip():
+        return value
+    try:
+        model_field = Product._meta.get_field(field)
+    except FieldDoesNotExist:
+        return value
+    if model_field.null:
+        return None
+    if model_field.get_internal_type() in ("CharField", "TextField", "SlugField"):
+        return ""
+    return _SKIP
+
+
+def iter_csv(uploaded):
+    reader = csv.DictReader(_text_lines(uploaded))
+    for number, raw in enumerate(reader, start=1):
+        row = {}
+        for key, value in raw.items():
+            if not key:
+                continue
+            key = key.strip()
+            value = _clean_csv_value(key, value)
+            if value is not _SKIP:
+                row[key] = value
+        yield number, row, None
+
+
+def iter_jsonl(uploaded):
+    number = 0
+    for line in _text_lines(uploaded):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, {"non_field_errors": [f"JSON inválido: {exc}"]}
+            continue
+        if not isinstance(row, dict):
+            yield number, None, {"non_field_errors": ["Cada linha deve ser um objeto JSON."]}
+            continue
+        yield number, row, None
+
+
+# Importação
+
+def _key(value):
+    return (value or "").strip() if isinstance(value, str) else ("" if value is None else str(value))
+
+
+def _row_keys(row):
+    keys = set()
+    if _key(row.get("sku")):
+        keys.add(("sku", _key(row.get("sku"))))
+    if _key(row.get("slug")):
+        keys.add(("slug", _key(row.get("slug"))))
+    return keys
+
+
+def _current_values(product):
+    data = {f: getattr(product, f) for f in FIELDS if f != "category_id"}
+    data["category_id"] = product.category_id
+    return data
+
+
+class ProductImporter:
+    def __init__(self, chunk_size=IMPORT_CHUNK):
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.changed_slugs = set()
+        self.context = {"_categories": Category.objects.in_bulk()}
+
+    def run(self, rows):
+        """Processa (número, linha, erro) em blocos; cada bloco grava na sua própria transação."""
+        try:
+            chunk, keys = [], set()
+            for number, row, error in rows:
+                if error:
+                    self._error(number, error)
+                    continue
+                row_keys = _row_keys(row)
+                # Mesma chave repetida no bloco: grava o que veio antes para a linha nova achar o produto
+                if len(chunk) >= self.chunk_size or row_keys & keys:
+                    self._flush(chunk)
+                    chunk, keys = [], set()
+                chunk.append((number, row))
+                keys |= row_keys
+            self._flush(chunk)
+        finally:
+            self._invalidate()
+        return self.summary()
+
+    def summary(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+    def _error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "errors": errors})
+
+    def _existing(self, chunk):
+        skus = {_key(row.get("sku")) for _n, row in chunk} - {""}
+        slugs = {_key(row.get("slug")) for _n, row in chunk} - {""}
+        by_sku, by_slug = {}, {}
+        if skus or slugs:
+            for product in Product.objects.filter(Q(sku__in=skus) | Q(slug__in=slugs)).order_by("pk"):
+                if product.sku:
+                    by_sku.setdefault(product.sku, product)
+                by_slug[product.slug] = product
+        return by_sku, by_slug
+
+    def _flush(self, chunk):
+        if not chunk:
+            return
+        by_sku, by_slug = self._existing(chunk)
+        creates, updates = [], []
+        now = timezone.now()
+        for number, row in chunk:
+            if not _key(row.get("slug")):
+                # Slug vazio = não informado: mantém o atual ou gera a partir do título
+                row = {k: v for k, v in row.items() if k != "slug"}
+            sku_match = by_sku.get(_key(row.get("sku")))
+            slug_match = by_slug.get(_key(row.get("slug")))
+            if sku_match and slug_match and sku_match.pk != slug_match.pk:
+                self._error(number, {"slug": ["sku e slug pertencem a produtos diferentes."]})
+                continue
+            instance = sku_match or slug_match
+            data = {**_current_values(instance), **row} if instance else row
+            serializer = ProductImportSerializer(instance=instance, data=data, context=self.context)
+            if not serializer.is_valid():
+                self._error(number, serializer.errors)
+                continue
+            values = serializer.validated_data
+            if instance:
+                self.changed_slugs.add(instance.slug)
+                for field, value in values.items():
+                    setattr(instance, field, value)
+                instance.updated_at = now
+                updates.append((number, instance))
+            else:
+                creates.append((number, Product(**values)))
+        self._allocate_slugs([p for _n, p in creates], {p.slug for _n, p in updates})
+        self._write(creates, updates)
+
+    def _allocate_slugs(self, products, reserved):
+        missing = [p for p in products if not p.slug]
+        reserved = reserved | {p.slug for p in products if p.slug}
+        for product, slug in zip(missing, allocate_slugs(Product, [p.title for p in missing], "produto", reserved)):
+            product.slug = slug
+
+    def _write(self, creates, updates):
+        products = [p for _n, p in creates] + [p for _n, p in updates]
+        if not products:
+            return
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create([p for _n, p in creates], batch_size=IMPORT_CHUNK)
+                Product.objects.bulk_update([p for _n, p in updates], UPDATE_FIELDS, batch_size=IMPORT_CHUNK)
+                sync_products_attributes(products)
+                search.index_products([p.pk for p in products])
+        except IntegrityError as exc:
+            # Conflito com gravação concorrente (ex.: slug tomado no meio tempo): o bloco inteiro volta
+            for number, _p in creates + updates:
+                self._error(number, {"non_field_errors": [f"Não foi possível gravar: {exc}"]})
+            return
+        self.created += len(creates)
+        self.updated += len(updates)
+        self.changed_slugs.update(p.slug for p in products)
+
+    def _invalidate(self):
+        if not (self.created or self.updated):
+            return
+        if len(self.changed_slugs) > MAX_SLUG_INVALIDATIONS:
+            # Detalhes de produto dependem da geração de categorias: um bump cobre todos
+            invalidate_categories()
+            invalidate_products()
+        else:
+            invalidate_products(*self.changed_slugs)
+        autocomplete.invalidate()
+
+
+def import_products(uploaded, file_format, chunk_size=IMPORT_CHUNK):
+    rows = iter_jsonl(uploaded) if file_format == JSONL else iter_csv(uploaded)
+    return ProductImporter(chunk_size=chunk_size).run(rows)
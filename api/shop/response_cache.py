@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .versions import aget_versions, bump_version, get_versions
+
+KEY_PREFIX = "shop:resp:"
+LOCK_PREFIX = "shop:resp-lock:"
+
+# Gerações usadas pelas views públicas do catálogo
+CATEGORIES = "categories"
+PRODUCTS = "products"
+# Dados de clientes embutidos nos pedidos do admin (validadores de GET condicional)
+CUSTOMERS = "customers"
+
+
+def product_generation(slug):
+    return f"product:{slug}"
+
+
+def invalidate_products(*slugs):
+    bump_version(PRODUCTS)
+    for slug in {s for s in slugs if s}:
+        bump_version(product_generation(slug))
+
+
+def invalidate_categories():
+    bump_version(CATEGORIES)
+
+
+def invalidate_customers():
+    bump_version(CUSTOMERS)
+
+
+def _request_fingerprint(request):
+    # Caminho + query string normalizada (ordem dos parâmetros não importa)
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    raw = f"{request.path}?{query}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _lock_wait_seconds():
+    return getattr(settings, "SHOP_RESPONSE_CACHE_LOCK_WAIT", 5)
+
+
+def cached_response(request, generations, build, timeout=None):
+    """
+    Devolve a resposta cacheada para a requisição ou a constrói com `build()`.
+    A chave inclui as versões das gerações, então um bump invalida só o que depende dela.
+    Misses concorrentes da mesma chave esperam a reconstrução de quem pegou o lock.
+    """
+    versions = get_versions(generations)
+    if any(v is None for v in versions.values()):
+        return build()
+    key = _cache_key(request, generations, versions)
+    if timeout is None:
+        timeout = getattr(settings, "SHOP_RESPONSE_CACHE_TIMEOUT", 600)
+
+    data = cache.get(key)
+    if data is not None:
+        return _hit(data)
+
+    lock_key = f"{LOCK_PREFIX}{key}"
+    wait = _lock_wait_seconds()
+    owns_lock = cache.add(lock_key, 1, timeout=wait)
+    if not owns_lock:
+        # Outro worker já está reconstruindo esta chave: espera o resultado
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            data = cache.get(key)
+            if data is not None:
+                return _hit(data)
+            if cache.get(lock_key) is None:
+                break
+        # Lock expirou sem resultado: segue e constrói por conta própria
+    try:
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout)
+        response["X-Cache"] = "MISS"
+        return response
+    finally:
+        if owns_lock:
+            cache.delete(lock_key)
+
+
+async def acached_response(request, generations, build, timeout=None):
+    """
+    Versão async de cached_response para as views ASGI (shop.async_views), com a mesma
+    chave e os mesmos dados (sync e async compartilham o cache). `build` é uma corrotina
+    que devolve (status, data); retorna (status, data, "HIT"/"MISS"/None).
+    """
+    versions = await aget_versions(generations)
+    if any(v is None for v in versions.values()):
+        return (*await build(), None)
+    key = _cache_key(request, generations, versions)
+    if timeout is None:
+        timeout = getattr(settings, "SHOP_RESPONSE_CACHE_TIMEOUT", 600)
+
+    data = await cache.aget(key)
+    if data is not None:
+        return status.HTTP_200_OK, data, "HIT"
+
+    lock_key = f"{LOCK_PREFIX}{key}"
+    wait = _lock_wait_seconds()
+    owns_lock = await cache.aadd(lock_key, 1, timeout=wait)
+    if not owns_lock:
+        # Espera sem bloquear o event loop enquanto outro worker reconstrói a chave
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            data = await cache.aget(key)
+            if data is not None:
+                return status.HTTP_200_OK, data, "HIT"
+            if await cache.aget(lock_key) is None:
+                break
+    try:
+        status_code, data = await build()
+        if status_code == status.HTTP_200_OK:
+            await cache.aset(key, data, timeout)
+        return status_code, data, "MISS"
+    finally:
+        if owns_lock:
+            await cache.adelete(lock_key)
+
+
+def _cache_key(request, generations, versions):
+    tag = ".".join(f"{name}={versions[name]}" for name in generations)
+    return f"{KEY_PREFIX}{hashlib.sha1(tag.encode()).hexdigest()}:{_request_fingerprint(request)}"
+
+
+def _hit(data):
+    response = Response(data)
+    response["X-Cache"] = "HIT"
+    return response
+
+
+class CachedResponseMixin:
+    """Cache de respostas de lista/detalhe para views públicas; defina `get_cache_generations`."""
+
+    cache_timeout = None
+
+    def get_cache_generations(self):
+        raise NotImplementedError
+
+    def _cached(self, handler, request, *args, **kwargs):
+        return cached_response(
+            request,
+            self.get_cache_generations(),
+            lambda: handler(request, *args, **kwargs),
+            timeout=self.cache_timeout,
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
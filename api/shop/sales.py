@@ -0,0 +1,487 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, UniqueConstraint
+from django.db.models.functions import Substr, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .category_tree import get_category_tree
+from .models import DailyProductSales, DailyRegionSales, DailySales, Order, OrderItem, Product
+
+# Consolidação diária de vendas: uma linha por (dia, status, forma de pagamento) em DailySales,
+# por (dia, status, forma de pagamento, produto) em DailyProductSales e por (dia, status, região
+# da entrega) em DailyRegionSales. Cada pedido/item soma ou subtrai a sua parte na mesma
+# transação que o altera (sinais em shop.signals), com um INSERT ... ON CONFLICT DO UPDATE por
+# tabela; o checkout soma depois do commit (record_checkout), então o painel lê milhares de
+# linhas em vez de varrer pedidos e itens.
+# `manage.py rebuild_sales` recalcula tudo (ou um período) a partir de Order/OrderItem.
+
+# Campos do pedido que entram na consolidação
+ORDER_FIELDS = (
+    "created_at", "status", "payment_method", "total", "discount_amount", "coupon_code",
+    "delivery_estado", "delivery_cidade", "delivery_cep_prefix",
+)
+ITEM_FIELDS = ("order_id", "product_id", "quantity", "unit_price")
+
+DEFAULT_PERIOD_DAYS = 30
+DEFAULT_TOP_PRODUCTS = 10
+MAX_TOP_PRODUCTS = 100
+# DailyRegionSales guarda o prefixo inteiro do pedido (5 dígitos, como Order.delivery_cep_prefix),
+# então ?cep= filtra com a mesma precisão do pedido; group=cep agrupa por 1 a 3 dígitos (setor)
+REGION_CEP_DIGITS = 3
+REGION_GROUPS = {
+    "estado": ("estado",),
+    "cidade": ("estado", "cidade"),
+    "cep": ("cep",),
+}
+
+# Linhas por INSERT em _upsert (limite de parâmetros do SQLite)
+UPSERT_BATCH = 500
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+CENT = Decimal("0.01")
+
+
+def order_state(order):
+    """Campos consolidados de um pedido (instância) em dicionário, no formato de values()."""
+    return {field: getattr(order, field) for field in ORDER_FIELDS}
+
+
+def stored_order_state(pk):
+    return Order.objects.filter(pk=pk).values(*ORDER_FIELDS).first()
+
+
+def stored_item_state(pk):
+    return OrderItem.objects.filter(pk=pk).values(*ITEM_FIELDS).first()
+
+
+def _key(state):
+    return {
+        # Dia local (TIME_ZONE), o mesmo de TruncDate no rebuild
+        "day": timezone.localdate(state["created_at"]),
+        "status": state["status"] or "",
+        "payment_method": state["payment_method"] or "",
+    }
+
+
+def _region_key(state):
+    return {
+        "day": timezone.localdate(state["created_at"]),
+        "status": state["status"] or "",
+        "estado": state["delivery_estado"] or "",
+        "cidade": state["delivery_cidade"] or "",
+        "cep_prefix": state["delivery_cep_prefix"] or "",
+    }
+
+
+class _Deltas:
+    """Acumula as diferenças por linha; somas que se anulam não viram UPDATE."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, model, key, values):
+        row = self.rows.setdefault((model, tuple(key.items())), {})
+        for field, value in values.items():
+            row[field] = row.get(field, 0) + value
+
+    def add_order(self, state, sign):
+        revenue, discount = sign * (state["total"] or 0), sign * (state["discount_amount"] or 0)
+        self.add(DailySales, _key(state), {
+            "orders": sign,
+            "revenue": revenue,
+            "discount": discount,
+            "coupon_orders": sign if state["coupon_code"] else 0,
+        })
+        self.add(DailyRegionSales, _region_key(state), {"orders": sign, "revenue": revenue, "discount": discount})
+
+    def add_items(self, state, items, sign):
+        """`items` = [(product_id, quantidade, preço unitário)] do pedido `state`."""
+        key = _key(state)
+        for product_id, quantity, unit_price in items:
+            self.add(DailySales, key, {"units": sign * quantity})
+            self.add(DailyProductSales, {**key, "product_id": product_id or 0}, {
+                "units": sign * quantity,
+                "revenue": sign * quantity * (unit_price or 0),
+                "lines": sign,
+            })
+
+    def apply(self):
+        # Uma instrução por tabela; ordem fixa das tabelas e das linhas: duas transações nunca
+        # se travam em ordens opostas
+        tables = {}
+        for model, key in sorted(self.rows, key=lambda row: (row[0]._meta.db_table, row[1])):
+            values = self.rows[(model, key)]
+            if any(values.values()):
+                tables.setdefault(model, []).append((dict(key), values))
+        for model, rows in tables.items():
+            for start in range(0, len(rows), UPSERT_BATCH):
+                _upsert(model, rows[start:start + UPSERT_BATCH])
+
+
+def _upsert(model, rows):
+    """Soma `rows` ([(chave, diferenças)]) às linhas de `model`, criando as que faltam (Postgres e SQLite)."""
+    opts = model._meta
+    key_names = next(c.fields for c in opts.constraints if isinstance(c, UniqueConstraint))
+    key_fields = [opts.get_field(name) for name in key_names]
+    value_fields = [f for f in opts.concrete_fields if not f.primary_key and f.name not in key_names]
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    params = []
+    for key, values in rows:
+        params += [f.get_db_prep_save(key[f.name], connection) for f in key_fields]
+        params += [f.get_db_prep_save(values.get(f.name, 0), connection) for f in value_fields]
+    placeholders = "(" + ", ".join(["%s"] * (len(key_fields) + len(value_fields))) + ")"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(qn(f.column) for f in key_fields + value_fields)}) "
+            f"VALUES {', '.join([placeholders] * len(rows))} "
+            f"ON CONFLICT ({', '.join(qn(f.column) for f in key_fields)}) DO UPDATE SET "
+            + ", ".join(f"{qn(f.column)} = {table}.{qn(f.column)} + excluded.{qn(f.column)}" for f in value_fields),
+            params,
+        )
+
+
+def _items(order_id):
+    return list(OrderItem.objects.filter(order_id=order_id).values_list("product_id", "quantity", "unit_price"))
+
+
+def record_order(before, order):
+    """
+    Pedido criado (`before` None) ou alterado: ajusta a linha do pedido e, se o dia/status/
+    forma de pagamento mudou, move os itens já consolidados para a linha nova.
+    """
+    after = order_state(order)
+    if before == after:
+        return
+    deltas = _Deltas()
+    if before is not None:
+        deltas.add_order(before, -1)
+    deltas.add_order(after, 1)
+    if before is not None and _key(before) != _key(after):
+        items = _items(order.pk)
+        deltas.add_items(before, items, -1)
+        deltas.add_items(after, items, 1)
+    deltas.apply()
+
+
+def remove_order(order):
+    """Pedido apagado: só a parte do pedido; os itens saem pelos sinais da cascata."""
+    state = stored_order_state(order.pk)
+    if state is None:
+        return
+    deltas = _Deltas()
+    deltas.add_order(state, -1)
+    deltas.apply()
+
+
+def record_checkout(order, items):
+    """
+    Pedido do checkout (gravado com `_sales_deferred`, itens por bulk_create sem sinais): soma o
+    pedido e os itens depois do commit, numa transação curta. Assim o checkout não segura as
+    linhas compartilhadas do dia até o fim; uma queda entre o commit e a soma se corrige com
+    `manage.py rebuild_sales`.
+    """
+    deltas = _Deltas()
+    state = order_state(order)
+    deltas.add_order(state, 1)
+    deltas.add_items(state, [(i.product_id, i.quantity, i.unit_price) for i in items], 1)
+
+    def run():
+        with transaction.atomic():
+            deltas.apply()
+
+    transaction.on_commit(run)
+
+
+def record_item(before, item):
+    """Item criado, alterado (`before` = stored_item_state anterior) ou apagado (`item` None)."""
+    deltas = _Deltas()
+    states = {}
+    for state, sign in ((before, -1), (item and {f: getattr(item, f) for f in ITEM_FIELDS}, 1)):
+        if state is None:
+            continue
+        if state["order_id"] not in states:
+            states[state["order_id"]] = stored_order_state(state["order_id"])
+        order = states[state["order_id"]]
+        if order is not None:
+            deltas.add_items(order, [(state["product_id"], state["quantity"], state["unit_price"])], sign)
+    deltas.apply()
+
+
+def forget_product(product_id):
+    """Produto apagado (itens ficam sem produto): passa as linhas dele para o produto 0."""
+    with transaction.atomic():
+        rows = list(DailyProductSales.objects.select_for_update().filter(product_id=product_id))
+        deltas = _Deltas()
+        for row in rows:
+            deltas.add(DailyProductSales, {
+                "day": row.day, "status": row.status, "payment_method": row.payment_method, "product_id": 0,
+            }, {"units": row.units, "revenue": row.revenue, "lines": row.lines})
+        DailyProductSales.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        deltas.apply()
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild(start=None, end=None):
+    """
+    Recalcula a consolidação dos dias [start, end] (datas locais; None = sem limite) a partir de
+    Order/OrderItem. Retorna o número de linhas gravadas em DailySales, DailyProductSales e
+    DailyRegionSales.
+    """
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    targets = [DailySales.objects.all(), DailyProductSales.objects.all(), DailyRegionSales.objects.all()]
+    if start:
+        orders = orders.filter(created_at__gte=_day_start(start))
+        items = items.filter(order__created_at__gte=_day_start(start))
+        targets = [rows.filter(day__gte=start) for rows in targets]
+    if end:
+        orders = orders.filter(created_at__lt=_day_start(end + timedelta(days=1)))
+        items = items.filter(order__created_at__lt=_day_start(end + timedelta(days=1)))
+        targets = [rows.filter(day__lte=end) for rows in targets]
+    items = items.annotate(
+        day=TruncDate("order__created_at"), order_status=F("order__status"), order_payment=F("order__payment_method"),
+    )
+
+    # Leitura e regravação na mesma transação; pedidos gravados durante o rebuild podem
+    # ficar de fora ou em dobro no período: rode com o checkout parado ou para dias fechados
+    with transaction.atomic():
+        totals = {}
+        for row in (
+            orders.annotate(day=TruncDate("created_at")).values("day", "status", "payment_method")
+            .annotate(
+                n=Count("id"), revenue=Sum("total"), discount=Sum("discount_amount"),
+                coupon_orders=Count("id", filter=~Q(coupon_code="")),
+            )
+            .order_by()
+        ):
+            totals[(row["day"], row["status"], row["payment_method"])] = DailySales(
+                day=row["day"], status=row["status"], payment_method=row["payment_method"], orders=row["n"],
+                revenue=row["revenue"] or 0, discount=row["discount"] or 0, coupon_orders=row["coupon_orders"],
+            )
+        for row in items.values("day", "order_status", "order_payment").annotate(units=Sum("quantity")).order_by():
+            key = (row["day"], row["order_status"], row["order_payment"])
+            if key not in totals:
+                totals[key] = DailySales(day=key[0], status=key[1], payment_method=key[2])
+            totals[key].units = row["units"] or 0
+
+        products = [
+            DailyProductSales(
+                day=row["day"], status=row["order_status"], payment_method=row["order_payment"],
+                product_id=row["product_id"] or 0, units=row["units"] or 0, revenue=row["revenue"] or 0, lines=row["lines"],
+            )
+            for row in items.values("day", "order_status", "order_payment", "product_id")
+            .annotate(units=Sum("quantity"), revenue=Sum(F("unit_price") * F("quantity"), output_field=MONEY), lines=Count("id"))
+            .order_by()
+        ]
+        regions = [
+            DailyRegionSales(
+                day=row["day"], status=row["status"], estado=row["delivery_estado"], cidade=row["delivery_cidade"],
+                cep_prefix=row["cep"], orders=row["n"], revenue=row["revenue"] or 0, discount=row["discount"] or 0,
+            )
+            for row in orders.annotate(day=TruncDate("created_at"), cep=F("delivery_cep_prefix"))
+            .values("day", "status", "delivery_estado", "delivery_cidade", "cep")
+            .annotate(n=Count("id"), revenue=Sum("total"), discount=Sum("discount_amount"))
+            .order_by()
+        ]
+        for rows in targets:
+            rows.delete()
+        DailySales.objects.bulk_create(totals.values(), batch_size=1000)
+        DailyProductSales.objects.bulk_create(products, batch_size=1000)
+        DailyRegionSales.objects.bulk_create(regions, batch_size=1000)
+    return len(totals), len(products), len(regions)
+
+
+# Painel (GET /api/admin/sales/): só lê a consolidação
+
+def _param_values(params, name):
+    values = []
+    for raw in params.getlist(name):
+        values.extend(v.strip() for v in raw.split(","))
+    return [v for v in values if v]
+
+
+def _param_day(params, name, default):
+    if not params.get(name):
+        return default
+    day = parse_date(params[name])
+    if day is None:
+        raise ValidationError({name: "Data inválida, use AAAA-MM-DD."})
+    return day
+
+
+def _period(params):
+    end = _param_day(params, "to", timezone.localdate())
+    start = _param_day(params, "from", end - timedelta(days=DEFAULT_PERIOD_DAYS - 1))
+    if start > end:
+        raise ValidationError({"from": "Início depois do fim do período."})
+    return start, end
+
+
+def _filter_rows(queryset, params, start, end, **filters):
+    """Período, ?status= e, sem ele, cancelados fora (a menos de ?include_cancelled=1)."""
+    queryset = queryset.filter(day__gte=start, day__lte=end, **filters)
+    statuses = _param_values(params, "status")
+    if statuses:
+        return queryset.filter(status__in=statuses)
+    if params.get("include_cancelled") not in ("1", "true", "True"):
+        queryset = queryset.exclude(status__in=Order.CANCELLED_STATUSES)
+    return queryset
+
+
+def _money(value):
+    return str(Decimal(value or 0).quantize(CENT))
+
+
+def _summary(row):
+    orders = row.get("sum_orders") or 0
+    revenue = row.get("sum_revenue") or Decimal("0")
+    return {
+        "orders": orders,
+        "revenue": _money(revenue),
+        "units": row.get("sum_units") or 0,
+        "discount": _money(row.get("sum_discount")),
+        "coupon_orders": row.get("sum_coupon_orders") or 0,
+        "average_ticket": _money(revenue / orders if orders else 0),
+    }
+
+
+def _item_summary(row):
+    return {"units": row["sum_units"] or 0, "revenue": _money(row["sum_revenue"]), "lines": row["sum_lines"] or 0}
+
+
+def report(params):
+    """
+    ?from= e ?to= (AAAA-MM-DD, inclusivos; padrão: últimos 30 dias), ?status= e
+    ?payment_method= (vírgula); sem ?status=, pedidos cancelados ficam de fora
+    (?include_cancelled=1 inclui). ?limit= produtos no ranking.
+    """
+    start, end = _period(params)
+    try:
+        limit = min(max(int(params.get("limit") or DEFAULT_TOP_PRODUCTS), 1), MAX_TOP_PRODUCTS)
+    except ValueError:
+        raise ValidationError({"limit": "Número inválido."})
+
+    methods = _param_values(params, "payment_method")
+    extra = {"payment_method__in": methods} if methods else {}
+    rows = _filter_rows(DailySales.objects.all(), params, start, end, **extra)
+    product_rows = _filter_rows(DailyProductSales.objects.all(), params, start, end, **extra)
+
+    # Nomes com prefixo: a anotação não pode ter o nome de um campo do modelo
+    sums = {f"sum_{field}": Sum(field) for field in ("orders", "revenue", "units", "discount", "coupon_orders")}
+    by_day = {row["day"]: row for row in rows.values("day").annotate(**sums).order_by()}
+    days = []
+    day = start
+    while day <= end:
+        days.append({"day": day.isoformat(), **_summary(by_day.get(day, {}))})
+        day += timedelta(days=1)
+
+    by_product = list(
+        product_rows.values("product_id")
+        .annotate(sum_units=Sum("units"), sum_revenue=Sum("revenue"), sum_lines=Sum("lines"))
+        .exclude(sum_lines=0)
+        .order_by()
+    )
+    info = {
+        pk: (title, category_id)
+        for pk, title, category_id in Product.objects.filter(pk__in=[r["product_id"] for r in by_product])
+        .values_list("pk", "title", "category_id")
+    }
+    # Categoria atual do produto (árvore em memória); produtos removidos ficam sem categoria
+    tree = get_category_tree()
+    categories = {}
+    for row in by_product:
+        category_id = info.get(row["product_id"], (None, None))[1]
+        entry = categories.setdefault(category_id, {"sum_units": 0, "sum_revenue": Decimal("0"), "sum_lines": 0})
+        for field in entry:
+            entry[field] += row[field] or 0
+    top = sorted(by_product, key=lambda r: (-(r["sum_revenue"] or 0), r["product_id"]))[:limit]
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "totals": _summary(rows.aggregate(**sums)),
+        "days": days,
+        "by_status": [
+            {"status": row["status"], **_summary(row)}
+            for row in rows.values("status").annotate(**sums).order_by("-sum_revenue", "status")
+        ],
+        "by_payment_method": [
+            {"payment_method": row["payment_method"], **_summary(row)}
+            for row in rows.values("payment_method").annotate(**sums).order_by("-sum_revenue", "payment_method")
+        ],
+        "by_category": [
+            {
+                "category_id": category_id,
+                "name": getattr(tree.get(category_id), "name", None),
+                **_item_summary(entry),
+            }
+            for category_id, entry in sorted(categories.items(), key=lambda item: -item[1]["sum_revenue"])
+        ],
+        "top_products": [
+            {
+                "product_id": row["product_id"] or None,
+                "title": info.get(row["product_id"], (None, None))[0],
+                **_item_summary(row),
+            }
+            for row in top
+        ],
+    }
+
+
+def region_report(params):
+    """
+    Vendas por região da entrega: ?group=estado|cidade|cep (padrão estado), ?cep_digits=1..3
+    (com group=cep), filtros ?estado= e ?cep= (prefixo de até 5 dígitos), mais período/status como em report().
+    """
+    start, end = _period(params)
+    group = params.get("group") or "estado"
+    if group not in REGION_GROUPS:
+        raise ValidationError({"group": f"Use um de: {', '.join(REGION_GROUPS)}."})
+    try:
+        digits = min(max(int(params.get("cep_digits") or REGION_CEP_DIGITS), 1), REGION_CEP_DIGITS)
+    except ValueError:
+        raise ValidationError({"cep_digits": "Número inválido."})
+
+    filters = {}
+    estados = [v.upper() for v in _param_values(params, "estado")]
+    if estados:
+        filters["estado__in"] = estados
+    if params.get("cep"):
+        cep = "".join(ch for ch in params["cep"] if ch.isdigit())[:5]
+        if not cep:
+            raise ValidationError({"cep": "Informe os dígitos iniciais do CEP."})
+        filters["cep_prefix__startswith"] = cep
+    rows = _filter_rows(DailyRegionSales.objects.all(), params, start, end, **filters)
+    if group == "cep":
+        rows = rows.annotate(cep=Substr("cep_prefix", 1, digits))
+    columns = REGION_GROUPS[group]
+    sums = {"sum_orders": Sum("orders"), "sum_revenue": Sum("revenue"), "sum_discount": Sum("discount")}
+
+    def summary(row):
+        orders, revenue = row["sum_orders"] or 0, row["sum_revenue"] or Decimal("0")
+        return {
+            "orders": orders,
+            "revenue": _money(revenue),
+            "discount": _money(row["sum_discount"]),
+            "average_ticket": _money(revenue / orders if orders else 0),
+        }
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "group": group,
+        "totals": summary(rows.aggregate(**sums)),
+        # Linhas que as diferenças negativas (cancelamento, troca de status) zeraram não aparecem
+        "results": [
+            {**{column: row[column] for column in columns}, **summary(row)}
+            for row in rows.values(*columns).annotate(**sums).exclude(sum_orders=0).order_by("-sum_revenue", *columns)
+        ],
+    }
@@ -0,0 +1,128 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Índices de busca "sombra" de Product, mantidos pelos sinais de Product (shop.signals):
+# - Postgres: tabela shop_product_search com tsvector (config shop_pt = portuguese + unaccent) e índice GIN
+# - SQLite: tabela virtual FTS5 shop_product_fts (unicode61 remove_diacritics)
+PG_TABLE = "shop_product_search"
+SQLITE_TABLE = "shop_product_fts"
+
+PG_DOCUMENT_SQL = (
+    "setweight(to_tsvector('shop_pt', coalesce(p.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(p.sku, '')), 'A') || "
+    "setweight(to_tsvector('shop_pt', coalesce(p.brand, '')), 'B') || "
+    "setweight(to_tsvector('shop_pt', replace(coalesce(p.tags, ''), ',', ' ')), 'B') || "
+    "setweight(to_tsvector('shop_pt', coalesce(p.description, '')), 'C')"
+)
+
+# Pesos bm25 por coluna do FTS5: title, sku, brand, tags, description
+SQLITE_WEIGHTS = "10.0, 10.0, 5.0, 5.0, 1.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_available = {}
+
+
+def _vendor():
+    return connection.vendor
+
+
+def is_available():
+    """Indica se o índice do banco atual existe (ex.: SQLite compilado sem FTS5 não tem)."""
+    vendor = _vendor()
+    if vendor not in _available:
+        table = {"postgresql": PG_TABLE, "sqlite": SQLITE_TABLE}.get(vendor)
+        _available[vendor] = bool(table) and table in connection.introspection.table_names()
+    return _available[vendor]
+
+
+def index_product(pk):
+    index_products([pk])
+
+
+def index_products(pks):
+    """Reindexa vários produtos com um INSERT ... SELECT (usado também após bulk_create/bulk_update)."""
+    pks = list(pks)
+    if not pks or not is_available():
+        return
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        if _vendor() == "postgresql":
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (product_id, document) "
+                f"SELECT p.id, {PG_DOCUMENT_SQL} FROM shop_product p WHERE p.id IN ({placeholders}) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                pks,
+            )
+        else:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})", pks)
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, title, sku, brand, tags, description) "
+                f"SELECT id, title, sku, brand, tags, description FROM shop_product WHERE id IN ({placeholders})",
+                pks,
+            )
+
+
+def remove_product(pk):
+    # No Postgres a linha sai por ON DELETE CASCADE
+    if is_available() and _vendor() == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid = %s", [pk])
+
+
+def _fts5_query(text):
+    # Cada termo vira prefixo entre aspas (evita sintaxe FTS5 vinda do usuário)
+    tokens = _TOKEN_RE.findall(text)
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def _visible(id_column):
+    """EXISTS correlacionado com Product.objects.visible() (a regra da vitrine) para a linha de `id_column`."""
+    from .models import Product
+
+    sql, params = Product.objects.visible().filter(pk=RawSQL(id_column, [])).values("pk").order_by().query.sql_with_params()
+    return f"EXISTS ({sql})", list(params)
+
+
+def search_product_ids(text, limit, offset=0):
+    """Ids de produtos visíveis que casam com `text`, do mais para o menos relevante."""
+    text = (text or "").strip()
+    if not text:
+        return []
+    if not is_available():
+        return _fallback_ids(text, limit, offset)
+    with connection.cursor() as cursor:
+        if _vendor() == "postgresql":
+            visible, visible_params = _visible("s.product_id")
+            cursor.execute(
+                f"SELECT s.product_id FROM {PG_TABLE} s, websearch_to_tsquery('shop_pt', %s) q "
+                f"WHERE s.document @@ q AND {visible} "
+                "ORDER BY ts_rank_cd(s.document, q) DESC, s.product_id DESC "
+                "LIMIT %s OFFSET %s",
+                [text, *visible_params, limit, offset],
+            )
+        else:
+            match = _fts5_query(text)
+            if not match:
+                return []
+            visible, visible_params = _visible("f.rowid")
+            cursor.execute(
+                f"SELECT f.rowid FROM {SQLITE_TABLE} f "
+                f"WHERE {SQLITE_TABLE} MATCH %s AND {visible} "
+                f"ORDER BY bm25({SQLITE_TABLE}, {SQLITE_WEIGHTS}), f.rowid DESC "
+                "LIMIT %s OFFSET %s",
+                [match, *visible_params, limit, offset],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(text, limit, offset):
+    from .models import Product
+
+    q = Q()
+    for field in ("title", "description", "brand", "tags", "sku"):
+        q |= Q(**{f"{field}__icontains": text})
+    qs = Product.objects.visible().filter(q).values_list("id", flat=True)
+    return list(qs[offset:offset + limit])
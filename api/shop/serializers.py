@@ -1,6 +1,18 @@
 from rest_framework import serializers
 from decimal import Decimal, InvalidOperation
-from .models import Category, Product, ProductImage, SiteSetting, CustomerProfile, CustomerAddress, Order, OrderItem, OrderStatus, Coupon
+from django.db import transaction
+from .models import Category, ImageJob, Product, ProductAttribute, ProductImage, SiteSetting, CustomerProfile, CustomerAddress, Order, OrderItem, OrderStatus, Coupon
+from .category_tree import get_category_tree
+from .attributes import parse_colors, split_csv
+from . import coupons, images, inventory, sales
+from .order_numbers import next_order_number
+
+
+def image_job_status(job):
+    # Job de variantes criado pelo upload (shop.image_jobs); o admin acompanha em /admin/image-jobs/<id>/
+    if job is None:
+        return None
+    return {"id": job.pk, "status": job.status}
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,11 +21,13 @@ class CategorySerializer(serializers.ModelSerializer):
     sort_order = serializers.IntegerField(required=False)
     group_title = serializers.CharField(required=False, allow_blank=True)
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    image_job = serializers.SerializerMethodField()
     children = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ["id", "name", "slug", "parent", "parent_id", "sort_order", "group_title", "image", "image_url", "children", "created_at"]
+        fields = ["id", "name", "slug", "parent", "parent_id", "sort_order", "group_title", "image", "image_url", "image_variants", "image_job", "children", "created_at"]
 
     def get_image_url(self, obj):
         try:
@@ -23,19 +37,38 @@ class CategorySerializer(serializers.ModelSerializer):
             pass
         return None
 
+    def get_image_variants(self, obj):
+        # srcset (shop.images): [{"url", "format", "width", "height"}]
+        return images.srcset(obj.image_variants)
+
+    def get_image_job(self, obj):
+        return image_job_status(getattr(obj, "_image_job", None))
+
+    def _category_tree(self):
+        # Uma leitura da árvore por requisição, compartilhada pelos serializers aninhados
+        tree = self.context.get("category_tree")
+        if tree is None:
+            tree = get_category_tree()
+            self.context["category_tree"] = tree
+        return tree
+
     def get_children(self, obj):
         try:
-            qs = obj.children.all().order_by("sort_order", "name")
+            tree = self._category_tree()
+            node = tree.node(obj.id)
+            if node is None:
+                return []
             return [
                 {
-                    "id": c.id,
-                    "name": c.name,
-                    "slug": c.slug,
-                    "sort_order": getattr(c, "sort_order", 0),
-                    "group_title": getattr(c, "group_title", "") or "",
-                    "image_url": (c.image.url if c.image else None),
+                    "id": c.category.id,
+                    "name": c.category.name,
+                    "slug": c.category.slug,
+                    "sort_order": c.category.sort_order,
+                    "group_title": c.category.group_title or "",
+                    "image_url": c.image_url,
+                    "image_variants": images.srcset(c.category.image_variants),
                 }
-                for c in qs
+                for c in node.children
             ]
         except Exception:
             return []
@@ -167,6 +200,7 @@ class ProductSerializer(serializers.ModelSerializer):
             {
                 "id": img.id,
                 "url": img.image.url if img.image else None,
+                "variants": images.srcset(img.variants),
                 "alt_text": img.alt_text,
                 "is_primary": img.is_primary,
             }
@@ -180,69 +214,83 @@ class ProductSerializer(serializers.ModelSerializer):
             return (obj.stock_quantity or 0) > 0
         return True
 
-    def _split_csv(self, text):
-        if not text:
-            return []
-        # Split por vírgula e ponto-e-vírgula, remover espaços extras, ignorar vazios
-        parts = []
-        for ch in [",", ";"]:
-            if ch in text:
-                parts = [p.strip() for p in text.split(ch)]
-                break
-        if not parts:
-            parts = [text.strip()]
-        return [p for p in parts if p]
+    def _attributes(self, obj, kind):
+        # Usa os atributos normalizados quando vieram no prefetch (Product.objects.with_related)
+        cache = getattr(obj, "_prefetched_objects_cache", {})
+        if "attributes" not in cache:
+            return None
+        return [a for a in cache["attributes"] if a.kind == kind]
 
     def get_colors(self, obj):
-        """
-        Retorna lista de objetos {name, hex} a partir de available_colors.
-        Aceita formatos:
-        - "Nome|#hex" (preferido)
-        - "Nome:#hex"
-        - "#hex" ou "rgb(...)" ou "hsl(...)" (usa como name e hex)
-        - "Nome" (sem cor definida)
-        """
-        import re
         try:
-            raw = getattr(obj, "available_colors", "") or ""
-            items = self._split_csv(raw)
-            color_re = re.compile(r"^(#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})|rgb\(|hsl\()")
-            out = []
-            for it in items:
-                s = (it or "").strip()
-                name = ""
-                hexv = None
-                if "|" in s:
-                    parts = s.split("|", 1)
-                    name = (parts[0] or "").strip()
-                    hexv = (parts[1] or "").strip() or None
-                elif ":" in s:
-                    parts = s.split(":", 1)
-                    name = (parts[0] or "").strip()
-                    hexv = (parts[1] or "").strip() or None
-                else:
-                    if color_re.match(s):
-                        name = s
-                        hexv = s
-                    else:
-                        name = s
-                        hexv = None
-                out.append({"name": name, "hex": hexv})
-            return out
+            attrs = self._attributes(obj, ProductAttribute.COLOR)
+            if attrs is not None:
+                return [{"name": a.value, "hex": a.hex or None} for a in attrs]
+            return parse_colors(getattr(obj, "available_colors", "") or "")
         except Exception:
             return []
 
     def get_sizes(self, obj):
         try:
-            return self._split_csv(getattr(obj, "available_sizes", ""))
+            attrs = self._attributes(obj, ProductAttribute.SIZE)
+            if attrs is not None:
+                return [a.value for a in attrs]
+            return split_csv(getattr(obj, "available_sizes", ""))
         except Exception:
             return []
 
 
+class ImportCategoryField(serializers.PrimaryKeyRelatedField):
+    # Usa as categorias carregadas uma vez por importação (context["_categories"])
+    def to_internal_value(self, data):
+        categories = self.context.get("_categories")
+        if categories is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        category = categories.get(pk)
+        if category is None:
+            self.fail("does_not_exist", pk_value=data)
+        return category
+
+
+class ProductImportSerializer(ProductSerializer):
+    """Mesmas regras do ProductSerializer, sem queries por linha (shop.product_io)."""
+    category_id = ImportCategoryField(queryset=Category.objects.all(), source="category", write_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        # Unicidade do slug é resolvida pelo upsert da importação
+        extra_kwargs = {"slug": {"validators": []}}
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+    image_job = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ["id", "product", "image", "alt_text", "is_primary", "sort_order", "created_at"]
+        fields = ["id", "product", "image", "variants", "image_job", "alt_text", "is_primary", "sort_order", "created_at"]
+
+    def get_variants(self, obj):
+        return images.srcset(obj.variants)
+
+    def get_image_job(self, obj):
+        return image_job_status(getattr(obj, "_image_job", None))
+
+
+class ImageJobSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageJob
+        fields = ["id", "kind", "object_id", "name", "status", "attempts", "last_error", "variants", "created_at", "updated_at"]
+
+    def get_variants(self, obj):
+        return images.srcset(obj.variants)
 
 
 class SiteSettingSerializer(serializers.ModelSerializer):
@@ -286,8 +334,39 @@ class CustomerAddressSerializer(serializers.ModelSerializer):
         ]
 
 
+class OrderItemProductField(serializers.PrimaryKeyRelatedField):
+    # Usa os produtos carregados em lote por OrderItemListSerializer (uma query por pedido)
+    def to_internal_value(self, data):
+        products = self.context.get("_order_products")
+        if products is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        product = products.get(pk)
+        if product is None:
+            self.fail("does_not_exist", pk_value=data)
+        return product
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item.get("product_id")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context["_order_products"] = Product.objects.in_bulk(ids) if ids else {}
+        return super().to_internal_value(data)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
-    product_id = serializers.PrimaryKeyRelatedField(
+    product_id = OrderItemProductField(
         queryset=Product.objects.all(), source="product", write_only=True, required=False
     )
     # Permitir URLs relativas ou strings simples sem validar esquema
@@ -295,6 +374,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
+        list_serializer_class = OrderItemListSerializer
         fields = [
             "id",
             "product_id",
@@ -338,38 +418,62 @@ class OrderSerializer(serializers.ModelSerializer):
         # Extra: normaliza desconto
         discount = validated_data.pop("discount_amount", None)
         coupon_code = validated_data.pop("coupon_code", "")
-        order = Order.objects.create(user=user, coupon_code=coupon_code or "", discount_amount=discount or 0, **validated_data)
-        total = 0
+
+        # Totais calculados antes de gravar, sempre em Decimal
+        lines = []
+        subtotal = Decimal("0")
         for it in items_data:
             qty = int(it.get("quantity", 1) or 1)
-            price = it.get("unit_price")
-            # Garantir Decimal coerente para salvar e calcular
             try:
-                price_dec = Decimal(str(price))
+                price_dec = Decimal(str(it.get("unit_price")))
             except (InvalidOperation, TypeError, ValueError):
                 price_dec = Decimal("0")
-            oi_data = {**it, "unit_price": price_dec}
-            OrderItem.objects.create(order=order, **oi_data)
-            total += qty * float(price_dec)
-        # Aplica desconto
+            lines.append({**it, "unit_price": price_dec})
+            subtotal += price_dec * qty
         try:
-            discount_dec = Decimal(str(order.discount_amount or 0))
+            discount_dec = Decimal(str(discount or 0))
         except (InvalidOperation, TypeError, ValueError):
             discount_dec = Decimal("0")
-        total_dec = Decimal(str(total)) - (discount_dec if discount_dec >= 0 else Decimal("0"))
-        if total_dec < Decimal("0"):
-            total_dec = Decimal("0")
-        order.total = total_dec
-        order.save(update_fields=["total"])
-        # Incrementa uso de cupom se válido
+        coupon = None
         if coupon_code:
-            try:
-                c = Coupon.objects.filter(code=coupon_code).first()
-                if c and c.is_valid():
-                    c.used_count = (c.used_count or 0) + 1
-                    c.save(update_fields=["used_count"])
-            except Exception:
-                pass
+            # Validação sem trava, antes de reservar estoque: cupom inválido falha na hora.
+            # Com cupom, o desconto é o do cupom (não o enviado pelo cliente)
+            coupon = coupons.check(coupon_code, user, subtotal)
+            discount = discount_dec = coupons.discount_for(coupon, subtotal)
+        total = subtotal - (discount_dec if discount_dec >= 0 else Decimal("0"))
+        if total < Decimal("0"):
+            total = Decimal("0")
+
+        # Número tirado fora da transação: vem do bloco do worker, sem travar o contador do dia
+        order_number = next_order_number()
+        with transaction.atomic():
+            # Reserva o estoque antes de gravar o pedido; qualquer falta desfaz tudo
+            stock_lines = [
+                (index, line.get("product"), int(line.get("quantity", 1) or 1))
+                for index, line in enumerate(lines)
+            ]
+            shortages = inventory.reserve(stock_lines)
+            if shortages:
+                raise inventory.OutOfStock(shortages)
+            order = Order(
+                user=user,
+                order_number=order_number,
+                **Order.delivery_region(validated_data.get("delivery_address")),
+                coupon_code=coupon.code if coupon else "",
+                discount_amount=discount or 0,
+                total=total.quantize(Decimal("0.01")),
+                stock_reserved=any(p is not None and p.track_inventory for _i, p, _q in stock_lines),
+                **validated_data,
+            )
+            # Consolidação de vendas do pedido e dos itens (bulk_create, sem sinais) só depois do commit
+            order._sales_deferred = True
+            order.save(force_insert=True)
+            del order._sales_deferred
+            items = OrderItem.objects.bulk_create([OrderItem(order=order, **line) for line in lines])
+            sales.record_checkout(order, items)
+            # Por último: o UPDATE condicional do contador trava o cupom só até o commit
+            if coupon is not None:
+                coupons.redeem(coupon, order, discount_dec)
         return order
 
 
@@ -383,6 +487,7 @@ class CouponSerializer(serializers.ModelSerializer):
             "discount_type",
             "value",
             "max_uses",
+            "max_uses_per_customer",
             "used_count",
             "min_order_total",
             "expires_at",
@@ -419,6 +524,9 @@ class AdminOrderSerializer(serializers.ModelSerializer):
             "shipping_address_text",
             "delivery_address",
             "delivery_address_id",
+            "delivery_estado",
+            "delivery_cidade",
+            "delivery_cep_prefix",
             "created_at",
             "updated_at",
             "items",
@@ -428,7 +536,16 @@ class AdminOrderSerializer(serializers.ModelSerializer):
             "customer_profile",
             "customer_addresses",
         ]
-        read_only_fields = ["order_number", "created_at", "updated_at", "total"]
+        read_only_fields = [
+            "order_number", "created_at", "updated_at", "total",
+            "delivery_estado", "delivery_cidade", "delivery_cep_prefix",
+        ]
+
+    def update(self, instance, validated_data):
+        # Troca do endereço de entrega leva junto a região usada nos relatórios
+        if "delivery_address" in validated_data:
+            validated_data.update(Order.delivery_region(validated_data["delivery_address"]))
+        return super().update(instance, validated_data)
 
     def get_customer_name(self, obj):
         user = getattr(obj, "user", None)
@@ -453,14 +570,18 @@ class AdminOrderSerializer(serializers.ModelSerializer):
         user = getattr(obj, "user", None)
         if not user:
             return []
-        addrs = CustomerAddress.objects.filter(user=user).order_by('-is_default_delivery', '-created_at')
-        return CustomerAddressSerializer(addrs, many=True).data
+        # Usa o prefetch de Order.objects.with_related(addresses=True) (ordem do Meta de CustomerAddress)
+        return CustomerAddressSerializer(user.addresses.all(), many=True).data
 
     def get_customer_profile(self, obj):
         user = getattr(obj, "user", None)
         if not user:
             return None
-        profile = CustomerProfile.objects.filter(user=user).first()
+        # Vem no select_related de Order.objects.with_related()
+        try:
+            profile = user.profile
+        except CustomerProfile.DoesNotExist:
+            profile = None
         data = CustomerProfileSerializer(profile).data if profile else None
         # Enriquecer com username e nome completo
         first = getattr(user, "first_name", "") or ""
@@ -475,6 +596,13 @@ class AdminOrderSerializer(serializers.ModelSerializer):
         }
 
 
+class AdminOrderListSerializer(AdminOrderSerializer):
+    """Listagem do admin: sem o caderno de endereços do cliente (fica no detalhe)."""
+
+    class Meta(AdminOrderSerializer.Meta):
+        fields = [f for f in AdminOrderSerializer.Meta.fields if f != "customer_addresses"]
+
+
 class AdminCustomerSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     username = serializers.CharField(read_only=True)
@@ -484,9 +612,12 @@ class AdminCustomerSerializer(serializers.Serializer):
     profile = CustomerProfileSerializer(required=False)
 
     def to_representation(self, instance):
-        from django.contrib.auth import get_user_model
         user = instance
-        profile = CustomerProfile.objects.filter(user=user).first()
+        # Perfil vem no select_related das views do admin
+        try:
+            profile = user.profile
+        except CustomerProfile.DoesNotExist:
+            profile = None
         return {
             "id": getattr(user, "id", None),
             "username": getattr(user, "username", None),
@@ -521,6 +652,8 @@ class AdminCustomerSerializer(serializers.Serializer):
                 if val is not None:
                     setattr(profile, field, val)
             profile.save()
+            # Substitui o perfil do select_related na resposta
+            instance.profile = profile
 
         return instance
 
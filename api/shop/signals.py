@@ -0,0 +1,199 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    Category, CustomerAddress, CustomerProfile, ImageJob, Order, OrderItem, Product, ProductImage, SiteSetting,
+)
+from .response_cache import invalidate_categories, invalidate_customers, invalidate_products
+from . import autocomplete, customer_search, image_jobs, sales, search, site_settings
+from .attributes import sync_product_attributes
+
+
+# As invalidações rodam só após o commit: outro worker não pode reconstruir
+# a árvore/respostas com dados antigos sob a versão nova.
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    # Também invalida as respostas de produtos, que embutem a categoria
+    transaction.on_commit(invalidate_categories)
+
+
+@receiver(post_save, sender=Category)
+def update_category_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.update_category(instance))
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_autocomplete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.remove_category(pk))
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = Product.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_responses(sender, instance, **kwargs):
+    slugs = (instance.slug, getattr(instance, "_previous_slug", None))
+    transaction.on_commit(lambda: invalidate_products(*slugs))
+
+
+@receiver(post_save, sender=Product)
+def sync_attributes(sender, instance, update_fields=None, **kwargs):
+    # Saves parciais que não tocam os campos CSV não precisam reescrever os atributos
+    if update_fields is not None and not {"available_colors", "available_sizes", "tags"} & set(update_fields):
+        return
+    sync_product_attributes(instance)
+
+
+@receiver(post_save, sender=Product)
+def index_product_search(sender, instance, **kwargs):
+    # Na mesma transação do save: o índice de busca nunca fica à frente/atrás do produto
+    search.index_product(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_search(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_product_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.update_product(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_autocomplete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.remove_product(pk))
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image_responses(sender, instance, **kwargs):
+    try:
+        slug = instance.product.slug
+    except Product.DoesNotExist:
+        slug = None
+    transaction.on_commit(lambda: invalidate_products(slug))
+
+
+@receiver(post_save, sender=SiteSetting)
+@receiver(post_delete, sender=SiteSetting)
+def invalidate_site_setting(sender, **kwargs):
+    transaction.on_commit(site_settings.invalidate)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=CustomerProfile)
+@receiver(post_save, sender=CustomerAddress)
+@receiver(post_delete, sender=CustomerAddress)
+def invalidate_customer_validators(sender, **kwargs):
+    transaction.on_commit(invalidate_customers)
+
+
+# Campos de User que entram no índice de busca de clientes (login só muda last_login)
+CUSTOMER_SEARCH_FIELDS = {"username", "email", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_customer_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not CUSTOMER_SEARCH_FIELDS & set(update_fields):
+        return
+    customer_search.index_customer(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_customer_search(sender, instance, **kwargs):
+    customer_search.remove_customer(instance.pk)
+
+
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=CustomerProfile)
+def index_customer_profile_search(sender, instance, **kwargs):
+    customer_search.index_customer(instance.user_id)
+
+
+# Variantes responsivas (shop.images): enfileiradas (shop.image_jobs) quando o arquivo da imagem muda
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=ProductImage)
+def remember_previous_image(sender, instance, **kwargs):
+    instance._previous_image = None
+    if instance.pk:
+        instance._previous_image = sender.objects.filter(pk=instance.pk).values_list("image", flat=True).first() or None
+
+
+@receiver(post_save, sender=Category)
+def schedule_category_image_variants(sender, instance, created, **kwargs):
+    if _image_changed(instance, created):
+        image_jobs.schedule(instance, ImageJob.CATEGORY)
+
+
+@receiver(post_save, sender=ProductImage)
+def schedule_product_image_variants(sender, instance, created, **kwargs):
+    if _image_changed(instance, created):
+        image_jobs.schedule(instance, ImageJob.PRODUCT_IMAGE)
+
+
+def _image_changed(instance, created):
+    name = instance.image.name if instance.image else None
+    return (created and bool(name)) or name != getattr(instance, "_previous_image", name)
+
+
+# Consolidação diária de vendas (shop.sales): na mesma transação do pedido/item.
+# O pedido do checkout (`_sales_deferred`) e os itens dele (bulk_create, sem sinais) entram
+# por sales.record_checkout no serializer, depois do commit.
+@receiver(pre_save, sender=Order)
+def remember_previous_order_sales(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._sales_skip = (
+        raw
+        or getattr(instance, "_sales_deferred", False)
+        or (update_fields is not None and not set(sales.ORDER_FIELDS) & set(update_fields))
+    )
+    instance._sales_before = None
+    if instance.pk and not instance._sales_skip:
+        instance._sales_before = sales.stored_order_state(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def record_order_sales(sender, instance, created, **kwargs):
+    if getattr(instance, "_sales_skip", False):
+        return
+    if created or instance._sales_before is not None:
+        sales.record_order(None if created else instance._sales_before, instance)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_sales(sender, instance, **kwargs):
+    sales.remove_order(instance)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_previous_item_sales(sender, instance, raw=False, **kwargs):
+    instance._sales_before = sales.stored_item_state(instance.pk) if instance.pk and not raw else None
+
+
+@receiver(post_save, sender=OrderItem)
+def record_item_sales(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sales.record_item(instance._sales_before, instance)
+
+
+@receiver(post_delete, sender=OrderItem)
+def remove_item_sales(sender, instance, **kwargs):
+    sales.record_item({field: getattr(instance, field) for field in sales.ITEM_FIELDS}, None)
+
+
+@receiver(post_delete, sender=Product)
+def forget_product_sales(sender, instance, **kwargs):
+    sales.forget_product(instance.pk)
@@ -0,0 +1,45 @@
+import threading
+
+from .models import SiteSetting
+from .versions import bump_version, get_version
+
+# Configuração da loja (linha única de SiteSetting) mantida em memória por processo.
+# Cada leitura só confere a versão compartilhada (shop.versions); a linha é relida depois
+# de um save/delete (sinal em shop.signals). Quem precisa de site_name, primary_color ou
+# currency usa get_site_setting() em vez de consultar a tabela.
+VERSION_NAME = "site_setting"
+
+_lock = threading.Lock()
+_state = {"version": None, "setting": None}
+
+
+def _load():
+    setting = SiteSetting.objects.order_by("pk").first()
+    if setting is None:
+        setting = SiteSetting.objects.create()
+    return setting
+
+
+def get_site_setting():
+    """
+    Retorna a configuração do processo (compartilhada entre threads: não altere o objeto;
+    para editar, leia a linha do banco, como SiteSettingView faz).
+    """
+    version = get_version(VERSION_NAME)
+    if version is None:
+        # Backend de cache sem persistência (ex.: DummyCache): não há como invalidar, então não guarda
+        return _load()
+    setting = _state["setting"]
+    if setting is not None and _state["version"] == version:
+        return setting
+    with _lock:
+        if _state["setting"] is not None and _state["version"] == version:
+            return _state["setting"]
+        setting = _load()
+        _state["setting"] = setting
+        _state["version"] = version
+        return setting
+
+
+def invalidate():
+    bump_version(VERSION_NAME)
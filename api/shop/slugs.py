@@ -0,0 +1,90 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Slugs únicos com sufixo -2, -3, ... a partir de uma única query por base:
+# busca todos os slugs "base" e "base-*" já gravados e escolhe o primeiro sufixo livre.
+MAX_RETRIES = 5
+# Bases por query no modo em lote (cada uma vira um LIKE 'base-%')
+BATCH_CHUNK = 200
+
+
+def _max_length(model):
+    return model._meta.get_field("slug").max_length
+
+
+def base_slug(model, text, fallback):
+    # Reserva espaço para o sufixo numérico dentro do max_length do campo
+    base = slugify(text or "") or fallback
+    return base[: _max_length(model) - 8].strip("-") or fallback
+
+
+def _taken_query(bases):
+    query = Q()
+    for base in bases:
+        query |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    return query
+
+
+def _next_free(base, taken):
+    if base not in taken:
+        return base
+    suffix = 2
+    while f"{base}-{suffix}" in taken:
+        suffix += 1
+    return f"{base}-{suffix}"
+
+
+def allocate_slug(model, text, fallback, exclude_pk=None):
+    """Próximo slug livre para `text` (uma query)."""
+    base = base_slug(model, text, fallback)
+    existing = model._default_manager.filter(_taken_query([base]))
+    if exclude_pk is not None:
+        existing = existing.exclude(pk=exclude_pk)
+    return _next_free(base, set(existing.values_list("slug", flat=True)))
+
+
+def allocate_slugs(model, texts, fallback, reserved=()):
+    """
+    Slugs únicos para vários registros novos de uma vez (importações em lote):
+    uma query a cada BATCH_CHUNK bases distintas, e unicidade também dentro do lote.
+    `reserved` são slugs que o chamador vai gravar junto e também não podem ser usados.
+    """
+    bases = [base_slug(model, text, fallback) for text in texts]
+    distinct = sorted(set(bases))
+    taken = set(reserved)
+    for start in range(0, len(distinct), BATCH_CHUNK):
+        chunk = distinct[start:start + BATCH_CHUNK]
+        taken.update(model._default_manager.filter(_taken_query(chunk)).values_list("slug", flat=True))
+    slugs = []
+    for base in bases:
+        slug = _next_free(base, taken)
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def _slug_conflict(instance):
+    return type(instance)._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+
+
+def save_with_slug(instance, save, text, fallback, *args, **kwargs):
+    """
+    Salva `instance` gerando o slug se estiver vazio. Se outro processo gravar o mesmo slug
+    entre a escolha e o INSERT, recalcula e tenta de novo (savepoint por tentativa).
+    """
+    if instance.slug:
+        return save(*args, **kwargs)
+    model = type(instance)
+    for attempt in range(MAX_RETRIES):
+        instance.slug = allocate_slug(model, text, fallback, exclude_pk=instance.pk)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            if attempt == MAX_RETRIES - 1 or not _slug_conflict(instance):
+                instance.slug = ""
+                raise
+    return None
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Storage endereçado por conteúdo: o nome final de cada arquivo é o SHA-256 do conteúdo,
+# calculado enquanto o upload é gravado em disco ("products/3f/3fa9...e1.jpg"). O mesmo
+# arquivo enviado de novo não é regravado: save() devolve o nome (e a URL) já existente.
+# Como o conteúdo de um nome nunca muda, as URLs podem ser servidas com cache imutável.
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+
+# "<pasta>/<2 primeiros hex>/<sha256>.<ext>"
+CONTENT_ADDRESSED_RE = re.compile(r"^(?:[\w.-]+/)*[0-9a-f]{2}/[0-9a-f]{64}(?:\.[\w]+)?$")
+_SHARD_RE = re.compile(r"^[0-9a-f]{2}$")
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_RE.match(name or ""))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage que guarda cada conteúdo uma vez, sob o seu hash. Nomes antigos
+    (anteriores a este storage) continuam sendo lidos/servidos normalmente.
+    """
+
+    hash_name = "sha256"
+
+    def get_available_name(self, name, max_length=None):
+        # O nome definitivo sai do conteúdo em _save: não há colisão a resolver
+        return name
+
+    def _save(self, name, content):
+        directory, basename = posixpath.split(name.replace("\\", "/"))
+        ext = os.path.splitext(basename)[1].lower()
+        # Derivados de um blob ("products/3f/3fa9...-640w.webp") vão para a pasta de origem, não para dentro do shard
+        parent, shard = posixpath.split(directory)
+        if _SHARD_RE.match(shard) and basename.startswith(shard):
+            directory = parent
+        tmp_dir = self.path(directory or ".")
+        os.makedirs(tmp_dir, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(tmp_dir, self.directory_permissions_mode)
+        digest = hashlib.new(self.hash_name)
+        # Grava num temporário da mesma pasta (mesmo sistema de arquivos) calculando o hash
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload-", dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+            hexdigest = digest.hexdigest()
+            final = posixpath.join(directory, hexdigest[:2], f"{hexdigest}{ext}")
+            final_path = self.path(final)
+            if os.path.exists(final_path):
+                # Duplicado: mantém o blob existente
+                os.unlink(tmp_path)
+                return final
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            # os.replace é atômico: dois uploads simultâneos do mesmo conteúdo gravam o mesmo blob
+            os.replace(tmp_path, final_path)
+            return final
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def delete(self, name):
+        # Blobs endereçados por conteúdo podem ser compartilhados por vários registros
+        # (e pelas variantes de imagens iguais): não são apagados individualmente
+        if is_content_addressed(name):
+            return
+        super().delete(name)
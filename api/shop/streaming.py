@@ -0,0 +1,54 @@
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+# Respostas CSV/JSONL geradas linha a linha (exportações do admin): nada é montado
+# inteiro em memória, o worker só segura um lote de linhas por vez.
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+CONTENT_TYPES = {CSV: "text/csv; charset=utf-8", JSONL: "application/x-ndjson; charset=utf-8"}
+# Linhas por pedaço enviado ao cliente
+FLUSH_EVERY = 100
+
+
+class Echo:
+    # csv.writer escreve aqui e o gerador devolve a linha pronta
+    def write(self, value):
+        return value
+
+
+def _batched(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= FLUSH_EVERY:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(["" if v is None else v for v in row])
+
+
+def jsonl_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), default=str, ensure_ascii=False) + "\n"
+
+
+def stream(header, rows, file_format):
+    lines = jsonl_lines(header, rows) if file_format == JSONL else csv_lines(header, rows)
+    return _batched(lines)
+
+
+def streaming_response(header, rows, file_format, filename):
+    file_format = file_format if file_format in FORMATS else CSV
+    response = StreamingHttpResponse(stream(header, rows, file_format), content_type=CONTENT_TYPES[file_format])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{file_format}"'
+    return response
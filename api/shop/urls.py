@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryListView,
     ProductListView,
     ProductDetailView,
+    ProductSearchView,
+    ProductAutocompleteView,
+    ProductFacetsView,
     CategoryViewSet,
     ProductViewSet,
     ProductImageViewSet,
+    ImageJobViewSet,
     SiteSettingView,
     AddressListCreateView,
     AddressDetailView,
@@ -17,6 +22,8 @@ from .views import (
     AdminCustomerView,
     AdminCustomerListView,
     AdminOrderByNumberView,
+    SalesReportView,
+    SalesByRegionView,
     AdminBannerUploadView,
     ApplyCouponView,
 )
@@ -25,14 +32,27 @@ router = DefaultRouter()
 router.register(r'admin/categories', CategoryViewSet, basename='admin-categories')
 router.register(r'admin/products', ProductViewSet, basename='admin-products')
 router.register(r'admin/product-images', ProductImageViewSet, basename='admin-product-images')
+router.register(r'admin/image-jobs', ImageJobViewSet, basename='admin-image-jobs')
 router.register(r'admin/orders', OrderViewSet, basename='admin-orders')
 router.register(r'admin/order-statuses', OrderStatusViewSet, basename='admin-order-statuses')
 router.register(r'admin/coupons', CouponViewSet, basename='admin-coupons')
 
+if settings.SHOP_ASYNC_CATALOG:
+    # Servidor ASGI (api/asgi.py): leitura do catálogo pelas views async, mesmas URLs e respostas
+    from .async_views import (
+        AsyncCategoryListView as CategoryListView,
+        AsyncProductDetailView as ProductDetailView,
+        AsyncProductListView as ProductListView,
+        AsyncSiteSettingView as SiteSettingView,
+    )
+
 urlpatterns = [
     # Públicos
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('products/', ProductListView.as_view(), name='product-list'),
+    path('products/search/', ProductSearchView.as_view(), name='product-search'),
+    path('products/autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
+    path('products/facets/', ProductFacetsView.as_view(), name='product-facets'),
     path('products/<slug:slug>/', ProductDetailView.as_view(), name='product-detail'),
     # Endereços do cliente (autenticado)
     path('addresses/', AddressListCreateView.as_view(), name='address-list-create'),
@@ -43,6 +63,8 @@ urlpatterns = [
     path('admin/customers/', AdminCustomerListView.as_view(), name='admin-customer-list'),
     path('admin/customers/<int:pk>/', AdminCustomerView.as_view(), name='admin-customer-detail'),
     path('admin/orders/by-number/<slug:order_number>/', AdminOrderByNumberView.as_view(), name='admin-order-by-number'),
+    path('admin/sales/', SalesReportView.as_view(), name='admin-sales'),
+    path('admin/sales/regions/', SalesByRegionView.as_view(), name='admin-sales-regions'),
     # Admin
     path('', include(router.urls)),
     path('admin/site-setting/', SiteSettingView.as_view(), name='site-setting'),
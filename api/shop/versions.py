@@ -0,0 +1,58 @@
+import time
+
+from django.core.cache import cache
+
+# Chaves de geração compartilhadas entre workers (via cache). Um "bump" muda o valor e
+# invalida tudo que foi derivado da geração anterior, sem varrer nem apagar chaves.
+PREFIX = "shop:gen:"
+
+
+def version_key(name):
+    return f"{PREFIX}{name}"
+
+
+def get_versions(names):
+    """Retorna {nome: versão} em uma única ida ao cache; None se o backend não guardar nada."""
+    keys = {version_key(n): n for n in names}
+    found = cache.get_many(list(keys))
+    missing = [k for k in keys if k not in found]
+    if missing:
+        # Semente baseada no relógio evita reaproveitar uma versão antiga após expurgo do cache
+        seed = time.time_ns()
+        for k in missing:
+            cache.add(k, seed, timeout=None)
+        found.update(cache.get_many(missing))
+    return {n: found.get(k) for k, n in keys.items()}
+
+
+async def aget_versions(names):
+    """get_versions para código async (shop.async_views), pela API async do cache."""
+    keys = {version_key(n): n for n in names}
+    found = await cache.aget_many(list(keys))
+    missing = [k for k in keys if k not in found]
+    if missing:
+        seed = time.time_ns()
+        for k in missing:
+            await cache.aadd(k, seed, timeout=None)
+        found.update(await cache.aget_many(missing))
+    return {n: found.get(k) for k, n in keys.items()}
+
+
+def get_version(name):
+    return get_versions([name])[name]
+
+
+def bump_version(name):
+    """Muda a versão e devolve o novo valor."""
+    key = version_key(name)
+    seed = time.time_ns()
+    if cache.add(key, seed, timeout=None):
+        return seed
+    try:
+        value = cache.incr(key)
+        # Alguns backends regravam a chave com o timeout padrão no incr
+        cache.touch(key, None)
+        return value
+    except ValueError:
+        cache.set(key, seed, timeout=None)
+        return seed
@@ -1,54 +1,145 @@
 from rest_framework import generics, viewsets, status
+from rest_framework.decorators import action
 from django.db.models import Q
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.db.models.deletion import ProtectedError
 from django.core.files.storage import default_storage
-import uuid
-import os
+from django.views.static import serve as static_serve
+import csv
+from decimal import Decimal, InvalidOperation
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from .models import Category, Product, ProductImage, SiteSetting, CustomerProfile, CustomerAddress, Order, OrderStatus, Coupon
+from django.conf import settings
+from django.db import transaction
+from .models import Category, ImageJob, Product, ProductImage, SiteSetting, CustomerProfile, CustomerAddress, Order, OrderStatus, Coupon
 from django.utils.dateparse import parse_date
 from .serializers import (
     CategorySerializer,
     ProductSerializer,
     ProductImageSerializer,
+    ImageJobSerializer,
+    image_job_status,
     SiteSettingSerializer,
     CustomerProfileSerializer,
     CustomerAddressSerializer,
     OrderSerializer,
     AdminOrderSerializer,
+    AdminOrderListSerializer,
     OrderStatusSerializer,
     AdminCustomerSerializer,
     CouponSerializer,
 )
 from .permissions import IsStaffOrReadOnly
+from .pagination import KeysetPagination, OptionalPageNumberPagination, ShopPageNumberPagination
+from .category_tree import get_category_tree
+from .response_cache import CachedResponseMixin, CATEGORIES, CUSTOMERS, PRODUCTS, cached_response, product_generation
+from .conditional import ConditionalGetMixin
+from .customer_search import filter_customers
+from .site_settings import get_site_setting
+from .streaming import streaming_response
+from .storage import CACHE_CONTROL_IMMUTABLE, is_content_addressed
+from .search import search_product_ids
+from .attributes import facet_counts, filter_products
+from . import autocomplete, coupons, image_jobs, images, inventory, order_export, order_search, product_io, sales
+
+
+class CategoryListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    serializer_class = CategorySerializer
+    # Category não tem updated_at: edições são cobertas pela geração "categories"
+    validator_timestamp_field = "created_at"
 
+    def get_cache_generations(self):
+        return [CATEGORIES]
 
-class CategoryListView(generics.ListAPIView):
-    queryset = Category.objects.all()
-    serializer_class = CategorySerializer
+    def get_validator_generations(self):
+        return [CATEGORIES]
 
+    def get_queryset(self):
+        # Servido da árvore em memória do processo (invalidada por versão)
+        return get_category_tree().categories()
 
-class ProductListView(generics.ListAPIView):
-    queryset = (
-        Product.objects.select_related("category")
-        .filter(is_active=True)
-        .filter(Q(track_inventory=False) | Q(stock_quantity__gt=0))
-    )
+
+class ProductListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # Filtros ?color= ?size= ?tag= ?category= pelo índice de atributos
+        return filter_products(Product.objects.with_related().visible(), self.request.query_params)
 
+    def get_cache_generations(self):
+        return [CATEGORIES, PRODUCTS]
 
-class ProductDetailView(generics.RetrieveAPIView):
+    def get_validator_generations(self):
+        # Imagens e categoria embutidas não alteram Product.updated_at
+        return [CATEGORIES, PRODUCTS]
+
+
+class ProductDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
     lookup_field = "slug"
     queryset = (
-        Product.objects.select_related("category")
+        Product.objects.with_related()
         .filter(is_active=True)
     )
     serializer_class = ProductSerializer
 
+    def get_cache_generations(self):
+        return [CATEGORIES, product_generation(self.kwargs.get("slug"))]
+
+    def get_validator_generations(self):
+        return self.get_cache_generations()
+
+
+class ProductSearchView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = ProductSerializer
+
+    def get_cache_generations(self):
+        return [CATEGORIES, PRODUCTS]
+
+    def _int_param(self, name, default, maximum=None):
+        try:
+            value = int(self.request.query_params.get(name, default))
+        except (TypeError, ValueError):
+            value = default
+        value = max(value, 0)
+        return min(value, maximum) if maximum else value
+
+    def get_queryset(self):
+        # Ids já vêm ordenados por relevância; carrega os produtos e preserva a ordem
+        limit = self._int_param("limit", settings.SHOP_PAGE_SIZE, settings.SHOP_MAX_PAGE_SIZE) or settings.SHOP_PAGE_SIZE
+        offset = self._int_param("offset", 0)
+        ids = search_product_ids(self.request.query_params.get("q", ""), limit, offset)
+        if not ids:
+            return []
+        products = Product.objects.with_related().in_bulk(ids)
+        return [products[i] for i in ids if i in products]
+
+
+class ProductFacetsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        # Contagens por cor/tamanho/tag para o filtro atual (mesmos parâmetros da listagem)
+        def build():
+            products = filter_products(Product.objects.visible(), request.query_params)
+            return Response(facet_counts(products))
+        return cached_response(request, [CATEGORIES, PRODUCTS], build)
+
+
+class ProductAutocompleteView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        q = str(request.query_params.get("q", "")).strip()
+        try:
+            limit = int(request.query_params.get("limit", 8))
+        except (TypeError, ValueError):
+            limit = 8
+        limit = min(max(limit, 1), 20)
+        return Response({"query": q, "suggestions": autocomplete.suggest(q, limit) if q else []})
+
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
@@ -74,10 +165,36 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related("category").all()
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.with_related()
     serializer_class = ProductSerializer
     permission_classes = [IsStaffOrReadOnly]
+    pagination_class = OptionalPageNumberPagination
+
+    def get_validator_generations(self):
+        return [CATEGORIES, PRODUCTS]
+
+    # Exportação em streaming: /admin/products/export/?file_format=csv|jsonl (como a de pedidos)
+    @action(detail=False, methods=["get"], url_path="export", permission_classes=[IsAdminUser])
+    def export(self, request):
+        rows = product_io.export_rows()
+        return streaming_response(product_io.EXPORT_FIELDS, rows, request.query_params.get("file_format"), "produtos")
+
+    # Importação (upsert por sku/slug) de arquivo CSV ou JSONL enviado no campo "file"
+    @action(
+        detail=False, methods=["post"], url_path="import",
+        permission_classes=[IsAdminUser], parser_classes=[MultiPartParser, FormParser],
+    )
+    def import_file(self, request):
+        uploaded = request.FILES.get("file")
+        if not uploaded:
+            return Response({"detail": "Envie o arquivo no campo 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = product_io.detect_format(uploaded.name, request.query_params.get("file_format"))
+        try:
+            summary = product_io.import_products(uploaded, file_format)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            return Response({"detail": f"Arquivo inválido: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(summary)
 
 
 class ProductImageViewSet(viewsets.ModelViewSet):
@@ -88,6 +205,27 @@ class ProductImageViewSet(viewsets.ModelViewSet):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
 
+class ImageJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status da geração de variantes (shop.image_jobs), consultado pelo admin após o upload."""
+    serializer_class = ImageJobSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = OptionalPageNumberPagination
+
+    def get_queryset(self):
+        # ?ids=1,2,3 (vários uploads de uma vez), ?kind= e ?object_id=, ?status=
+        queryset = ImageJob.objects.order_by("-id")
+        params = self.request.query_params
+        ids = [i for i in (params.get("ids") or "").split(",") if i.strip().isdigit()]
+        if ids:
+            queryset = queryset.filter(pk__in=ids)
+        for name in ("kind", "status"):
+            if params.get(name):
+                queryset = queryset.filter(**{name: params[name]})
+        if (params.get("object_id") or "").isdigit():
+            queryset = queryset.filter(object_id=params["object_id"])
+        return queryset
+
+
 class AdminBannerUploadView(APIView):
     permission_classes = [IsStaffOrReadOnly]
     parser_classes = [MultiPartParser, FormParser]
@@ -96,25 +234,32 @@ class AdminBannerUploadView(APIView):
         file_obj = request.FILES.get('file') or request.data.get('file')
         if not file_obj:
             return Response({"detail": "Arquivo de imagem é obrigatório (campo 'file')."}, status=status.HTTP_400_BAD_REQUEST)
-        # Gera nome estável com UUID preservando extensão
-        name, ext = os.path.splitext(getattr(file_obj, 'name', 'banner'))
-        ext = ext or '.jpg'
-        filename = f"banners/{uuid.uuid4().hex}{ext}"
-        saved_path = default_storage.save(filename, file_obj)
+        # O storage (shop.storage) troca o nome pelo SHA-256 do conteúdo; o nome original só dá a extensão
+        saved_path = default_storage.save(f"banners/{getattr(file_obj, 'name', None) or 'banner.jpg'}", file_obj)
         # default_storage.url fornece URL pública (ex.: /media/...)
         url = default_storage.url(saved_path)
-        return Response({"url": url}, status=status.HTTP_201_CREATED)
+        # Banners não têm modelo: as variantes ficam no job (GET /admin/image-jobs/<id>/)
+        job = image_jobs.enqueue(ImageJob.BANNER, saved_path)
+        return Response(
+            {"url": url, "variants": images.srcset(job.variants), "image_job": image_job_status(job)},
+            status=status.HTTP_201_CREATED,
+        )
 
 
-class SiteSettingView(generics.RetrieveUpdateAPIView):
+class SiteSettingView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = SiteSettingSerializer
     permission_classes = [IsStaffOrReadOnly]
 
+    def get_validator_queryset(self):
+        # Validadores do GET condicional a partir da cópia em memória, sem query
+        return [get_site_setting()]
+
     def get_object(self):
-        obj = SiteSetting.objects.first()
-        if obj is None:
-            obj = SiteSetting.objects.create()
-        return obj
+        setting = get_site_setting()
+        if self.request.method not in SAFE_METHODS:
+            # O objeto em memória é compartilhado entre threads: edições usam a linha do banco
+            return SiteSetting.objects.get(pk=setting.pk)
+        return setting
 
 
 class RegisterView(APIView):
@@ -275,29 +420,123 @@ class AddressDetailView(generics.RetrieveUpdateDestroyAPIView):
             CustomerAddress.objects.filter(user=self.request.user).exclude(id=addr.id).update(is_default_delivery=False)
 
 
-class OrderListCreateView(generics.ListCreateAPIView):
+class OrderListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at').prefetch_related('items')
+        return Order.objects.filter(user=self.request.user).prefetch_related('items')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except inventory.OutOfStock as e:
+            return Response(
+                {"detail": "Estoque insuficiente para alguns itens.", "shortages": e.shortages},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except coupons.CouponUnavailable as e:
+            return Response({"detail": e.message, "coupon_code": e.reason}, status=status.HTTP_400_BAD_REQUEST)
+
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all().order_by('-created_at')
     serializer_class = AdminOrderSerializer
     permission_classes = [IsStaffOrReadOnly]
+    pagination_class = OptionalPageNumberPagination
+
+    def get_queryset(self):
+        # Listagem/busca não levam o caderno de endereços; detalhe/edição sim
+        return super().get_queryset().with_related(addresses=self.action not in ("list", "search"))
+
+    def get_serializer_class(self):
+        if self.action in ("list", "search"):
+            return AdminOrderListSerializer
+        return AdminOrderSerializer
+
+    # Busca do atendimento: ?q= (prefixo do número, nome, e-mail, CPF, telefone), ?status=, ?from=, ?to=
+    @action(detail=False, methods=["get"], url_path="search", pagination_class=KeysetPagination, permission_classes=[IsAdminUser])
+    def search(self, request):
+        queryset = order_search.search_orders(self.get_queryset(), request.query_params)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def get_validator_generations(self):
+        # Perfil e endereços do cliente vão embutidos no pedido do admin
+        return [CUSTOMERS]
+
+    def perform_update(self, serializer):
+        was_cancelled = serializer.instance.is_cancelled
+        with transaction.atomic():
+            order = serializer.save()
+            if order.is_cancelled and not was_cancelled:
+                inventory.release_order(order)
+                coupons.release_order(order)
+            elif was_cancelled and not order.is_cancelled:
+                # Pedido reaberto volta a segurar estoque e o uso do cupom (se ainda houver)
+                shortages = inventory.reserve_order(order)
+                if shortages:
+                    raise inventory.OutOfStock(shortages)
+                coupons.redeem_order(order)
+
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except inventory.OutOfStock as e:
+            return Response(
+                {"detail": "Estoque insuficiente para reabrir o pedido.", "shortages": e.shortages},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except coupons.CouponUnavailable as e:
+            return Response(
+                {"detail": f"{e.message}: não é possível reabrir o pedido.", "coupon_code": e.reason},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            inventory.release_order(instance)
+            coupons.release_order(instance)
+            instance.delete()
 
+    # Exportação para o financeiro em streaming: ?file_format=csv|jsonl, ?from=, ?to=, ?status=, ?payment_method=
+    @action(detail=False, methods=["get"], url_path="export", permission_classes=[IsAdminUser])
+    def export(self, request):
+        rows = order_export.export_rows(request.query_params)
+        return streaming_response(order_export.HEADER, rows, request.query_params.get("file_format"), "pedidos")
 
-class AdminOrderByNumberView(generics.RetrieveAPIView):
-    queryset = Order.objects.all()
+
+class AdminOrderByNumberView(ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Order.objects.with_related(addresses=True)
     serializer_class = AdminOrderSerializer
     permission_classes = [IsStaffOrReadOnly]
     lookup_field = 'order_number'
 
+    def get_validator_generations(self):
+        return [CUSTOMERS]
+
+
+class SalesReportView(APIView):
+    # Painel de vendas: lê só a consolidação diária (shop.sales), nunca os pedidos
+    # ?from=, ?to=, ?status=, ?payment_method=, ?include_cancelled=1, ?limit=
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(sales.report(request.query_params))
+
+
+class SalesByRegionView(APIView):
+    # Vendas por região da entrega (DailyRegionSales): ?group=estado|cidade|cep, ?cep_digits=,
+    # ?estado=, ?cep=, mais ?from=, ?to=, ?status=, ?include_cancelled=1
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(sales.region_report(request.query_params))
+
 
 class OrderStatusViewSet(viewsets.ModelViewSet):
     queryset = OrderStatus.objects.all().order_by('sort_order', 'label')
@@ -312,39 +551,22 @@ class CouponViewSet(viewsets.ModelViewSet):
 
 
 class ApplyCouponView(APIView):
+    # Prévia do desconto no carrinho (sem contar uso); o resgate acontece no checkout (shop.coupons)
     permission_classes = [AllowAny]
 
     def post(self, request):
         code = str(request.data.get('code', '')).strip()
-        subtotal_raw = request.data.get('subtotal')
         try:
-            from decimal import Decimal
-            subtotal = Decimal(str(subtotal_raw or 0))
-        except Exception:
+            subtotal = Decimal(str(request.data.get('subtotal') or 0))
+        except (InvalidOperation, TypeError, ValueError):
             subtotal = Decimal('0')
 
-        c = Coupon.objects.filter(code=code).first()
-        if not c:
-            return Response({'error': 'Cupom inválido'}, status=status.HTTP_404_NOT_FOUND)
-        if not c.is_valid():
-            return Response({'error': 'Cupom expirado ou inativo'}, status=status.HTTP_400_BAD_REQUEST)
-        if c.min_order_total:
-            try:
-                from decimal import Decimal
-                min_total = Decimal(str(c.min_order_total))
-            except Exception:
-                min_total = Decimal('0')
-            if subtotal < min_total:
-                return Response({'error': 'Subtotal abaixo do mínimo do cupom'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # calcula desconto
-        from decimal import Decimal
-        if c.discount_type == 'percent':
-            discount = (subtotal * Decimal(str(c.value))) / Decimal('100')
-        else:
-            discount = Decimal(str(c.value))
-        if discount > subtotal:
-            discount = subtotal
+        try:
+            c = coupons.check(code, request.user, subtotal)
+        except coupons.CouponUnavailable as e:
+            code_status = status.HTTP_404_NOT_FOUND if e.reason == "not_found" else status.HTTP_400_BAD_REQUEST
+            return Response({'error': e.message}, status=code_status)
+        discount = coupons.discount_for(c, subtotal)
 
         return Response({
             'code': c.code,
@@ -362,25 +584,26 @@ class AdminCustomerView(generics.RetrieveUpdateDestroyAPIView):
     def get_object(self):
         User = get_user_model()
         pk = self.kwargs.get('pk')
-        user = User.objects.filter(pk=pk).first()
+        user = User.objects.select_related('profile').filter(pk=pk).first()
         return user
 
 
 class AdminCustomerListView(generics.ListAPIView):
     permission_classes = [IsStaffOrReadOnly]
     serializer_class = AdminCustomerSerializer
+    pagination_class = ShopPageNumberPagination
 
     def get_queryset(self):
         User = get_user_model()
-        q = self.request.query_params.get('q')
-        qs = User.objects.all().order_by('id')
-        # Exibir apenas clientes (não staff)
-        qs = qs.filter(is_staff=False)
-        if q:
-            qs = qs.filter(
-                Q(username__icontains=q) |
-                Q(email__icontains=q) |
-                Q(first_name__icontains=q) |
-                Q(last_name__icontains=q)
-            )
-        return qs
+        # Exibir apenas clientes (não staff); perfil na mesma query
+        qs = User.objects.filter(is_staff=False).select_related('profile').order_by('id')
+        # Busca por usuário, e-mail, nome, CPF, telefone e cidade (índice trigram, shop.customer_search)
+        return filter_customers(qs, self.request.query_params.get('q', ''))
+
+
+def serve_media(request, path):
+    """MEDIA_URL servido pelo Django (dev/runserver); blobs endereçados por conteúdo com cache imutável."""
+    response = static_serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        response["Cache-Control"] = CACHE_CONTROL_IMMUTABLE
+    return response
@@ -8,9 +8,12 @@ export async function GET(req: NextRequest) {
   const token = cookieStore.get("auth_token")?.value;
   if (!token) return NextResponse.json({ detail: "Unauthorized" }, { status: 401 });
   const { searchParams } = new URL(req.url);
-  const q = searchParams.get("q");
   const url = new URL(`${BASE}/admin/customers/`);
-  if (q) url.searchParams.set("q", q);
+  // Busca e paginação ({count, next, previous, results})
+  for (const key of ["q", "page", "page_size"]) {
+    const value = searchParams.get(key);
+    if (value) url.searchParams.set(key, value);
+  }
   const res = await fetch(url.toString(), {
     headers: {
       "Content-Type": "application/json",
@@ -3,8 +3,18 @@ import { NextResponse } from "next/server";
 // Proxy público para listar categorias
 const BASE = process.env.API_BASE_URL ? `${process.env.API_BASE_URL}/api` : "http://localhost:8000/api";
 
-export async function GET() {
-  const res = await fetch(`${BASE}/categories/`, { cache: "no-store" });
+export async function GET(request: Request) {
+  // Repassa o validador do navegador: a API responde 304 sem serializar nada
+  const ifNoneMatch = request.headers.get("if-none-match");
+  const res = await fetch(`${BASE}/categories/`, {
+    cache: "no-store",
+    headers: ifNoneMatch ? { "If-None-Match": ifNoneMatch } : undefined,
+  });
+  const etag = res.headers.get("etag");
+  const headers: Record<string, string> = etag ? { ETag: etag } : {};
+  if (res.status === 304) {
+    return new NextResponse(null, { status: 304, headers });
+  }
   const data = await res.json().catch(() => ([]));
-  return NextResponse.json(data, { status: res.status });
-}
\ No newline at end of file
+  return NextResponse.json(data, { status: res.status, headers });
+}
@@ -3,13 +3,14 @@ import { cookies } from "next/headers";
 
 const BASE = process.env.API_BASE_URL ? `${process.env.API_BASE_URL}/api` : "http://localhost:8000/api";
 
-export async function GET() {
+export async function GET(request: Request) {
   const cookieStore = await cookies();
   const token = cookieStore.get("auth_token")?.value;
   if (!token) {
     return NextResponse.json({ detail: "Não autenticado" }, { status: 401 });
   }
-  const res = await fetch(`${BASE}/orders/`, {
+  const search = new URL(request.url).search;
+  const res = await fetch(`${BASE}/orders/${search}`, {
     headers: {
       "Content-Type": "application/json",
       Authorization: `Bearer ${token}`,
@@ -17,5 +18,14 @@ export async function GET() {
     cache: "no-store",
   });
   const data = await res.json().catch(() => ([]));
+  // Histórico paginado por cursor: devolve a lista e expõe o próximo cursor em header
+  if (res.ok && data && Array.isArray(data.results) && !new URLSearchParams(search).has("cursor")) {
+    const headers: Record<string, string> = {};
+    if (data.next) {
+      const cursor = new URL(data.next).searchParams.get("cursor");
+      if (cursor) headers["X-Next-Cursor"] = cursor;
+    }
+    return NextResponse.json(data.results, { status: res.status, headers });
+  }
   return NextResponse.json(data, { status: res.status });
-}
\ No newline at end of file
+}
@@ -16,12 +16,22 @@ const productSchema = z.object({
   featured: z.boolean(),
 });
 
+// A lista da API é paginada ({ results }); aceita também o formato antigo (array)
+function listResults(data: any): any[] | null {
+  if (Array.isArray(data)) return data;
+  if (data && Array.isArray(data.results)) return data.results;
+  return null;
+}
+
 async function fetchFrom(url: string, options: RequestInit) {
   try {
     const response = await fetch(url, options);
+    if (response.status === 304) {
+      return { data: null, response };
+    }
     if (response.ok) {
       const data = await response.json();
-      if (data && (Array.isArray(data) ? data.length > 0 : data.id)) {
+      if (data && (listResults(data) ? (listResults(data) as any[]).length > 0 : data.id)) {
         return { data, response };
       }
     }
@@ -36,14 +46,25 @@ export async function GET(
   const { slug } = await params;
   const options: RequestInit = { next: { revalidate: 0 } };
 
-  // 1. Try fetching the product directly from the primary API base.
-  let { data: product } = await fetchFrom(`${BASE}/products/${slug}/`, options);
+  // 1. Try fetching the product directly from the primary API base,
+  // forwarding the browser validator so unchanged products come back as 304.
+  const ifNoneMatch = request.headers.get("if-none-match");
+  const direct = await fetchFrom(`${BASE}/products/${slug}/`, {
+    ...options,
+    headers: ifNoneMatch ? { "If-None-Match": ifNoneMatch } : undefined,
+  });
+  const etag = direct.response?.headers.get("etag") || null;
+  if (direct.response?.status === 304) {
+    return new NextResponse(null, { status: 304, headers: etag ? { ETag: etag } : {} });
+  }
+  let product = direct.data;
 
   // 2. If not found, try fetching the full list from the primary API base and filtering.
   if (!product) {
     const { data: productList } = await fetchFrom(`${BASE}/products/`, options);
-    if (productList && Array.isArray(productList)) {
-      product = productList.find((p: any) => p.slug === slug) || null;
+    const items = listResults(productList);
+    if (items) {
+      product = items.find((p: any) => p.slug === slug) || null;
     }
   }
 
@@ -56,8 +77,9 @@ export async function GET(
   // 4. If still not found with the direct dev fallback, try the dev fallback list.
   if (!product && BASE !== DEV_FALLBACK) {
     const { data: fallbackProductList } = await fetchFrom(`${DEV_FALLBACK}/products/`, options);
-    if (fallbackProductList && Array.isArray(fallbackProductList)) {
-      product = fallbackProductList.find((p: any) => p.slug === slug) || null;
+    const fallbackItems = listResults(fallbackProductList);
+    if (fallbackItems) {
+      product = fallbackItems.find((p: any) => p.slug === slug) || null;
     }
   }
 
@@ -65,5 +87,5 @@ export async function GET(
     return NextResponse.json({ detail: "No Product matches the given query." }, { status: 404 });
   }
 
-  return NextResponse.json(product);
+  return NextResponse.json(product, { headers: etag && product === direct.data ? { ETag: etag } : {} });
 }
\ No newline at end of file
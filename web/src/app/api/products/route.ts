@@ -4,18 +4,41 @@ import { NextResponse } from "next/server";
 const BASE = process.env.API_BASE_URL ? `${process.env.API_BASE_URL}/api` : "http://localhost:8000/api";
 const DEV_FALLBACK = "http://localhost:8000/api";
 
-export async function GET() {
-  let res = await fetch(`${BASE}/products/`, { cache: "no-store" });
-  let data: any = await res.json().catch(() => ([]));
+// A API pagina por cursor ({ next, previous, results }). O proxy repassa a query
+// (cursor, page_size, category...) e devolve uma página só; os links next/previous
+// apontam para este proxy, e a vitrine pede a página seguinte quando precisa.
+function proxyLink(link: string | null | undefined): string | null {
+  if (!link) return null;
+  try {
+    return `/api/products${new URL(link).search}`;
+  } catch {
+    return null;
+  }
+}
+
+async function fetchPage(base: string, search: string) {
+  const res = await fetch(`${base}/products/${search}`, { cache: "no-store" });
+  const data: any = await res.json().catch(() => null);
+  if (res.ok && data && Array.isArray(data.results)) {
+    return {
+      res,
+      data: { next: proxyLink(data.next), previous: proxyLink(data.previous), results: data.results },
+    };
+  }
+  return { res, data };
+}
+
+export async function GET(request: Request) {
+  const search = new URL(request.url).search;
+  const { res, data } = await fetchPage(BASE, search);
   // Se a origem principal falhar ou retornar vazio, tenta fallback local (ambiente dev)
-  if (!res.ok || (Array.isArray(data) && data.length === 0)) {
+  if (!res.ok || (Array.isArray(data?.results) && data.results.length === 0 && !data.previous)) {
     try {
-      const res2 = await fetch(`${DEV_FALLBACK}/products/`, { cache: "no-store" });
-      const data2 = await res2.json().catch(() => ([]));
-      return NextResponse.json(data2, { status: res2.status });
+      const fallback = await fetchPage(DEV_FALLBACK, search);
+      return NextResponse.json(fallback.data, { status: fallback.res.status });
     } catch {
       // segue com resposta original
     }
   }
   return NextResponse.json(data, { status: res.status });
-}
\ No newline at end of file
+}
@@ -1609,16 +1609,25 @@ function CustomersAdmin() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [q, setQ] = useState("");
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
+  const [total, setTotal] = useState(0);
   const [selected, setSelected] = useState<any | null>(null);
   const [editMode, setEditMode] = useState(false);
 
-  async function load() {
-    setLoading(true);
+  async function load(nextPage = 1) {
+    if (nextPage === 1) setLoading(true);
     setError(null);
-    const url = q ? `/api/admin/customers?q=${encodeURIComponent(q)}` : "/api/admin/customers";
-    const res = await fetch(url, { cache: "no-store" });
-    const data = res.ok ? await res.json() : [];
-    setItems(Array.isArray(data) ? data : []);
+    const params = new URLSearchParams({ page: String(nextPage) });
+    if (q) params.set("q", q);
+    const res = await fetch(`/api/admin/customers?${params.toString()}`, { cache: "no-store" });
+    const data = res.ok ? await res.json() : null;
+    // Resposta paginada: {count, next, previous, results}
+    const results = Array.isArray(data?.results) ? data.results : Array.isArray(data) ? data : [];
+    setItems((prev) => (nextPage === 1 ? results : [...prev, ...results]));
+    setTotal(typeof data?.count === "number" ? data.count : results.length);
+    setHasMore(Boolean(data?.next));
+    setPage(nextPage);
     setLoading(false);
   }
 
@@ -1705,8 +1714,8 @@ function CustomersAdmin() {
     <div>
       <h3 className="mb-3 text-lg font-semibold">Clientes</h3>
       <div className="mb-3 flex gap-2">
-        <Input className="flex-1" placeholder="Buscar por nome, email ou usuário" value={q} onChange={(e) => setQ(e.target.value)} />
-        <Button className="bg-primary text-black" onClick={load}>Buscar</Button>
+        <Input className="flex-1" placeholder="Buscar por nome, email, usuário, CPF, telefone ou cidade" value={q} onChange={(e) => setQ(e.target.value)} />
+        <Button className="bg-primary text-black" onClick={() => load(1)}>Buscar</Button>
       </div>
 
       {loading ? (
@@ -1750,6 +1759,12 @@ function CustomersAdmin() {
               )}
             </tbody>
           </table>
+          <div className="mt-3 flex items-center gap-3 text-sm text-zinc-600">
+            <span>{items.length} de {total} clientes</span>
+            {hasMore && (
+              <Button size="sm" variant="outline" onClick={() => load(page + 1)}>Carregar mais</Button>
+            )}
+          </div>
         </div>
       )}
 
@@ -34,10 +34,11 @@ function currencyBRL(n: any): string {
 export default function LojaPage() {
   const [categories, setCategories] = useState<Category[]>([]);
   const [products, setProducts] = useState<Product[]>([]);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [query, setQuery] = useState("");
-  const [categorySlug, setCategorySlug] = useState<string | null>(null);
   const [session, setSession] = useState<{
     logged_in: boolean;
     username: string | null;
@@ -59,23 +60,34 @@ export default function LojaPage() {
       .then((r) => (r.ok ? r.json() : []))
       .then((data) => setCategories(Array.isArray(data) ? data : []))
       .catch(() => {});
-    fetch("/api/products", { cache: "no-store" })
-      .then(async (r) => {
-        if (!r.ok) throw new Error("Falha ao carregar produtos");
-        return r.json();
-      })
-      .then((data) => setProducts(Array.isArray(data) ? data : []))
+    // Categoria da URL (?c=slug) filtrada na API; a lista vem paginada por cursor
+    let slug: string | null = null;
+    try {
+      slug = new URLSearchParams(window.location.search).get("c");
+    } catch {}
+    loadProducts(slug ? `/api/products?category=${encodeURIComponent(slug)}` : "/api/products")
       .catch((e) => setError(e?.message || "Erro ao carregar produtos"))
       .finally(() => setLoading(false));
+    // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
-  // Lê categoria da URL (?c=slug)
-  useEffect(() => {
-    try {
-      const usp = new URLSearchParams(window.location.search);
-      setCategorySlug(usp.get("c"));
-    } catch {}
-  }, []);
+  // Busca uma página ({ next, previous, results }) e acrescenta à lista já exibida
+  async function loadProducts(url: string, append = false) {
+    const r = await fetch(url, { cache: "no-store" });
+    if (!r.ok) throw new Error("Falha ao carregar produtos");
+    const data = await r.json();
+    const results: Product[] = Array.isArray(data?.results) ? data.results : [];
+    setProducts((prev) => (append ? [...prev, ...results] : results));
+    setNextPage(data?.next || null);
+  }
+
+  function loadMore() {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    loadProducts(nextPage, true)
+      .catch((e) => setError(e?.message || "Erro ao carregar produtos"))
+      .finally(() => setLoadingMore(false));
+  }
 
   useEffect(() => {
     fetch("/api/auth/session", { cache: "no-store" })
@@ -149,9 +161,8 @@ export default function LojaPage() {
 
   const filtered = products.filter((p) => {
     const q = query.trim().toLowerCase();
-    const matchesQuery = !q || (p.title || "").toLowerCase().includes(q) || (p.brand || "").toLowerCase().includes(q);
-    const matchesCategory = !categorySlug || (p.category?.slug === categorySlug);
-    return matchesQuery && matchesCategory;
+    // Categoria já vem filtrada pela API (inclui subcategorias); a busca filtra as páginas carregadas
+    return !q || (p.title || "").toLowerCase().includes(q) || (p.brand || "").toLowerCase().includes(q);
   });
 
   return (
@@ -165,7 +176,16 @@ export default function LojaPage() {
         ) : error ? (
           <div className="text-sm text-red-600">{error}</div>
         ) : (
-          <ProductGrid products={filtered} onAdd={onAddToCart} onBuy={buyNow} />
+          <>
+            <ProductGrid products={filtered} onAdd={onAddToCart} onBuy={buyNow} />
+            {nextPage && (
+              <div className="mt-6 flex justify-center">
+                <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? "Carregando..." : "Carregar mais produtos"}
+                </Button>
+              </div>
+            )}
+          </>
         )}
       </section>
       {/* Removido bloco "Meus pedidos" da home. Os pedidos permanecem na página de perfil. */}
@@ -64,6 +64,9 @@ export default function PerfilPage() {
   const [addresses, setAddresses] = useState<Session["addresses"]>([]);
   const [orders, setOrders] = useState<OrderDTO[]>([]);
   const [loadingOrders, setLoadingOrders] = useState(false);
+  // Histórico paginado por cursor: a primeira página traz o próximo cursor no header X-Next-Cursor
+  const [ordersCursor, setOrdersCursor] = useState<string | null>(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
 
   // Novo endereço
   const [newAddrOpen, setNewAddrOpen] = useState(false);
@@ -128,12 +131,33 @@ export default function PerfilPage() {
     if (!session?.logged_in) return;
     setLoadingOrders(true);
     fetch("/api/orders", { cache: "no-store" })
-      .then((r) => (r.ok ? r.json() : []))
-      .then((data) => setOrders(Array.isArray(data) ? data : []))
+      .then(async (r) => {
+        const data = r.ok ? await r.json() : [];
+        setOrders(Array.isArray(data) ? data : []);
+        setOrdersCursor(r.ok ? r.headers.get("X-Next-Cursor") : null);
+      })
       .catch(() => {})
       .finally(() => setLoadingOrders(false));
   }, [session?.logged_in]);
 
+  function loadMoreOrders() {
+    if (!ordersCursor || loadingMoreOrders) return;
+    setLoadingMoreOrders(true);
+    fetch(`/api/orders?cursor=${encodeURIComponent(ordersCursor)}`, { cache: "no-store" })
+      .then((r) => (r.ok ? r.json() : null))
+      .then((data) => {
+        if (!data || !Array.isArray(data.results)) return;
+        setOrders((prev) => [...prev, ...data.results]);
+        let next: string | null = null;
+        try {
+          next = data.next ? new URL(data.next).searchParams.get("cursor") : null;
+        } catch {}
+        setOrdersCursor(next);
+      })
+      .catch(() => {})
+      .finally(() => setLoadingMoreOrders(false));
+  }
+
   const isLogged = !!session?.logged_in;
   const greeting = useMemo(() => {
     const n = session?.name?.trim();
@@ -725,6 +749,13 @@ export default function PerfilPage() {
                         )}
                       </div>
                     ))}
+                    {ordersCursor && (
+                      <div className="flex justify-center">
+                        <Button variant="outline" onClick={loadMoreOrders} disabled={loadingMoreOrders}>
+                          {loadingMoreOrders ? "Carregando..." : "Carregar mais pedidos"}
+                        </Button>
+                      </div>
+                    )}
                   </div>
                 )}
               </div>